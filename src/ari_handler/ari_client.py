@@ -52,7 +52,7 @@ class AriClient:
 
     async def create_external_media(
         self, channel_id: str, app: str, external_host: str, format: str = "ulaw"
-    ) -> None:
+    ) -> Optional[dict]:
         params = {
             "channelId": channel_id,
             "app": app,
@@ -66,8 +66,10 @@ class AriClient:
         response = await self._post("channels/externalMedia", params)
         if response.status == 200:
             logger.info("✅ ExternalMedia создан")
+            return await response.json()
         else:
             logger.warning("⚠️ Ошибка externalMedia: %s", await response.text())
+            return None
 
     async def start_recording(
         self,
@@ -129,6 +131,14 @@ class AriClient:
         else:
             logger.warning("⚠️ Ошибка ответа на канал: %s", await response.text())
 
+    async def hangup_channel(self, channel_id: str, reason: str = "normal") -> None:
+        params = {"reason": reason}
+        response = await self._delete(f"channels/{channel_id}", params)
+        if response.status == 204:
+            logger.info("✅ Channel hung up successfully")
+        else:
+            logger.warning("⚠️ Ошибка завершения вызова: %s", await response.text())
+
     async def _post(self, endpoint: str, params: dict) -> aiohttp.ClientResponse:
         url = f"{self._base_url}/{endpoint}"
         logger.info("POST URL: %s | Params: %s", url, params)
@@ -137,6 +147,14 @@ class AriClient:
             logger.debug("Response [%s]: %s", response.status, text)
             return response
 
+    async def _delete(self, endpoint: str, params: dict) -> aiohttp.ClientResponse:
+        url = f"{self._base_url}/{endpoint}"
+        logger.info("DELETE URL: %s | Params: %s", url, params)
+        async with self._session.delete(url, params=params) as response:
+            text = await response.text()
+            logger.debug("Response [%s]: %s", response.status, text)
+            return response
+
     async def _ws_connection_worker(self):
         async with self._session.ws_connect(self._ws_url) as websocket:
             self._ws = websocket
@@ -1,18 +1,34 @@
 import asyncio
 import logging
 import os
+from contextlib import AsyncExitStack
 from uuid import uuid4
 
+import batched_udp
 from ari_client import AriClient
+from batched_media_endpoint import BatchedMediaEndpoint
+from caching_speech_synthesizer import CachingSpeechSynthesizer
+from call_manager import CallManager
+from call_supervisor import CallSupervisor
+from call_worker import CallServices, lease_call_manager, warm_up_services
+from grpc_channel_pool import GrpcChannelManager
+from hedged_speech_recognizer import HedgedSpeechRecognizer
 from kaldi_speech_recognizer import KaldiSpeechRecognizer
 from llm_service import LLMService
+from loop_monitor import LoopLagMonitor
 from main import start as start_recognizer
+from media_clock import MediaClock
+from media_endpoint import MediaEndpoint
 from models.channel_state import ChannelState
 from models.event import Event
 from models.event_type import EventType
+from port_pool import PortPool
 from yandex_credentials_provider import YandexCredentialsProvider
 from yandex_settings import YandexSettings
-from yandex_speech_recognizer import YandexSpeechRecognizer
+from yandex_speech_recognizer import (
+    YandexDuplexSpeechRecognizer,
+    YandexSpeechRecognizer,
+)
 from yandex_speech_synthesizer import YandexSpeechSynthesizer
 
 # Настройка логирования
@@ -27,42 +43,212 @@ AST_URL = os.getenv("AST_URL", f"http://{AST_HOST}:{AST_PORT}/")
 AST_APP = os.getenv("AST_APP", "voicebot")
 AST_USER = os.getenv("AST_USER", "ariuser")
 AST_PASS = os.getenv("AST_PASS", "ariuser")
+RTP_HOST = os.getenv("RTP_HOST", "0.0.0.0")
+RTP_PORT = int(os.getenv("RTP_PORT", 10000))
+RTP_PORT_RANGE = os.getenv("RTP_PORT_RANGE", "10000-10050")
+RTP_EXTERNAL_HOST = os.getenv("RTP_EXTERNAL_HOST", "ari-handler")
+# "pool" - a dedicated socket per call leased from RTP_PORT_RANGE,
+# "shared" - all calls on RTP_PORT, demultiplexed by source address/SSRC
+RTP_MODE = os.getenv("RTP_MODE", "pool")
+# Use recvmmsg/sendmmsg for the shared endpoint (Linux only)
+RTP_BATCHED_IO = os.getenv("RTP_BATCHED_IO", "false").lower() == "true"
+# Per-call socket driver in pool mode: "socket" (sock_recvfrom) or "protocol" (DatagramProtocol)
+RTP_TRANSPORT = os.getenv("RTP_TRANSPORT", "socket")
+# Exchange RTCP reports on RTP port + 1 in pool mode (the pool then leases even/odd port pairs)
+RTCP_ENABLED = os.getenv("RTCP_ENABLED", "true").lower() == "true"
+USE_UVLOOP = os.getenv("USE_UVLOOP", "false").lower() == "true"
+# Number of worker processes the calls are spread over in pool mode, 0 runs everything in one process
+ARI_WORKERS = int(os.getenv("ARI_WORKERS", 0))
+# "kaldi" (local Vosk), "yandex" (utterances endpointed by the local VAD),
+# "yandex-duplex" (the whole call streamed, turns ended by the service's EOU classifier) or
+# "hedged" (Yandex and Vosk in parallel, Vosk answers when Yandex is late or down)
+SPEECH_RECOGNIZER = os.getenv("SPEECH_RECOGNIZER", "kaldi")
+# How long the hedged recognizer waits for Yandex once the utterance has ended
+HEDGE_PRIMARY_TIMEOUT_MS = int(os.getenv("HEDGE_PRIMARY_TIMEOUT_MS", 400))
+# "default" or "high" (faster turn ends, more false ones)
+YANDEX_EOU_SENSITIVITY = os.getenv("YANDEX_EOU_SENSITIVITY", "default")
+# The Vosk model directory, an 8 kHz telephony model is fed the call audio without resampling
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "vosk-model-small-ru-0.22")
+# Where Vosk decodes: "thread", "process" (spawned, each loading the model) or "inline" (event loop)
+KALDI_EXECUTOR = os.getenv("KALDI_EXECUTOR", "thread")
+KALDI_WORKERS = int(os.getenv("KALDI_WORKERS", 4))
+KALDI_MAX_PENDING = int(os.getenv("KALDI_MAX_PENDING", 64))
+# Long-lived gRPC channels (HTTP/2 connections) per Yandex endpoint, shared by STT and TTS
+GRPC_CHANNELS = int(os.getenv("GRPC_CHANNELS", 2))
+GRPC_KEEPALIVE_MS = int(os.getenv("GRPC_KEEPALIVE_MS", 30000))
+# Synthesized phrases kept in memory (MiB), 0 disables the memory tier
+TTS_CACHE_MEMORY_MB = int(os.getenv("TTS_CACHE_MEMORY_MB", 32))
+# Directory the synthesized phrases are kept in across restarts, empty disables the disk tier
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "")
+TTS_CACHE_DISK_MB = int(os.getenv("TTS_CACHE_DISK_MB", 512))
+# How long a cached phrase is reused before it is synthesized again
+TTS_CACHE_TTL_S = float(os.getenv("TTS_CACHE_TTL_S", 7 * 24 * 3600))
+# Interval the event loop lag is logged at, 0 disables the monitor
+LOOP_LAG_REPORT_S = float(os.getenv("LOOP_LAG_REPORT_S", 60))
+
+
+def create_services() -> CallServices:
+    """
+    Creates the LLM service, speech recognizer and speech synthesizer.
+    Called once in the single-process mode and once in every call worker process.
+    """
+    yandex_credentials_provider = YandexCredentialsProvider(YandexSettings())
+    # The channels are opened on the event loop, on first use or warm-up
+    grpc_channel_manager = GrpcChannelManager(
+        GRPC_CHANNELS, keepalive_time_ms=GRPC_KEEPALIVE_MS
+    )
+
+    logger.info("Creating SpeechRecognizer instance")
+    if SPEECH_RECOGNIZER == "yandex-duplex":
+        speech_recognizer = YandexDuplexSpeechRecognizer(
+            yandex_credentials_provider,
+            grpc_channel_manager,
+            eou_sensitivity=YANDEX_EOU_SENSITIVITY,
+        )
+    elif SPEECH_RECOGNIZER == "yandex":
+        speech_recognizer = YandexSpeechRecognizer(
+            yandex_credentials_provider, grpc_channel_manager
+        )
+    else:
+        speech_recognizer = KaldiSpeechRecognizer(
+            model_path=VOSK_MODEL_PATH,
+            executor=KALDI_EXECUTOR,
+            workers=KALDI_WORKERS,
+            max_pending=KALDI_MAX_PENDING,
+        )
+        if SPEECH_RECOGNIZER == "hedged":
+            speech_recognizer = HedgedSpeechRecognizer(
+                YandexSpeechRecognizer(
+                    yandex_credentials_provider, grpc_channel_manager
+                ),
+                speech_recognizer,
+                primary_timeout_ms=HEDGE_PRIMARY_TIMEOUT_MS,
+            )
+    logger.info("SpeechRecognizer instance created")
 
-yandex_credentials_provider = YandexCredentialsProvider(YandexSettings())
+    logger.info("Creating SpeechSynthesizer instance")
+    speech_synthesizer = YandexSpeechSynthesizer(
+        yandex_credentials_provider, grpc_channel_manager
+    )
+    if TTS_CACHE_MEMORY_MB or TTS_CACHE_DIR:
+        speech_synthesizer = CachingSpeechSynthesizer(
+            speech_synthesizer,
+            memory_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024,
+            directory=TTS_CACHE_DIR or None,
+            disk_bytes=TTS_CACHE_DISK_MB * 1024 * 1024,
+            ttl_s=TTS_CACHE_TTL_S,
+        )
+    logger.info("SpeechSynthesizer instance created")
+
+    logger.info("Creating LLMService instance")
+    llm_service = LLMService()
+    logger.info("LLMService instance created")
+
+    return llm_service, speech_recognizer, speech_synthesizer
 
-logger.info("Creating SpeechRecognizer instance")
-speech_recognizer = KaldiSpeechRecognizer(model_path="vosk-model-small-ru-0.22")
-# speech_recognizer = YandexSpeechRecognizer(yandex_credentials_provider)
-logger.info("SpeechRecognizer instance created")
 
-logger.info("Creating SpeechSynthesizer instance")
-speech_synthesizer = YandexSpeechSynthesizer(yandex_credentials_provider)
-logger.info("SpeechSynthesizer instance created")
+if RTP_BATCHED_IO and batched_udp.is_available():
+    media_endpoint = BatchedMediaEndpoint(RTP_HOST, RTP_PORT)
+else:
+    media_endpoint = MediaEndpoint(RTP_HOST, RTP_PORT)
+media_clock = MediaClock()
+port_pool = PortPool(RTP_HOST, *map(int, RTP_PORT_RANGE.split("-")))
 
-logger.info("Creating LLMService instance")
-llm_service = LLMService()
-logger.info("LLMService instance created")
+services: CallServices | None = None
+call_supervisor: CallSupervisor | None = None
 
 running_rtp_listeners = {}
+leased_rtp_ports = {}
+
+
+def _get_rtp_source_address(external_channel: dict | None) -> tuple[str, int] | None:
+    """
+    Extracts the address Asterisk sends the ExternalMedia RTP from.
+
+    :param external_channel: The channel returned by the ExternalMedia request.
+    :return: The (IP, port) address or None if Asterisk did not report it.
+    """
+    if not external_channel:
+        return None
+    channelvars = external_channel.get("channelvars") or {}
+    address = channelvars.get("UNICASTRTP_LOCAL_ADDRESS")
+    port = channelvars.get("UNICASTRTP_LOCAL_PORT")
+    if not address or not port:
+        return None
+    return address, int(port)
+
 
+async def create_external_media(
+    client: AriClient, channel_id: str
+) -> tuple[str, CallManager | None]:
+    """
+    Creates the ExternalMedia channel of a call and bridges it with the caller's channel.
 
-async def create_external_media(client: AriClient, channel_id: str) -> str:
+    :param client: The ARI client.
+    :param channel_id: The ID of the caller's channel.
+    :return: A tuple of the bridge ID and the call manager of the call,
+        None if the call runs in a worker process.
+    :raises RuntimeError: If no RTP port is free or Asterisk refused to set up the media.
+    """
     logger.info("Creating external media")
     external_channel_id = uuid4()
-    await client.create_external_media(
-        channel_id=external_channel_id,
-        app=AST_APP,
-        external_host="ari-handler:10000",
-        format="ulaw",
-    )
-    bridge_id = await client.create_bridge(bridge_type="mixing")
-    logger.info("Created bridge: %s", bridge_id)
-    await client.add_channel_to_bridge(bridge_id=bridge_id, channel_id=channel_id)
-    await client.add_channel_to_bridge(
-        bridge_id=bridge_id, channel_id=external_channel_id
-    )
+    call_manager: CallManager | None = None
+    if call_supervisor:
+        # The worker binds the port before Asterisk learns it
+        port = await call_supervisor.start_call(channel_id)
+    elif RTP_MODE == "shared":
+        port = RTP_PORT
+    else:
+        port, call_manager = lease_call_manager(
+            port_pool, RTP_HOST, media_clock, RTP_TRANSPORT, RTCP_ENABLED
+        )
+        leased_rtp_ports[channel_id] = port
+
+    try:
+        external_channel = await client.create_external_media(
+            channel_id=external_channel_id,
+            app=AST_APP,
+            external_host=f"{RTP_EXTERNAL_HOST}:{port}",
+            format="ulaw",
+        )
+        if external_channel is None:
+            raise RuntimeError("The ExternalMedia channel was not created.")
+        if RTP_MODE == "shared" and not call_supervisor:
+            # Register the call with the shared endpoint before the bridge starts the media flow
+            transport = media_endpoint.create_session(
+                _get_rtp_source_address(external_channel)
+            )
+            call_manager = CallManager(transport=transport, media_clock=media_clock)
+        bridge_id = await client.create_bridge(bridge_type="mixing")
+        if bridge_id is None:
+            raise RuntimeError("The bridge was not created.")
+        logger.info("Created bridge: %s", bridge_id)
+        await client.add_channel_to_bridge(bridge_id=bridge_id, channel_id=channel_id)
+        await client.add_channel_to_bridge(
+            bridge_id=bridge_id, channel_id=external_channel_id
+        )
+    except BaseException:
+        # The call never starts, so StasisEnd would not free its sockets
+        _release_call_media(channel_id, call_manager)
+        raise
+
+    return bridge_id, call_manager
+
 
-    return bridge_id
+def _release_call_media(channel_id: str, call_manager: CallManager | None) -> None:
+    """
+    Frees the RTP sockets and port of a call whose setup failed,
+    or stops it on its worker process.
+
+    :param channel_id: The ID of the caller's channel.
+    :param call_manager: The call manager of the call, if it was created.
+    """
+    if call_manager is not None:
+        call_manager.close()
+    if channel_id in leased_rtp_ports:
+        port_pool.release(leased_rtp_ports.pop(channel_id))
+    if call_supervisor:
+        call_supervisor.end_call(channel_id)
 
 
 async def handle_stasis_start(client: AriClient, event: Event):
@@ -78,7 +264,12 @@ async def handle_stasis_start(client: AriClient, event: Event):
 
     await client.play_media(channel.id, "sound:hello-world")
 
-    bridge_id = await create_external_media(client, channel.id)
+    try:
+        bridge_id, call_manager = await create_external_media(client, channel.id)
+    except Exception:
+        logger.exception("❌ Failed to set up call %s, hanging up", channel.id)
+        await client.hangup_channel(channel.id, reason="congestion")
+        return
 
     await client.start_recording(
         bridge_id=bridge_id,
@@ -86,11 +277,11 @@ async def handle_stasis_start(client: AriClient, event: Event):
         name=f"recording_{channel.id}",
     )
 
-    task = asyncio.create_task(
-        start_recognizer(
-            "0.0.0.0", 10000, llm_service, speech_recognizer, speech_synthesizer
-        )
-    )
+    if call_manager is None:
+        # The call's pipeline already runs in a worker process
+        return
+
+    task = asyncio.create_task(start_recognizer(call_manager, *services))
 
     running_rtp_listeners[channel.id] = task
 
@@ -102,6 +293,10 @@ async def handle_stasis_end(client: AriClient, event: Event):
         task.cancel()
         del running_rtp_listeners[event.channel.id]
         logger.info(f"🛑 Остановлен RTP listener для канала {event.channel.id}")
+    if event.channel.id in leased_rtp_ports:
+        port_pool.release(leased_rtp_ports.pop(event.channel.id))
+    if call_supervisor:
+        call_supervisor.end_call(event.channel.id)
 
 
 async def process_event(client: AriClient, event: Event):
@@ -114,10 +309,50 @@ async def process_event(client: AriClient, event: Event):
 
 
 async def start():
-    async with AriClient(AST_HOST, AST_PORT, AST_USER, AST_PASS, AST_APP) as client:
+    global services, call_supervisor
+    async with AsyncExitStack() as stack:
+        if LOOP_LAG_REPORT_S:
+            await stack.enter_async_context(
+                LoopLagMonitor(report_interval_s=LOOP_LAG_REPORT_S)
+            )
+        if ARI_WORKERS > 0:
+            if RTP_MODE == "shared":
+                raise ValueError("ARI_WORKERS requires RTP_MODE=pool.")
+            # The ARI websocket stays here, the calls run in the workers
+            call_supervisor = await stack.enter_async_context(
+                CallSupervisor(
+                    ARI_WORKERS,
+                    RTP_HOST,
+                    *map(int, RTP_PORT_RANGE.split("-")),
+                    services_factory=create_services,
+                    transport_type=RTP_TRANSPORT,
+                    rtcp_enabled=RTCP_ENABLED,
+                    use_uvloop=USE_UVLOOP,
+                )
+            )
+        else:
+            services = create_services()
+            await warm_up_services(services)
+        if RTP_MODE == "shared":
+            await stack.enter_async_context(media_endpoint)
+        client = await stack.enter_async_context(
+            AriClient(AST_HOST, AST_PORT, AST_USER, AST_PASS, AST_APP)
+        )
         async for event in client:
-            await process_event(client, event)
+            try:
+                await process_event(client, event)
+            except Exception:
+                # One call's failure must not stop the handling of the others
+                logger.exception("❌ Failed to process event: %s", event)
 
 
 if __name__ == "__main__":
+    if USE_UVLOOP:
+        try:
+            import uvloop
+
+            uvloop.install()
+            logger.info("Using uvloop event loop")
+        except ImportError:
+            logger.warning("uvloop is not installed, using the default event loop")
     asyncio.run(start())
@@ -2,12 +2,27 @@ import asyncio
 import io
 import logging
 
+import numpy as np
+from g711 import (
+    alaw_to_linear,
+    linear_to_alaw,
+    linear_to_ulaw,
+    ulaw_to_linear,
+)
 from pydub import AudioSegment
 
 logger = logging.getLogger(__name__)
 
 
 class AudioConverter:
+    """
+    Converts the call audio between formats.
+
+    The G.711 codecs (µ-law, A-law) and 16-bit linear PCM are converted through lookup
+    tables, on the calling thread: they are a table lookup per sample, cheaper than the
+    thread hop. pydub/ffmpeg is only used for container and compressed formats, in a thread.
+    """
+
     @staticmethod
     async def ogg_opus_to_ulaw(ogg_bytes: bytes, sample_rate: int = 8000) -> bytes:
         """Convert OGG/Opus to PCM µ-law (G.711) raw audio asynchronously."""
@@ -37,11 +52,49 @@ class AudioConverter:
         )
 
     @staticmethod
-    async def ulaw_to_pcm(ulaw_bytes: bytes, sample_rate: int = 8000) -> bytes:
-        """Convert u-law (G.711) to 16-bit PCM raw bytes (Linear PCM LE) asynchronously."""
-        return await asyncio.to_thread(
-            AudioConverter._ulaw_to_pcm_sync, ulaw_bytes, sample_rate
+    async def ulaw_to_pcm(
+        ulaw_bytes: bytes | memoryview, sample_rate: int = 8000
+    ) -> bytes:
+        """Convert u-law (G.711) to 16-bit PCM raw bytes (Linear PCM LE), the sample rate is kept."""
+        return AudioConverter.ulaw_to_pcm_sync(ulaw_bytes)
+
+    @staticmethod
+    def ulaw_to_pcm_sync(ulaw_bytes: bytes | memoryview) -> bytes:
+        """Convert u-law (G.711) to 16-bit PCM raw bytes (Linear PCM LE)."""
+        return ulaw_to_linear(ulaw_bytes).astype("<i2").tobytes()
+
+    @staticmethod
+    def pcm_to_ulaw_sync(pcm_bytes: bytes | memoryview) -> bytes:
+        """Convert 16-bit PCM raw bytes (Linear PCM LE) to u-law (G.711)."""
+        return linear_to_ulaw(np.frombuffer(pcm_bytes, dtype="<i2")).tobytes()
+
+    @staticmethod
+    def alaw_to_pcm_sync(alaw_bytes: bytes | memoryview) -> bytes:
+        """Convert A-law (G.711) to 16-bit PCM raw bytes (Linear PCM LE)."""
+        return alaw_to_linear(alaw_bytes).astype("<i2").tobytes()
+
+    @staticmethod
+    def pcm_to_alaw_sync(pcm_bytes: bytes | memoryview) -> bytes:
+        """Convert 16-bit PCM raw bytes (Linear PCM LE) to A-law (G.711)."""
+        return linear_to_alaw(np.frombuffer(pcm_bytes, dtype="<i2")).tobytes()
+
+    @staticmethod
+    def ulaw_to_alaw_sync(ulaw_bytes: bytes | memoryview) -> bytes:
+        """Convert u-law (G.711) to A-law (G.711)."""
+        return linear_to_alaw(ulaw_to_linear(ulaw_bytes)).tobytes()
+
+    @staticmethod
+    def alaw_to_ulaw_sync(alaw_bytes: bytes | memoryview) -> bytes:
+        """Convert A-law (G.711) to u-law (G.711)."""
+        return linear_to_ulaw(alaw_to_linear(alaw_bytes)).tobytes()
+
+    @staticmethod
+    def _segment_to_ulaw(audio: AudioSegment, sample_rate: int) -> bytes:
+        """Resamples decoded audio to mono 16-bit and encodes it to u-law without ffmpeg."""
+        pcm_audio = (
+            audio.set_frame_rate(sample_rate).set_channels(1).set_sample_width(2)
         )
+        return AudioConverter.pcm_to_ulaw_sync(pcm_audio.raw_data)
 
     @staticmethod
     def _ogg_opus_to_ulaw_sync(ogg_bytes: bytes, sample_rate: int = 8000) -> bytes:
@@ -49,35 +102,20 @@ class AudioConverter:
         audio = AudioSegment.from_file(
             io.BytesIO(ogg_bytes), format="ogg", codec="opus"
         )
-        ulaw_audio = (
-            audio.set_frame_rate(sample_rate).set_channels(1).set_sample_width(1)
-        )
-
-        out_buffer = io.BytesIO()
-        ulaw_audio.export(out_buffer, format="mulaw", codec="pcm_mulaw")
-        result = out_buffer.getvalue()
-        return result
+        return AudioConverter._segment_to_ulaw(audio, sample_rate)
 
     @staticmethod
     def _mp3_to_ulaw_sync(mp3_bytes: bytes, sample_rate: int = 8000) -> bytes:
         """Convert MP3 to PCM µ-law (G.711) raw audio."""
         audio = AudioSegment.from_file(io.BytesIO(mp3_bytes), format="mp3")
-
-        ulaw_audio = (
-            audio.set_frame_rate(sample_rate).set_channels(1).set_sample_width(1)
-        )
-
-        # Export to u-law format
-        raw_fp = io.BytesIO()
-        ulaw_audio.export(raw_fp, format="mulaw", codec="pcm_mulaw")
-        return raw_fp.getvalue()
+        return AudioConverter._segment_to_ulaw(audio, sample_rate)
 
     @staticmethod
     def _ulaw_to_wav_sync(ulaw_bytes: bytes, sample_rate: int = 8000) -> bytes:
         """Convert PCM µ-law to WAV for debugging/listening."""
         audio = AudioSegment(
-            data=ulaw_bytes,
-            sample_width=1,
+            data=AudioConverter.ulaw_to_pcm_sync(ulaw_bytes),
+            sample_width=2,
             frame_rate=sample_rate,
             channels=1,
         )
@@ -89,22 +127,11 @@ class AudioConverter:
     def _ulaw_to_ogg_opus_sync(ulaw_bytes: bytes, sample_rate: int = 8000) -> bytes:
         """Convert u-law to OGG/Opus (e.g., for storage or streaming)."""
         audio = AudioSegment(
-            data=ulaw_bytes,
-            sample_width=1,
+            data=AudioConverter.ulaw_to_pcm_sync(ulaw_bytes),
+            sample_width=2,
             frame_rate=sample_rate,
             channels=1,
         )
         out_buffer = io.BytesIO()
         audio.export(out_buffer, format="ogg", codec="libopus")
         return out_buffer.getvalue()
-
-    @staticmethod
-    def _ulaw_to_pcm_sync(ulaw_bytes: bytes, sample_rate: int = 8000) -> bytes:
-        """Convert u-law (G.711) to 16-bit PCM raw bytes (Linear PCM LE)."""
-        audio = AudioSegment(
-            data=ulaw_bytes, sample_width=1, frame_rate=sample_rate, channels=1
-        )
-        pcm_audio = audio.set_sample_width(2)
-        out_buffer = io.BytesIO()
-        pcm_audio.export(out_buffer, format="raw")
-        return out_buffer.getvalue()
@@ -0,0 +1,345 @@
+"""
+Transcribes the bridge recordings offline and stores the transcripts in an SQLite index.
+
+Usage:
+    python batch_transcriber.py /var/spool/asterisk/recording --workers 4
+    python batch_transcriber.py /var/spool/asterisk/recording --engine yandex --concurrency 16
+
+"vosk" fans the recordings out over a pool of processes, each loading the model once and
+streaming the files through it chunk by chunk. "yandex" submits the files to the
+asynchronous RecognizeFile API and polls the operations concurrently; the files are sent
+inline, so the ones over MAX_YANDEX_FILE_BYTES are recorded as failed, to be transcribed
+with "vosk" instead. Recordings already transcribed by the engine are skipped unless the
+file changed. The throughput is reported in audio hours per wall-clock hour.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from polyphase_resampler import PolyphaseResampler
+from transcript_store import Transcript, TranscriptStore
+
+logger = logging.getLogger(__name__)
+
+RECORDING_PREFIX = "recording_"
+
+# The largest file RecognizeFile takes as inline content, about 11 minutes of 8 kHz 16-bit mono
+MAX_YANDEX_FILE_BYTES = 10 * 1024 * 1024
+
+# The model of a Vosk worker process, loaded once by its initializer
+_worker_model = None
+_worker_sample_rate = 16000
+
+
+def find_recordings(
+    directory: str, pattern: str = f"{RECORDING_PREFIX}*.wav"
+) -> list[str]:
+    """
+    Lists the recordings in a directory, oldest first.
+
+    :param directory: The directory the recordings are stored in.
+    :param pattern: The file name pattern, default matches the bridge recordings.
+    :return: The paths of the recordings.
+    """
+    return sorted(glob.glob(os.path.join(directory, pattern)), key=os.path.getmtime)
+
+
+def _channel_id(path: str) -> str | None:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name[len(RECORDING_PREFIX) :] if name.startswith(RECORDING_PREFIX) else None
+
+
+def _wav_seconds(path: str) -> float:
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def _init_vosk_worker(model_path: str) -> None:
+    global _worker_model, _worker_sample_rate
+    from kaldi_speech_recognizer import model_sample_rate
+    from vosk import Model, SetLogLevel
+
+    SetLogLevel(-1)
+    _worker_sample_rate = model_sample_rate(model_path)
+    _worker_model = Model(model_path)
+
+
+def _transcribe_with_vosk(path: str, chunk_seconds: float) -> tuple[str, float]:
+    """
+    Transcribes a 16-bit WAV file in the worker process, reading it chunk by chunk,
+    so the memory used does not depend on the length of the recording.
+
+    :return: A tuple of the transcript and the audio duration in seconds.
+    """
+    from vosk import KaldiRecognizer
+
+    recognizer = KaldiRecognizer(_worker_model, _worker_sample_rate)
+    segments = []
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(
+                f"Only 16-bit WAV is supported, got {8 * wav.getsampwidth()}-bit."
+            )
+        channels = wav.getnchannels()
+        sample_rate = wav.getframerate()
+        resampler = (
+            PolyphaseResampler(sample_rate, _worker_sample_rate)
+            if sample_rate != _worker_sample_rate
+            else None
+        )
+        chunk_frames = int(sample_rate * chunk_seconds)
+        while frames := wav.readframes(chunk_frames):
+            samples = np.frombuffer(frames, dtype="<i2")
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            if resampler:
+                samples = resampler.process(samples)
+            if recognizer.AcceptWaveform(samples.astype("<i2").tobytes()):
+                segments.append(json.loads(recognizer.Result()).get("text", ""))
+        segments.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        audio_seconds = wav.getnframes() / sample_rate
+    return " ".join(segment for segment in segments if segment), audio_seconds
+
+
+def _transcript(path: str, engine: str, **fields) -> Transcript:
+    stat = os.stat(path)
+    return Transcript(
+        path=path,
+        engine=engine,
+        channel_id=_channel_id(path),
+        mtime=stat.st_mtime,
+        size=stat.st_size,
+        **fields,
+    )
+
+
+async def transcribe_with_vosk(
+    paths: list[str],
+    store: TranscriptStore,
+    model_path: str,
+    workers: int,
+    chunk_seconds: float = 1.0,
+) -> tuple[int, float]:
+    """
+    Transcribes the recordings over a pool of Vosk processes.
+
+    :param paths: The recordings.
+    :param store: The store the transcripts are saved to.
+    :param model_path: Path to the Vosk model directory.
+    :param workers: The number of processes.
+    :param chunk_seconds: The audio read and decoded at a time, default is 1 s.
+    :return: A tuple of the number of transcribed recordings and their audio in seconds.
+    """
+    loop = asyncio.get_running_loop()
+    # Spawned, so the workers don't inherit the event loop
+    context = multiprocessing.get_context("spawn")
+    # Keeps every worker busy without queueing all files at once
+    slots = asyncio.Semaphore(2 * workers)
+    transcribed = 0
+    audio_seconds = 0.0
+
+    async def transcribe(executor: ProcessPoolExecutor, path: str) -> None:
+        nonlocal transcribed, audio_seconds
+        async with slots:
+            started = time.perf_counter()
+            try:
+                text, seconds = await loop.run_in_executor(
+                    executor, _transcribe_with_vosk, path, chunk_seconds
+                )
+            except Exception as e:
+                logger.error("❌ Failed to transcribe %s: %s", path, e)
+                store.save(_transcript(path, "vosk", text="", error=str(e)))
+                return
+            transcribed += 1
+            audio_seconds += seconds
+            store.save(
+                _transcript(
+                    path,
+                    "vosk",
+                    text=text,
+                    audio_seconds=seconds,
+                    processing_seconds=time.perf_counter() - started,
+                )
+            )
+            logger.info("✅ %s: %s", path, text)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_vosk_worker,
+        initargs=(model_path,),
+    ) as executor:
+        await asyncio.gather(*(transcribe(executor, path) for path in paths))
+    return transcribed, audio_seconds
+
+
+async def transcribe_with_yandex(
+    paths: list[str],
+    store: TranscriptStore,
+    concurrency: int,
+    poll_interval_s: float = 1.0,
+    timeout_s: float = 600.0,
+) -> tuple[int, float]:
+    """
+    Transcribes the recordings with the Yandex RecognizeFile API, concurrency operations at a time.
+    A recording over MAX_YANDEX_FILE_BYTES is not read, it is stored as failed.
+
+    :param paths: The recordings.
+    :param store: The store the transcripts are saved to.
+    :param concurrency: The maximum number of operations in flight.
+    :param poll_interval_s: The first delay between two polls of an operation, doubled up to 10 s,
+        default is 1 s.
+    :param timeout_s: How long an operation may take, default is 600 s.
+    :return: A tuple of the number of transcribed recordings and their audio in seconds.
+    """
+    import grpc
+    from grpc_channel_pool import GrpcChannelManager
+    from yandex_credentials_provider import YandexCredentialsProvider
+    from yandex_settings import YandexSettings
+    from yandex_speech_recognizer import STT_ENDPOINT, YandexSpeechRecognizer
+
+    from generated import stt_service_pb2_grpc as stt_grpc
+    from generated.yandex.cloud.ai.stt.v3 import stt_pb2 as stt_messages
+
+    recognizer = YandexSpeechRecognizer(
+        YandexCredentialsProvider(YandexSettings()), GrpcChannelManager()
+    )
+    slots = asyncio.Semaphore(concurrency)
+    transcribed = 0
+    audio_seconds = 0.0
+
+    async def recognize(path: str) -> str:
+        size = os.path.getsize(path)
+        if size > MAX_YANDEX_FILE_BYTES:
+            raise ValueError(
+                f"The file of {size} bytes exceeds the {MAX_YANDEX_FILE_BYTES} bytes "
+                "RecognizeFile accepts inline."
+            )
+        stub = stt_grpc.AsyncRecognizerStub(
+            recognizer.channel_manager.get(STT_ENDPOINT)
+        )
+        metadata = await recognizer.get_metadata()
+        with open(path, "rb") as f:
+            content = f.read()
+        operation = await stub.RecognizeFile(
+            stt_messages.RecognizeFileRequest(
+                content=content,
+                recognition_model=stt_messages.RecognitionModelOptions(
+                    model="general",
+                    audio_format=stt_messages.AudioFormatOptions(
+                        container_audio=stt_messages.ContainerAudio(
+                            container_audio_type=stt_messages.ContainerAudio.WAV
+                        )
+                    ),
+                ),
+            ),
+            metadata=metadata,
+        )
+        deadline = time.monotonic() + timeout_s
+        delay = poll_interval_s
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                finals = []
+                async for response in stub.GetRecognition(
+                    stt_messages.GetRecognitionRequest(operation_id=operation.id),
+                    metadata=metadata,
+                ):
+                    if response.HasField("final") and response.final.alternatives:
+                        finals.append(response.final.alternatives[0].text)
+                return " ".join(text for text in finals if text)
+            except grpc.aio.AioRpcError as e:
+                # The results are not available until the operation is done
+                if e.code() != grpc.StatusCode.NOT_FOUND or time.monotonic() > deadline:
+                    raise
+            delay = min(2 * delay, 10.0)
+
+    async def transcribe(path: str) -> None:
+        nonlocal transcribed, audio_seconds
+        async with slots:
+            started = time.perf_counter()
+            try:
+                seconds = _wav_seconds(path)
+                text = await recognize(path)
+            except Exception as e:
+                logger.error("❌ Failed to transcribe %s: %s", path, e)
+                store.save(_transcript(path, "yandex", text="", error=str(e)))
+                return
+            transcribed += 1
+            audio_seconds += seconds
+            store.save(
+                _transcript(
+                    path,
+                    "yandex",
+                    text=text,
+                    audio_seconds=seconds,
+                    processing_seconds=time.perf_counter() - started,
+                )
+            )
+            logger.info("✅ %s: %s", path, text)
+
+    try:
+        await asyncio.gather(*(transcribe(path) for path in paths))
+    finally:
+        await recognizer.channel_manager.close()
+    return transcribed, audio_seconds
+
+
+async def run(args) -> None:
+    with TranscriptStore(args.db) as store:
+        recordings = find_recordings(args.directory, args.pattern)
+        paths = store.pending(recordings, args.engine)
+        logger.info(
+            "%s recordings, %s to transcribe with %s",
+            len(recordings),
+            len(paths),
+            args.engine,
+        )
+        started = time.perf_counter()
+        if args.engine == "yandex":
+            transcribed, audio_seconds = await transcribe_with_yandex(
+                paths, store, args.concurrency
+            )
+        else:
+            transcribed, audio_seconds = await transcribe_with_vosk(
+                paths, store, args.model, args.workers, args.chunk_seconds
+            )
+        wall_seconds = time.perf_counter() - started
+
+    print(
+        f"{transcribed} of {len(paths)} files, {audio_seconds / 3600:.3f} audio hours in "
+        f"{wall_seconds / 3600:.4f} wall-clock hours: "
+        f"{audio_seconds / wall_seconds if wall_seconds else 0:.1f} audio h per wall-clock h"
+    )
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", help="the directory of the recordings")
+    parser.add_argument("--pattern", default=f"{RECORDING_PREFIX}*.wav")
+    parser.add_argument("--db", default="transcripts.db")
+    parser.add_argument("--engine", choices=("vosk", "yandex"), default="vosk")
+    parser.add_argument("--model", default="vosk-model-small-ru-0.22")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-seconds", type=float, default=1.0)
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Yandex operations in flight"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from batched_udp import BatchedUdpSocket
+from media_endpoint import MediaEndpoint
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedMediaEndpoint(MediaEndpoint):
+    """
+    BatchedMediaEndpoint is a MediaEndpoint that uses Linux recvmmsg/sendmmsg.
+
+    Inbound packets of all calls are drained with one system call per readiness event.
+    Outbound packets are queued and flushed together once the current loop iteration ends,
+    so all frames sent on one media clock tick leave in a single sendmmsg call.
+    """
+
+    def __init__(
+        self, ip: str, port: int, packet_size: int = 2048, batch_size: int = 64
+    ):
+        """
+        Initializes the endpoint with the given IP address and port.
+
+        :param ip: The IP address to bind the socket to.
+        :param port: The port number to bind the socket to.
+        :param packet_size: The maximum size of a packet, default is 2048 bytes.
+        :param batch_size: The maximum number of packets per system call, default is 64.
+        """
+        super().__init__(ip, port, packet_size)
+        self._batch_size = batch_size
+        self._batched_socket: BatchedUdpSocket | None = None
+        self._flush_handle: asyncio.Handle | None = None
+        self.receive_calls = 0
+        self.send_calls = 0
+
+    async def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Queues a packet for the next batched send.
+
+        :param data: The packet to send. It is copied, so the caller may reuse its buffer.
+        :param addr: The address (IP, port) to send the packet to.
+        :raises RuntimeError: If the socket is not initialized.
+        """
+        if not self._batched_socket:
+            raise RuntimeError("Socket is not initialized.")
+        if self._batched_socket.queue(data, addr):
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    def _start_receiving(self) -> None:
+        self._batched_socket = BatchedUdpSocket(
+            self._sock, self._batch_size, self._packet_size
+        )
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._on_readable)
+
+    def _stop_receiving(self) -> None:
+        if self._sock:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        if self._batched_socket:
+            self._flush()
+        self._batched_socket = None
+
+    def _on_readable(self) -> None:
+        try:
+            while True:
+                datagrams = self._batched_socket.recv_batch()
+                self.receive_calls += 1
+                for data, addr in datagrams:
+                    # Sessions queue the packet, so it is copied out of the shared batch buffer
+                    self._dispatch(bytes(data), addr)
+                if len(datagrams) < self._batch_size:
+                    break
+        except OSError as e:
+            logger.error("Batched receive failed: %s", e)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        if not self._batched_socket.pending:
+            return
+        try:
+            self._batched_socket.flush()
+            self.send_calls += 1
+        except OSError as e:
+            logger.error("Batched send failed: %s", e)
@@ -0,0 +1,228 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import sys
+
+MSG_DONTWAIT = 0x40
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+class _Iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _Msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_Iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _Mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _Msghdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.recvmmsg.argtypes = [
+            ctypes.c_int,
+            ctypes.POINTER(_Mmsghdr),
+            ctypes.c_uint,
+            ctypes.c_int,
+            ctypes.c_void_p,
+        ]
+        libc.sendmmsg.argtypes = [
+            ctypes.c_int,
+            ctypes.POINTER(_Mmsghdr),
+            ctypes.c_uint,
+            ctypes.c_int,
+        ]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+def is_available() -> bool:
+    """Checks whether recvmmsg/sendmmsg can be used on this platform."""
+    return _libc is not None
+
+
+class _MessageBatch:
+    """Preallocated mmsghdr array with one buffer and one IPv4 address slot per message."""
+
+    def __init__(self, batch_size: int, buffer_size: int):
+        self.size = batch_size
+        self.buffers = (ctypes.c_char * (buffer_size * batch_size))()
+        self.views = [
+            memoryview(self.buffers).cast("B")[i * buffer_size : (i + 1) * buffer_size]
+            for i in range(batch_size)
+        ]
+        self.addresses = (_SockaddrIn * batch_size)()
+        self.iovecs = (_Iovec * batch_size)()
+        self.messages = (_Mmsghdr * batch_size)()
+        base = ctypes.addressof(self.buffers)
+        for i in range(batch_size):
+            self.iovecs[i].iov_base = base + i * buffer_size
+            self.iovecs[i].iov_len = buffer_size
+            header = self.messages[i].msg_hdr
+            header.msg_name = ctypes.addressof(self.addresses[i])
+            header.msg_namelen = ctypes.sizeof(_SockaddrIn)
+            header.msg_iov = ctypes.pointer(self.iovecs[i])
+            header.msg_iovlen = 1
+
+
+class BatchedUdpSocket:
+    """
+    BatchedUdpSocket reads and writes many IPv4 datagrams per system call
+    with Linux recvmmsg/sendmmsg on a non-blocking UDP socket.
+    """
+
+    def __init__(
+        self, sock: socket.socket, batch_size: int = 64, buffer_size: int = 2048
+    ):
+        """
+        Initializes the batched I/O for the given socket.
+
+        :param sock: The bound non-blocking IPv4 UDP socket.
+        :param batch_size: The maximum number of datagrams per system call, default is 64.
+        :param buffer_size: The maximum size of a datagram, default is 2048 bytes.
+        :raises RuntimeError: If recvmmsg/sendmmsg are not available on this platform.
+        """
+        if not is_available():
+            raise RuntimeError("recvmmsg/sendmmsg are not available on this platform.")
+        self._sock = sock
+        self._buffer_size = buffer_size
+        self._receive = _MessageBatch(batch_size, buffer_size)
+        self._send = _MessageBatch(batch_size, buffer_size)
+        self._pending = 0
+        # Queued datagrams that were not sent
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        """The number of datagrams queued for the next flush."""
+        return self._pending
+
+    def recv_batch(self) -> list[tuple[memoryview, tuple[str, int]]]:
+        """
+        Receives all datagrams that are ready, up to the batch size, in one system call.
+
+        :return: A list of datagrams and their sender addresses. The datagrams are views
+            of the internal buffers and are valid until the next call.
+        :raises OSError: If the system call fails with anything but EAGAIN.
+        """
+        batch = self._receive
+        for i in range(batch.size):
+            batch.messages[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)
+        count = _libc.recvmmsg(
+            self._sock.fileno(), batch.messages, batch.size, MSG_DONTWAIT, None
+        )
+        if count < 0:
+            self._raise_errno()
+            return []
+
+        datagrams = []
+        for i in range(count):
+            address = batch.addresses[i]
+            datagrams.append(
+                (
+                    batch.views[i][: batch.messages[i].msg_len],
+                    (
+                        socket.inet_ntoa(bytes(address.sin_addr)),
+                        socket.ntohs(address.sin_port),
+                    ),
+                )
+            )
+        return datagrams
+
+    def queue(self, data: bytes | memoryview, addr: tuple[str, int]) -> bool:
+        """
+        Copies a datagram into the next free send slot.
+
+        :param data: The datagram to send.
+        :param addr: The IPv4 address (IP, port) to send the datagram to.
+        :return: True if the batch is full and must be flushed before queueing more.
+        :raises ValueError: If the datagram does not fit into a slot.
+        """
+        size = len(data)
+        if size > self._buffer_size:
+            raise ValueError("Datagram does not fit into the send buffer.")
+        batch = self._send
+        i = self._pending
+        batch.views[i][:size] = data
+        batch.iovecs[i].iov_len = size
+        address = batch.addresses[i]
+        address.sin_family = socket.AF_INET
+        address.sin_port = socket.htons(addr[1])
+        address.sin_addr[:] = socket.inet_aton(addr[0])
+        self._pending += 1
+        return self._pending == batch.size
+
+    def flush(self) -> int:
+        """
+        Sends all queued datagrams with as few system calls as possible.
+        Datagrams the kernel does not accept because its buffer is full are dropped,
+        like a non-blocking sendto would do for real-time media.
+        A datagram failing with another error is dropped too, and the rest of the batch is sent.
+
+        :return: The number of datagrams sent.
+        :raises OSError: If a datagram failed with anything but EAGAIN, once the batch is done.
+        """
+        batch = self._send
+        sent = 0
+        position = 0
+        error = None
+        try:
+            while position < self._pending:
+                count = _libc.sendmmsg(
+                    self._sock.fileno(),
+                    ctypes.byref(batch.messages[position]),
+                    self._pending - position,
+                    MSG_DONTWAIT,
+                )
+                if count >= 0:
+                    sent += count
+                    position += count
+                    continue
+                try:
+                    self._raise_errno()
+                except OSError as e:
+                    # Only the datagram at the head of the rest failed, e.g. on an unreachable address
+                    error = error or e
+                    self.dropped += 1
+                    position += 1
+                    continue
+                self.dropped += self._pending - position
+                break
+        finally:
+            self._pending = 0
+        if error:
+            raise error
+        return sent
+
+    @staticmethod
+    def _raise_errno() -> None:
+        error = ctypes.get_errno()
+        if error not in (errno.EAGAIN, errno.EWOULDBLOCK):
+            raise OSError(error, os.strerror(error))
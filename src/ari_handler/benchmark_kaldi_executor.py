@@ -0,0 +1,91 @@
+"""
+Measures how much Vosk decoding blocks the event loop with each Kaldi executor.
+
+Usage:
+    python benchmark_kaldi_executor.py --model vosk-model-small-ru-0.22 --calls 8 [--audio speech.ulaw]
+
+Every call streams the same 8 kHz µ-law utterance into its own recognition session in real
+time, 20 ms per frame, and finishes it. The loop lag is what every RTP receiver and the
+media clock would have suffered meanwhile.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from kaldi_speech_recognizer import KaldiSpeechRecognizer
+from loop_monitor import LoopLagMonitor
+
+FRAME_SIZE = 160
+
+
+async def _call(recognizer: KaldiSpeechRecognizer, audio: bytes) -> float:
+    """Streams the utterance in real time and returns the time from its end to the transcript."""
+    loop = asyncio.get_running_loop()
+    async with await recognizer.create_session() as session:
+        deadline = loop.time()
+        for i in range(0, len(audio), FRAME_SIZE):
+            await session.accept(audio[i : i + FRAME_SIZE])
+            deadline += FRAME_SIZE / 8000
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+        end_of_speech = time.perf_counter()
+        await session.finish()
+        return time.perf_counter() - end_of_speech
+
+
+async def _run(args, executor: str, audio: bytes) -> dict:
+    recognizer = KaldiSpeechRecognizer(
+        args.model, max_decoders=args.calls, executor=executor, workers=args.workers
+    )
+    await recognizer.warm_up()
+    monitor = LoopLagMonitor(report_interval_s=None)
+    async with monitor:
+        latencies = await asyncio.gather(
+            *(_call(recognizer, audio) for _ in range(args.calls))
+        )
+    recognizer.close()
+    stats = monitor.stats
+    return {
+        "executor": executor,
+        "mean_lag_ms": stats.mean_lag_ms,
+        "max_lag_ms": stats.max_lag_ms,
+        "stalls": stats.stalls,
+        "final_ms": 1000 * max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="vosk-model-small-ru-0.22")
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--audio", help="8 kHz µ-law utterance, random noise if not given"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=5.0, help="length of the noise"
+    )
+    parser.add_argument("--executors", default="inline,thread,process")
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            audio = f.read()
+    else:
+        audio = os.urandom(int(8000 * args.seconds))
+
+    print(
+        f"{'executor':<8} {'mean lag ms':>12} {'max lag ms':>11} {'stalls':>7} "
+        f"{'final ms':>9}"
+    )
+    for executor in args.executors.split(","):
+        result = asyncio.run(_run(args, executor, audio))
+        print(
+            f"{result['executor']:<8} {result['mean_lag_ms']:>12.2f} "
+            f"{result['max_lag_ms']:>11.2f} {result['stalls']:>7} {result['final_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
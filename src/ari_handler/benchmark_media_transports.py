@@ -0,0 +1,155 @@
+"""
+Compares the inbound media transports under a realistic load of N calls at 50 packets/s each.
+
+Usage:
+    python benchmark_media_transports.py --calls 100 --duration 10 [--uvloop]
+
+A separate process sends the RTP, so the CPU time reported is only the one spent receiving
+packets and passing them through CallManager.audio_channel (jitter buffer included).
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import socket
+import time
+
+import batched_udp
+from batched_media_endpoint import BatchedMediaEndpoint
+from call_manager import CallManager
+from datagram_media_transport import DatagramMediaTransport
+from media_endpoint import MediaEndpoint
+from port_pool import PortPool
+from rtp_packet import RtpPacketBuilder
+from socket_media_transport import SocketMediaTransport
+
+HOST = "127.0.0.1"
+SHARED_PORT = 11000
+POOL_PORTS = (11001, 11500)
+FRAME_SIZE = 160
+
+
+def _send_rtp(targets: list[tuple[int, tuple[str, int]]], duration: float) -> None:
+    """Sends one 20 ms frame per call every 20 ms from the source ports given in targets."""
+    sockets = []
+    for source_port, target in targets:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((HOST, source_port))
+        sockets.append((sock, target, RtpPacketBuilder(source_port, 0, FRAME_SIZE)))
+
+    payload = b"\x7f" * FRAME_SIZE
+    start = time.monotonic()
+    deadline = start
+    sequence_number = 0
+    while deadline - start < duration:
+        for sock, target, builder in sockets:
+            sock.sendto(
+                builder.build(sequence_number, sequence_number * FRAME_SIZE, payload),
+                target,
+            )
+        sequence_number += 1
+        deadline += 0.02
+        time.sleep(max(0.0, deadline - time.monotonic()))
+
+
+async def _consume(call_manager: CallManager, counter: list[int]) -> None:
+    async with call_manager:
+        async for _ in call_manager.audio_channel():
+            counter[0] += 1
+
+
+async def _run(option: str, calls: int, duration: float) -> dict:
+    source_ports = [12000 + i for i in range(calls)]
+    endpoint = None
+    if option in ("shared", "batched"):
+        endpoint_class = BatchedMediaEndpoint if option == "batched" else MediaEndpoint
+        endpoint = endpoint_class(HOST, SHARED_PORT)
+        await endpoint.__aenter__()
+        call_managers = [
+            CallManager(transport=endpoint.create_session((HOST, port)))
+            for port in source_ports
+        ]
+        targets = [(port, (HOST, SHARED_PORT)) for port in source_ports]
+    else:
+        port_pool = PortPool(HOST, *POOL_PORTS)
+        call_managers = []
+        targets = []
+        for source_port in source_ports:
+            port, sock = port_pool.lease()
+            transport_class = (
+                DatagramMediaTransport if option == "protocol" else SocketMediaTransport
+            )
+            call_managers.append(
+                CallManager(transport=transport_class(HOST, port, sock))
+            )
+            targets.append((source_port, (HOST, port)))
+
+    counter = [0]
+    consumers = [asyncio.create_task(_consume(cm, counter)) for cm in call_managers]
+    await asyncio.sleep(0.2)
+
+    sender = multiprocessing.Process(target=_send_rtp, args=(targets, duration))
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    sender.start()
+    while sender.is_alive():
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.1)
+    cpu = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    if endpoint:
+        await endpoint.__aexit__(None, None, None)
+
+    return {
+        "option": option,
+        "packets": counter[0],
+        "expected": int(calls * duration / 0.02),
+        "packets_per_s": counter[0] / wall,
+        "cpu_percent": 100 * cpu / wall,
+        "cpu_us_per_packet": 1e6 * cpu / max(counter[0], 1),
+        "cpu_percent_per_call": 100 * cpu / wall / calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--uvloop", action="store_true", help="run on uvloop")
+    parser.add_argument(
+        "--options",
+        default="socket,protocol,shared,batched",
+        help="comma-separated transports to compare",
+    )
+    args = parser.parse_args()
+    # Cancelling the consumers at the end of a run is logged as an error by CallManager
+    logging.basicConfig(level=logging.CRITICAL)
+
+    if args.uvloop:
+        import uvloop
+
+        uvloop.install()
+
+    print(
+        f"{'transport':<10} {'packets':>14} {'packets/s':>10} {'CPU %':>7} "
+        f"{'µs/packet':>10} {'CPU %/call':>10}"
+    )
+    for option in args.options.split(","):
+        if option == "batched" and not batched_udp.is_available():
+            print(f"{option:<10} not available on this platform")
+            continue
+        result = asyncio.run(_run(option, args.calls, args.duration))
+        print(
+            f"{result['option']:<10} {result['packets']:>7}/{result['expected']:<6} "
+            f"{result['packets_per_s']:>10.0f} {result['cpu_percent']:>7.1f} "
+            f"{result['cpu_us_per_packet']:>10.1f} {result['cpu_percent_per_call']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
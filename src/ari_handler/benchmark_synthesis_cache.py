@@ -0,0 +1,88 @@
+"""
+Measures how long a phrase takes to be ready for playback through CachingSpeechSynthesizer.
+
+Usage:
+    python benchmark_synthesis_cache.py --phrases 200 --latency-ms 300 --audio-seconds 3
+
+The synthesizer is simulated: it waits latency_ms and returns audio_seconds of µ-law.
+"miss" synthesizes every phrase, "memory" requests them again, "disk" requests them from a
+new cache over the same directory, as after a restart, and "coalesced" requests one new
+phrase from concurrent calls at once, counting the synthesizer calls made.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from caching_speech_synthesizer import CachingSpeechSynthesizer
+from speech_synthesizer import SpeechSynthesizer
+
+
+class _SimulatedSynthesizer(SpeechSynthesizer):
+    def __init__(self, latency_ms: float, audio_seconds: float):
+        self._latency = latency_ms / 1000
+        self._size = int(8000 * audio_seconds)
+        self.calls = 0
+
+    async def synthesize(self, text: str) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self._latency)
+        return os.urandom(self._size)
+
+
+async def _measure(cache: CachingSpeechSynthesizer, phrases: list[str]) -> list[float]:
+    latencies = []
+    for phrase in phrases:
+        start = time.perf_counter()
+        await cache.synthesize(phrase)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    print(
+        f"{name:<10} {1e6 * statistics.median(latencies):>14.1f} "
+        f"{1e6 * latencies[int(0.99 * (len(latencies) - 1))]:>14.1f}"
+    )
+
+
+async def run(args) -> None:
+    phrases = [f"Фраза номер {i}." for i in range(args.phrases)]
+    with tempfile.TemporaryDirectory() as directory:
+        synthesizer = _SimulatedSynthesizer(args.latency_ms, args.audio_seconds)
+        cache = CachingSpeechSynthesizer(synthesizer, directory=directory)
+
+        print(f"{'option':<10} {'median µs':>14} {'p99 µs':>14}")
+        _report("miss", await _measure(cache, phrases))
+        _report("memory", await _measure(cache, phrases))
+        restarted = CachingSpeechSynthesizer(synthesizer, directory=directory)
+        _report("disk", await _measure(restarted, phrases))
+
+        calls = synthesizer.calls
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(restarted.synthesize("Новая фраза.") for _ in range(args.concurrency))
+        )
+        _report("coalesced", [time.perf_counter() - start])
+        print(
+            f"{args.concurrency} concurrent requests, "
+            f"{synthesizer.calls - calls} synthesizer call(s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--phrases", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
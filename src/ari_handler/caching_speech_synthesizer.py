@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from speech_synthesizer import SpeechSynthesizer
+
+logger = logging.getLogger(__name__)
+
+# The audio every synthesizer delivers, part of the key so a format change misses the old entries
+AUDIO_SPEC = "ulaw/8000/mono"
+FILE_SUFFIX = ".ulaw"
+
+
+@dataclass
+class SynthesisCacheStats:
+    """Data class to represent how the requests of a CachingSpeechSynthesizer were served."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    # Requests the wrapped synthesizer was called for
+    misses: int = 0
+    # Requests that waited for the same text already being loaded or synthesized
+    coalesced: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+
+
+class CachingSpeechSynthesizer(SpeechSynthesizer):
+    """
+    CachingSpeechSynthesizer keeps the audio of the phrases a bot repeats, so they are played
+    without going to the network and ffmpeg again.
+
+    The audio is looked up by the wrapped synthesizer's cache_key (provider and voice),
+    the audio format and the text, in two tiers:
+
+    - memory: a least recently used cache bounded by the total audio size; a hit returns the
+      stored audio without awaiting anything.
+    - disk (optional): one µ-law file per phrase in a directory, kept across restarts and shared
+      by the worker processes. A hit maps the file read-only and returns a memoryview of it,
+      so the audio is not copied and the pages come from the OS page cache. The files are
+      written atomically and the least recently used ones are removed over disk_bytes.
+
+    Entries older than ttl_s are synthesized again. Concurrent requests for the same phrase
+    share one lookup and synthesis; a request cancelled meanwhile, e.g. by a barge-in, leaves
+    the synthesis running for the others and for the cache.
+
+    Every worker process keeps its own index of the directory, so with several of them the disk
+    usage can exceed disk_bytes until each has evicted its share.
+    """
+
+    def __init__(
+        self,
+        synthesizer: SpeechSynthesizer,
+        memory_bytes: int = 32 * 1024 * 1024,
+        directory: str | None = None,
+        disk_bytes: int = 512 * 1024 * 1024,
+        ttl_s: float = 7 * 24 * 3600,
+    ):
+        """
+        Initializes the cache, indexing the files already in the directory.
+
+        :param synthesizer: The synthesizer of the phrases not cached yet.
+        :param memory_bytes: The audio kept in memory, 0 disables the memory tier, default is 32 MiB.
+        :param directory: The directory of the disk tier, default is None, which disables it.
+        :param disk_bytes: The audio kept on disk, default is 512 MiB.
+        :param ttl_s: How long a phrase is reused before it is synthesized again, default is 7 days.
+        """
+        self.synthesizer = synthesizer
+        self._memory_bytes = memory_bytes
+        self._directory = directory
+        self._disk_bytes = disk_bytes
+        self._ttl = ttl_s
+        # key -> (audio, expiry time), least recently used first
+        self._memory: OrderedDict[str, tuple[bytes | memoryview, float]] = OrderedDict()
+        self._memory_size = 0
+        # key -> file size, least recently used first
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.stats = SynthesisCacheStats()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._index_directory()
+
+    @property
+    def cache_key(self) -> str:
+        return self.synthesizer.cache_key
+
+    async def warm_up(self) -> None:
+        """Warms up the wrapped synthesizer."""
+        await self.synthesizer.warm_up()
+
+    async def synthesize(self, text: str) -> bytes | memoryview:
+        """
+        Returns the audio of the text from the cache, synthesizing it on a miss.
+
+        :param text: Text to synthesize.
+        :return: Audio data in u-law format, a read-only memoryview for a phrase from the disk tier.
+        """
+        key = self._key(text)
+        audio = self._memory_get(key)
+        if audio is not None:
+            self.stats.memory_hits += 1
+            logger.debug("Synthesis cache hit in memory: %s", text)
+            return audio
+
+        task = self._in_flight.get(key)
+        if task:
+            self.stats.coalesced += 1
+        else:
+            task = asyncio.create_task(self._load(key, text))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(
+            f"{self.synthesizer.cache_key}\n{AUDIO_SPEC}\n{text.strip()}".encode()
+        ).hexdigest()
+
+    async def _load(self, key: str, text: str) -> bytes | memoryview:
+        if self._directory:
+            cached = self._disk_get(key)
+            if cached:
+                audio, expires_at = cached
+                self.stats.disk_hits += 1
+                logger.debug("Synthesis cache hit on disk: %s", text)
+                self._memory_put(key, audio, expires_at)
+                return audio
+
+        self.stats.misses += 1
+        audio = await self.synthesizer.synthesize(text)
+        if not audio:
+            return audio
+        self._memory_put(key, audio, time.time() + self._ttl)
+        if self._directory:
+            try:
+                await asyncio.to_thread(self._write_file, key, audio)
+            except OSError as e:
+                logger.warning("Failed to write the synthesis cache file: %s", e)
+            else:
+                self._disk_put(key, len(audio))
+        return audio
+
+    def _memory_get(self, key: str) -> bytes | memoryview | None:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        audio, expires_at = entry
+        if time.time() >= expires_at:
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return audio
+
+    def _memory_put(
+        self, key: str, audio: bytes | memoryview, expires_at: float
+    ) -> None:
+        if len(audio) > self._memory_bytes:
+            return
+        self._memory_pop(key)
+        self._memory[key] = (audio, expires_at)
+        self._memory_size += len(audio)
+        while self._memory_size > self._memory_bytes:
+            self._memory_pop(next(iter(self._memory)))
+            self.stats.memory_evictions += 1
+
+    def _memory_pop(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._memory_size -= len(entry[0])
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + FILE_SUFFIX)
+
+    def _disk_get(self, key: str) -> tuple[memoryview, float] | None:
+        path = self._path(key)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            # Not synthesized yet, or removed by another worker process
+            self._disk_forget(key)
+            return None
+        try:
+            stat = os.fstat(fd)
+            expires_at = stat.st_mtime + self._ttl
+            if time.time() >= expires_at or not stat.st_size:
+                self._disk_forget(key)
+                self._remove_file(path)
+                return None
+            audio = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            # The mapping stays valid after the descriptor is closed, and after the file is removed
+            os.close(fd)
+        if hasattr(audio, "madvise"):
+            # Reads the file ahead, so the playback doesn't fault pages in from the disk
+            audio.madvise(mmap.MADV_WILLNEED)
+        self._disk_put(key, stat.st_size)
+        return memoryview(audio), expires_at
+
+    def _disk_put(self, key: str, size: int) -> None:
+        self._disk_forget(key)
+        self._disk[key] = size
+        self._disk_size += size
+        while self._disk_size > self._disk_bytes and len(self._disk) > 1:
+            evicted = next(iter(self._disk))
+            self._disk_forget(evicted)
+            self._remove_file(self._path(evicted))
+            self.stats.disk_evictions += 1
+
+    def _disk_forget(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_size -= size
+
+    def _write_file(self, key: str, audio: bytes | memoryview) -> None:
+        path = self._path(key)
+        # Written aside and renamed, so no process ever maps a partial file
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(audio)
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _index_directory(self) -> None:
+        now = time.time()
+        entries = []
+        with os.scandir(self._directory) as files:
+            for entry in files:
+                if not entry.name.endswith(FILE_SUFFIX):
+                    continue
+                stat = entry.stat()
+                if now >= stat.st_mtime + self._ttl:
+                    self._remove_file(entry.path)
+                else:
+                    entries.append(
+                        (stat.st_mtime, entry.name[: -len(FILE_SUFFIX)], stat.st_size)
+                    )
+        # The oldest files are the first to go, the order of use is not known from a former run
+        for _, key, size in sorted(entries):
+            self._disk_put(key, size)
+        logger.info(
+            "Synthesis cache: %s phrases, %.1f MiB on disk",
+            len(self._disk),
+            self._disk_size / 1024 / 1024,
+        )
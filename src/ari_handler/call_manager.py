@@ -1,8 +1,16 @@
 import asyncio
 import logging
-import random
-import socket
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterator
+
+from jitter_buffer import JitterBuffer, JitterBufferStats
+from media_clock import MediaClock
+from media_quality_stats import MediaQualityStats
+from media_transport import MediaTransport
+from rtcp import ReceptionStatistics
+from rtcp_session import RtcpSession
+from rtp_packet import RtpPacket
+from rtp_session import OutboundRtpSession
+from socket_media_transport import SocketMediaTransport
 
 logger = logging.getLogger(__name__)
 
@@ -13,27 +21,102 @@ class CallManager:
     _current_playback_task: asyncio.Task | None = None
     _response_playback_task_queue: asyncio.Queue | None = None
 
-    def __init__(self, ip: str, port: int):
+    def __init__(
+        self,
+        ip: str | None = None,
+        port: int | None = None,
+        transport: MediaTransport | None = None,
+        jitter_buffer: JitterBuffer | None = None,
+        media_clock: MediaClock | None = None,
+        payload_type: int = 0,
+        rtcp_transport: MediaTransport | None = None,
+    ):
         """
-        Initializes the Manager with the given IP address and port.
+        Initializes the Manager with the given IP address and port or with a ready media transport.
 
         :param ip: The IP address to bind the socket to.
         :param port: The port number to bind the socket to.
+        :param transport: The media transport to use instead of a dedicated socket,
+            e.g. a session of a shared MediaEndpoint.
+        :param jitter_buffer: The jitter buffer for inbound audio, default is a 20 ms frame buffer.
+        :param media_clock: The clock pacing outbound audio, shared by all calls of the process.
+            A private 20 ms clock is used if not given.
+        :param payload_type: The RTP payload type of outbound audio, default is 0 (PCMU).
+        :param rtcp_transport: The media transport bound to the RTCP port paired with the RTP port.
+            RTCP reports are exchanged with the peer only if it is given.
+        :raises ValueError: If neither an address nor a transport is given.
         """
-        self._ip = ip
-        self._port = port
+        if transport is None:
+            if ip is None or port is None:
+                raise ValueError("Either ip and port or transport must be provided.")
+            transport = SocketMediaTransport(ip, port)
+        self._transport = transport
+        self._is_open = False
+        self._jitter_buffer = jitter_buffer or JitterBuffer()
+        self._media_clock = media_clock or MediaClock()
+        self._payload_type = payload_type
+        self._outbound_session: OutboundRtpSession | None = None
+        self._reception_statistics = ReceptionStatistics()
+        self._rtcp_session = (
+            RtcpSession(rtcp_transport, self._reception_statistics)
+            if rtcp_transport
+            else None
+        )
+        self.invalid_packets = 0
+
+    @property
+    def jitter_buffer_stats(self) -> JitterBufferStats:
+        """The counters of the inbound jitter buffer of the call."""
+        return self._jitter_buffer.stats
+
+    @property
+    def media_stats(self) -> MediaQualityStats:
+        """
+        A snapshot of the media quality of the call: loss and jitter of the inbound stream,
+        and the round-trip time and the peer's view of the outbound stream from RTCP.
+        """
+        reception = self._reception_statistics
+        jitter_buffer_stats = self._jitter_buffer.stats
+        # Duplicates can make the RFC 3550 loss count negative
+        lost = max(reception.lost, 0)
+        stats = MediaQualityStats(
+            packets_received=reception.received,
+            packets_expected=reception.expected,
+            packets_lost=lost,
+            loss_ratio=lost / reception.expected if reception.expected else 0.0,
+            reordered=jitter_buffer_stats.reordered,
+            duplicates=jitter_buffer_stats.duplicates,
+            late=jitter_buffer_stats.late,
+            invalid=self.invalid_packets,
+            jitter_ms=reception.jitter_ms,
+            jitter_buffer_depth_ms=jitter_buffer_stats.target_depth
+            * self._media_clock.frame_duration_ms,
+            packets_sent=(
+                self._outbound_session.packets_sent if self._outbound_session else 0
+            ),
+        )
+        if self._rtcp_session:
+            if self._rtcp_session.round_trip_time is not None:
+                stats.round_trip_time_ms = 1000 * self._rtcp_session.round_trip_time
+            remote_report = self._rtcp_session.remote_report
+            if remote_report:
+                stats.remote_loss_ratio = remote_report.fraction_lost / 256
+                stats.remote_jitter_ms = (
+                    1000 * remote_report.jitter / reception.clock_rate
+                )
+        return stats
 
     async def __aenter__(self) -> "CallManager":
         """
-        Initializes the context manager by creating a UDP socket and binding it to the specified IP and port.
+        Initializes the context manager by opening the media transport.
         This method is called when entering the context manager.
 
         :return: The instance of the Manager class.
         """
-        # Create a UDP socket
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._sock.bind((self._ip, self._port))
-        self._sock.setblocking(False)
+        await self._transport.open()
+        if self._rtcp_session:
+            await self._rtcp_session.open()
+        self._is_open = True
 
         # Initialize the playback task queue
         self._response_playback_task_queue = asyncio.Queue()
@@ -48,7 +131,7 @@ class CallManager:
     async def __aexit__(self, exc_type, exc_value, traceback) -> bool:
         """
         Handles cleanup when exiting the context manager.
-        Closes the socket and logs any exceptions that occurred.
+        Closes the media transport and logs any exceptions that occurred.
 
         :param exc_type: The type of the exception raised, if any.
         :param exc_value: The value of the exception raised, if any.
@@ -61,44 +144,85 @@ class CallManager:
 
         self.cancel_play()
 
+        # Stop the outbound stream
+        if self._outbound_session:
+            self._outbound_session.close()
+            self._outbound_session = None
+
+        if self._rtcp_session:
+            self._rtcp_session.close()
+
         # Cancel the queue worker task if it's running
         if self._queue_worker_task and not self._queue_worker_task.done():
             self._queue_worker_task.cancel()
             logger.info("Cancelled queue worker task.")
 
-        # Close the socket
-        self._sock.close()
-        self._sock = None
-        logger.info("Socket closed.")
+        # Close the media transport
+        self._transport.close()
+        self._is_open = False
 
         return True
 
+    def close(self) -> None:
+        """
+        Closes the media transports of a call manager that was never entered,
+        e.g. because setting up the call failed.
+        """
+        if self._rtcp_session:
+            self._rtcp_session.close()
+        self._transport.close()
+
     async def audio_channel(
         self, packet_size: int = 2048
     ) -> AsyncGenerator[tuple[bytes, tuple[str, int]], None]:
         """
         Asynchronous generator for receiving audio data from an RTP stream.
+        Packets pass through the jitter buffer, so the audio is yielded in sequence order
+        as fixed-size frames with lost packets filled with silence.
 
         :param packet_size: The size of the packet to receive, default is 2048 bytes.
         :rtype: AsyncGenerator[tuple[bytes, tuple[str, int]], None]
         :return: An asynchronous generator that yields tuples of audio data and the sender's address.
         """
-        if not self._sock:
-            raise RuntimeError("Socket is not initialized.")
+        if not self._is_open:
+            raise RuntimeError("Media transport is not initialized.")
         if packet_size < 12:
             raise ValueError(
                 "Packet size must be at least 12 bytes to accommodate RTP header."
             )
+        # Packets are received into one buffer and parsed in place
+        receive_buffer = memoryview(bytearray(packet_size))
+        remote_addr = None
         loop = asyncio.get_running_loop()
         while True:
-            data, addr = await loop.sock_recvfrom(self._sock, packet_size)
-            if not data:  # TODO if call muted data can be empty
+            nbytes, addr = await self._transport.recvfrom_into(receive_buffer)
+            if not nbytes:  # TODO if call muted data can be empty
                 break
-            yield data[12:], addr
+            if remote_addr is None:
+                # Stream silence back right away, so the first response is not clipped
+                self._ensure_outbound_session(addr)
+                if self._rtcp_session:
+                    # RTCP goes to the port above the peer's RTP port (RFC 3550 11)
+                    self._rtcp_session.remote_addr = (addr[0], addr[1] + 1)
+            remote_addr = addr
+            try:
+                packet = RtpPacket.parse(receive_buffer[:nbytes])
+            except ValueError as e:
+                self.invalid_packets += 1
+                logger.debug("Dropping invalid RTP packet from %s: %s", addr, e)
+                continue
+            self._reception_statistics.update(
+                packet.ssrc, packet.sequence_number, packet.timestamp, loop.time()
+            )
+            for frame in self._jitter_buffer.push(packet):
+                yield frame, addr
+
+        for frame in self._jitter_buffer.flush():
+            yield frame, remote_addr
 
     async def play_next(
         self,
-        audio_data: bytes,
+        audio_data: bytes | AsyncIterator[bytes],
         addr: tuple[str, int],
         sample_rate: int = 8000,
         frame_duration_ms: int = 20,
@@ -106,7 +230,9 @@ class CallManager:
         """
         Plays the given audio data to the specified address using RTP when the playback task queue is available.
 
-        :param audio_data: The audio data to play.
+        :param audio_data: The audio data to play, either complete or as an async iterator of u-law chunks.
+            An iterator starts playing as soon as its first frame is ready, gaps are filled with silence,
+            and cancelling the playback also cancels the iterator.
         :param addr: The address (IP, port) to send the audio data to.
         :param sample_rate: The sample rate of the audio data, default is 8000 Hz.
         :param frame_duration_ms: The duration of each audio frame in milliseconds, default is 20 ms.
@@ -168,6 +294,9 @@ class CallManager:
             try:
                 await self._current_playback_task
             except asyncio.CancelledError:
+                # Only a cancelled playback is swallowed, not the cancellation of the worker itself
+                if asyncio.current_task().cancelling():
+                    raise
                 logger.info("Playback task was cancelled.")
 
     async def _run_playback_task(self, playback_task) -> None:
@@ -189,72 +318,59 @@ class CallManager:
             return
 
         while not self._response_playback_task_queue.empty():
-            self._response_playback_task_queue.get_nowait()
+            # Close the never started playback, so its audio source is released
+            self._response_playback_task_queue.get_nowait().close()
             self._response_playback_task_queue.task_done()
 
     async def _stream_bytes_to_socket(
         self,
-        audio_data: bytes,
+        audio_data: bytes | AsyncIterator[bytes],
         addr: tuple[str, int],
         sample_rate: int = 8000,
         frame_duration_ms: int = 20,
     ) -> None:
         """
-        Streams audio data as RTP packets to the specified address.
+        Streams audio data through the call's outbound RTP session and waits until it is played out.
+        The session keeps sending silence between playbacks.
 
         :param audio_data: The audio data to stream.
         :param addr: The address (IP, port) to send the audio data to.
         :param sample_rate: The sample rate of the audio data, default is 8000 Hz.
         :param frame_duration_ms: The duration of each audio frame in milliseconds, default is 20 ms.
+        :raises ValueError: If the frame duration differs from the media clock period.
         """
-        loop = asyncio.get_running_loop()
-
-        frame_size = int(sample_rate / 1000 * frame_duration_ms)
-        rtp_header = self._generate_initial_rtp_header()
-
-        sequence_number = 0
-        timestamp = 0
-        for i in range(0, len(audio_data), frame_size):
-            payload = audio_data[i : i + frame_size]
-
-            # Update RTP header with sequence number and timestamp
-            rtp_header[2:4] = sequence_number.to_bytes(2, "big")
-            rtp_header[4:8] = timestamp.to_bytes(4, "big")
-
-            packet = rtp_header + payload
-            # logger.info(
-            #     "Sending RTP packet: seq=%d, timestamp=%d, size=%d",
-            #     sequence_number,
-            #     timestamp,
-            #     len(packet),
-            # )
-            await loop.sock_sendto(self._sock, packet, addr)
-
-            sequence_number += 1
-            timestamp += frame_size
-
-            await asyncio.sleep(frame_duration_ms / 1000)
+        if frame_duration_ms != self._media_clock.frame_duration_ms:
+            raise ValueError(
+                f"Frame duration {frame_duration_ms} ms does not match the media clock "
+                f"period {self._media_clock.frame_duration_ms} ms."
+            )
+        self._ensure_outbound_session(addr, sample_rate)
+        self._outbound_session.addr = addr
+        await self._outbound_session.play(audio_data)
 
-    def _generate_initial_rtp_header(self):
+    def _ensure_outbound_session(
+        self, addr: tuple[str, int], sample_rate: int = 8000
+    ) -> None:
         """
-        Generates an initial RTP header with a random SSRC.
+        Starts the call's outbound RTP session if it is not running yet.
 
-        :return: A bytearray representing the RTP header.
+        :param addr: The address (IP, port) to send the stream to.
+        :param sample_rate: The sample rate of the audio, default is 8000 Hz.
         """
-        ssrc = random.randint(0, 0xFFFFFFFF)
-        return bytearray(
-            [
-                0x80,  # Version 2, no padding, no extension
-                0x00,  # Payload type
-                0x00,
-                0x00,  # Sequence number
-                0x00,
-                0x00,
-                0x00,
-                0x00,  # Timestamp
-                (ssrc >> 24) & 0xFF,
-                (ssrc >> 16) & 0xFF,
-                (ssrc >> 8) & 0xFF,
-                ssrc & 0xFF,
-            ]
+        if self._outbound_session is not None:
+            return
+        self._outbound_session = OutboundRtpSession(
+            self._transport,
+            addr,
+            payload_type=self._payload_type,
+            sample_rate=sample_rate,
+            frame_duration_ms=self._media_clock.frame_duration_ms,
+        )
+        self._outbound_session.start(self._media_clock)
+        if self._rtcp_session:
+            self._rtcp_session.outbound_session = self._outbound_session
+        logger.info(
+            "Started outbound RTP stream to %s (SSRC %s)",
+            addr,
+            self._outbound_session.ssrc,
         )
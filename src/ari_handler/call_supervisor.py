@@ -0,0 +1,253 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Callable
+
+from call_worker import CallServices, run_call_worker
+
+logger = logging.getLogger(__name__)
+
+
+def split_port_range(
+    start_port: int, end_port: int, parts: int
+) -> list[tuple[int, int]]:
+    """
+    Splits an inclusive port range into contiguous sub-ranges that start on an even port,
+    so every sub-range can hold RTP/RTCP port pairs.
+
+    :param start_port: The first port of the range.
+    :param end_port: The last port of the range.
+    :param parts: The number of sub-ranges.
+    :return: The inclusive (start, end) sub-ranges.
+    :raises ValueError: If the range has less than one pair of ports per part.
+    """
+    first = start_port + start_port % 2
+    pairs = (end_port - first + 1) // 2
+    if parts < 1 or pairs < parts:
+        raise ValueError(
+            f"Port range {start_port}-{end_port} is too small for {parts} workers."
+        )
+    ranges = []
+    for i in range(parts):
+        pair_start = pairs * i // parts
+        pair_end = pairs * (i + 1) // parts
+        ranges.append((first + 2 * pair_start, first + 2 * pair_end - 1))
+    return ranges
+
+
+class _WorkerHandle:
+    """The supervisor's side of a worker process: its pipe, pending requests and calls."""
+
+    def __init__(
+        self, index: int, process: multiprocessing.Process, connection: Connection
+    ):
+        self.index = index
+        self.process = process
+        self.connection = connection
+        self.calls: set[str] = set()
+        self.pending: dict[int, asyncio.Future] = {}
+        self.alive = True
+
+
+class CallSupervisor:
+    """
+    CallSupervisor spreads calls over worker processes, so call capacity grows with the
+    number of CPU cores.
+
+    The ARI websocket stays in the parent process. Each worker gets its own slice of the
+    RTP port range, its own event loop and its own speech and LLM services, so a busy call
+    only competes with the calls of its worker. A new call goes to the worker with the
+    fewest active calls.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        ip: str,
+        start_port: int,
+        end_port: int,
+        services_factory: Callable[[], CallServices],
+        transport_type: str = "socket",
+        rtcp_enabled: bool = True,
+        use_uvloop: bool = False,
+    ):
+        """
+        Initializes the supervisor.
+
+        :param workers: The number of worker processes.
+        :param ip: The IP address the workers bind their RTP sockets to.
+        :param start_port: The first port of the RTP port range shared out among the workers.
+        :param end_port: The last port of the RTP port range.
+        :param services_factory: Creates the services of a worker, called in each worker process.
+            It must be picklable, i.e. a module-level function.
+        :param transport_type: "socket" or "protocol", the per-call transport of the workers.
+        :param rtcp_enabled: Whether the workers exchange RTCP reports, default is True.
+        :param use_uvloop: Whether the workers run on uvloop, default is False.
+        :raises ValueError: If the port range is too small for the number of workers.
+        """
+        self._port_ranges = split_port_range(start_port, end_port, workers)
+        self._ip = ip
+        self._services_factory = services_factory
+        self._transport_type = transport_type
+        self._rtcp_enabled = rtcp_enabled
+        self._use_uvloop = use_uvloop
+        # Workers are spawned, so no event loop, model or gRPC state is inherited from the parent
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: list[_WorkerHandle] = []
+        self._call_workers: dict[str, _WorkerHandle] = {}
+        self._request_ids = itertools.count()
+
+    @property
+    def load(self) -> list[int]:
+        """The number of active calls of every worker, -1 for a worker that died."""
+        return [len(w.calls) if w.alive else -1 for w in self._workers]
+
+    async def __aenter__(self) -> "CallSupervisor":
+        """Starts the worker processes."""
+        loop = asyncio.get_running_loop()
+        for index, (start_port, end_port) in enumerate(self._port_ranges):
+            parent_connection, child_connection = self._context.Pipe()
+            process = self._context.Process(
+                target=run_call_worker,
+                args=(
+                    child_connection,
+                    self._ip,
+                    start_port,
+                    end_port,
+                    self._services_factory,
+                    self._transport_type,
+                    self._rtcp_enabled,
+                    self._use_uvloop,
+                ),
+                name=f"call-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            child_connection.close()
+            worker = _WorkerHandle(index, process, parent_connection)
+            loop.add_reader(parent_connection.fileno(), self._on_readable, worker)
+            self._workers.append(worker)
+            logger.info(
+                "Started call worker %s (pid %s) with RTP ports %s-%s",
+                index,
+                process.pid,
+                start_port,
+                end_port,
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        """Asks the workers to stop and waits for them to exit."""
+        for worker in self._workers:
+            if worker.alive:
+                self._detach(worker)
+                try:
+                    worker.connection.send(("stop",))
+                except OSError:
+                    pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 10)
+            if worker.process.is_alive():
+                logger.warning(
+                    "Call worker %s did not stop, terminating it", worker.index
+                )
+                worker.process.terminate()
+            worker.connection.close()
+        self._workers = []
+        self._call_workers = {}
+
+    async def start_call(self, channel_id: str) -> int:
+        """
+        Starts a call on the least-loaded worker.
+
+        :param channel_id: The ID of the caller's channel.
+        :return: The RTP port the worker listens on for the call.
+        :raises RuntimeError: If no worker is alive or the chosen worker has no free ports.
+        """
+        request_id = next(self._request_ids)
+        while True:
+            workers = [w for w in self._workers if w.alive]
+            if not workers:
+                raise RuntimeError("No call workers are running.")
+            worker = min(workers, key=lambda w: len(w.calls))
+            try:
+                worker.connection.send(("start", request_id, channel_id))
+            except OSError:
+                # The worker died before its pipe was reported closed, try the next one
+                logger.error("Call worker %s exited unexpectedly", worker.index)
+                self._detach(worker)
+                continue
+            break
+
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[request_id] = future
+        port = await future
+
+        worker.calls.add(channel_id)
+        self._call_workers[channel_id] = worker
+        logger.info(
+            "Call %s assigned to worker %s on RTP port %s, load %s",
+            channel_id,
+            worker.index,
+            port,
+            self.load,
+        )
+        return port
+
+    def end_call(self, channel_id: str) -> None:
+        """
+        Stops a call on its worker.
+
+        :param channel_id: The ID of the caller's channel.
+        """
+        worker = self._call_workers.pop(channel_id, None)
+        if worker is None:
+            return
+        worker.calls.discard(channel_id)
+        if not worker.alive:
+            return
+        try:
+            worker.connection.send(("end", channel_id))
+        except OSError:
+            logger.error("Call worker %s exited unexpectedly", worker.index)
+            self._detach(worker)
+
+    def _on_readable(self, worker: _WorkerHandle) -> None:
+        try:
+            message = worker.connection.recv()
+        except (EOFError, OSError):
+            logger.error("Call worker %s exited unexpectedly", worker.index)
+            self._detach(worker)
+            return
+
+        command = message[0]
+        if command in ("started", "error"):
+            _, request_id, result = message
+            future = worker.pending.pop(request_id, None)
+            if future is None or future.done():
+                return
+            if command == "started":
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+        elif command == "finished":
+            channel_id = message[1]
+            if self._call_workers.get(channel_id) is worker:
+                del self._call_workers[channel_id]
+            worker.calls.discard(channel_id)
+
+    def _detach(self, worker: _WorkerHandle) -> None:
+        """Stops listening to a worker and fails its pending requests and calls."""
+        worker.alive = False
+        asyncio.get_running_loop().remove_reader(worker.connection.fileno())
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(
+                    RuntimeError(f"Call worker {worker.index} is not running.")
+                )
+        worker.pending.clear()
+        for channel_id in worker.calls:
+            self._call_workers.pop(channel_id, None)
+        worker.calls.clear()
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from multiprocessing.connection import Connection
+from typing import Callable
+
+from call_manager import CallManager
+from datagram_media_transport import DatagramMediaTransport
+from llm_service import LLMService
+from loop_monitor import LoopLagMonitor
+from main import start as start_recognizer
+from media_clock import MediaClock
+from media_transport import MediaTransport
+from port_pool import PortPool
+from socket_media_transport import SocketMediaTransport
+from speech_recognizer import SpeechRecognizer
+from speech_synthesizer import SpeechSynthesizer
+
+logger = logging.getLogger(__name__)
+
+CallServices = tuple[LLMService, SpeechRecognizer, SpeechSynthesizer]
+
+
+def lease_call_manager(
+    port_pool: PortPool,
+    ip: str,
+    media_clock: MediaClock,
+    transport_type: str = "socket",
+    rtcp_enabled: bool = True,
+) -> tuple[int, CallManager]:
+    """
+    Leases an RTP port (and the RTCP port above it) for a call and creates its CallManager.
+    The sockets are bound before Asterisk learns the port, so concurrent calls can't race for it.
+
+    :param port_pool: The pool to lease the ports from.
+    :param ip: The IP address the sockets are bound to.
+    :param media_clock: The clock pacing the outbound audio.
+    :param transport_type: "socket" (sock_recvfrom) or "protocol" (DatagramProtocol), default is "socket".
+    :param rtcp_enabled: Whether to lease an RTP/RTCP port pair and exchange RTCP reports, default is True.
+    :return: A tuple of the leased RTP port and the call manager.
+    :raises RuntimeError: If no ports are left in the pool.
+    """
+    rtcp_transport: MediaTransport | None = None
+    if rtcp_enabled:
+        port, sock, rtcp_sock = port_pool.lease_pair()
+        rtcp_transport = SocketMediaTransport(ip, port + 1, sock=rtcp_sock)
+    else:
+        port, sock = port_pool.lease()
+    if transport_type == "protocol":
+        transport = DatagramMediaTransport(ip, port, sock=sock)
+    else:
+        transport = SocketMediaTransport(ip, port, sock=sock)
+    call_manager = CallManager(
+        transport=transport, media_clock=media_clock, rtcp_transport=rtcp_transport
+    )
+    return port, call_manager
+
+
+async def warm_up_services(services: CallServices) -> None:
+    """
+    Opens the connections of the speech services, so the first call doesn't wait for them.
+
+    :param services: The LLM service, speech recognizer and speech synthesizer.
+    """
+    _, speech_recognizer, speech_synthesizer = services
+    await asyncio.gather(speech_recognizer.warm_up(), speech_synthesizer.warm_up())
+
+
+class CallWorker:
+    """
+    CallWorker runs the calls assigned to one worker process of a CallSupervisor.
+
+    It owns a disjoint RTP port range and its own speech and LLM services, and serves the
+    supervisor's requests received over a pipe:
+    ("start", request_id, channel_id) leases a port and starts the call's pipeline,
+    ("end", channel_id) stops it and ("stop",) shuts the worker down.
+    A call that ends on its own is reported back as ("finished", channel_id).
+    """
+
+    def __init__(
+        self,
+        connection: Connection,
+        ip: str,
+        start_port: int,
+        end_port: int,
+        services: CallServices,
+        transport_type: str = "socket",
+        rtcp_enabled: bool = True,
+    ):
+        """
+        Initializes the worker.
+
+        :param connection: The worker's end of the pipe to the supervisor.
+        :param ip: The IP address to bind the RTP sockets to.
+        :param start_port: The first RTP port of the worker's range.
+        :param end_port: The last RTP port of the worker's range.
+        :param services: The LLM service, speech recognizer and speech synthesizer of the worker.
+        :param transport_type: "socket" or "protocol", see lease_call_manager.
+        :param rtcp_enabled: Whether to exchange RTCP reports, default is True.
+        """
+        self._connection = connection
+        self._ip = ip
+        self._port_pool = PortPool(ip, start_port, end_port)
+        self._services = services
+        self._transport_type = transport_type
+        self._rtcp_enabled = rtcp_enabled
+        self._media_clock = MediaClock()
+        self._calls: dict[str, asyncio.Task] = {}
+        self._stopped: asyncio.Future | None = None
+        self.loop_lag_monitor = LoopLagMonitor()
+
+    async def run(self) -> None:
+        """Serves the supervisor's requests until it asks to stop or goes away."""
+        loop = asyncio.get_running_loop()
+        self._stopped = loop.create_future()
+        loop.add_reader(self._connection.fileno(), self._on_readable)
+        self.loop_lag_monitor.start()
+        await warm_up_services(self._services)
+        try:
+            await self._stopped
+        finally:
+            self.loop_lag_monitor.stop()
+            loop.remove_reader(self._connection.fileno())
+            for task in list(self._calls.values()):
+                task.cancel()
+            await asyncio.gather(*self._calls.values(), return_exceptions=True)
+
+    def _on_readable(self) -> None:
+        try:
+            message = self._connection.recv()
+        except (EOFError, OSError):
+            logger.info("Supervisor connection closed, stopping worker.")
+            self._stop()
+            return
+
+        command = message[0]
+        if command == "start":
+            _, request_id, channel_id = message
+            self._start_call(request_id, channel_id)
+        elif command == "end":
+            self._end_call(message[1])
+        elif command == "stop":
+            self._stop()
+        else:
+            logger.warning("Unknown supervisor request: %s", message)
+
+    def _start_call(self, request_id: int, channel_id: str) -> None:
+        try:
+            port, call_manager = lease_call_manager(
+                self._port_pool,
+                self._ip,
+                self._media_clock,
+                self._transport_type,
+                self._rtcp_enabled,
+            )
+        except RuntimeError as e:
+            self._connection.send(("error", request_id, str(e)))
+            return
+
+        task = asyncio.create_task(start_recognizer(call_manager, *self._services))
+        task.add_done_callback(lambda _: self._on_call_done(channel_id, port))
+        self._calls[channel_id] = task
+        logger.info("Started call %s on RTP port %s", channel_id, port)
+        self._connection.send(("started", request_id, port))
+
+    def _end_call(self, channel_id: str) -> None:
+        task = self._calls.get(channel_id)
+        if task and not task.done():
+            task.cancel()
+
+    def _on_call_done(self, channel_id: str, port: int) -> None:
+        self._calls.pop(channel_id, None)
+        self._port_pool.release(port)
+        if self._stopped and not self._stopped.done():
+            try:
+                self._connection.send(("finished", channel_id))
+            except OSError:
+                pass
+
+    def _stop(self) -> None:
+        if self._stopped and not self._stopped.done():
+            self._stopped.set_result(None)
+
+
+def run_call_worker(
+    connection: Connection,
+    ip: str,
+    start_port: int,
+    end_port: int,
+    services_factory: Callable[[], CallServices],
+    transport_type: str = "socket",
+    rtcp_enabled: bool = True,
+    use_uvloop: bool = False,
+) -> None:
+    """
+    The entry point of a worker process.
+
+    :param connection: The worker's end of the pipe to the supervisor.
+    :param ip: The IP address to bind the RTP sockets to.
+    :param start_port: The first RTP port of the worker's range.
+    :param end_port: The last RTP port of the worker's range.
+    :param services_factory: Creates the worker's services, called in the worker process,
+        so the models are loaded once per worker and never shared across processes.
+    :param transport_type: "socket" or "protocol", see lease_call_manager.
+    :param rtcp_enabled: Whether to exchange RTCP reports, default is True.
+    :param use_uvloop: Whether to run the worker on uvloop, default is False.
+    """
+    if use_uvloop:
+        import uvloop
+
+        uvloop.install()
+    services = services_factory()
+    worker = CallWorker(
+        connection,
+        ip,
+        start_port,
+        end_port,
+        services,
+        transport_type,
+        rtcp_enabled,
+    )
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
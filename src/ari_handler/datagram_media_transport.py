@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import socket
+
+from media_transport import MediaTransport
+from packet_ring_buffer import PacketRingBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class _RtpProtocol(asyncio.DatagramProtocol):
+    """Pushes received datagrams into the ring buffer of a call and wakes up its reader."""
+
+    def __init__(self, ring_buffer: PacketRingBuffer):
+        self._ring_buffer = ring_buffer
+        self._waiter: asyncio.Future | None = None
+        self._closed = False
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        self._ring_buffer.push(data, addr)
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning("RTP transport error: %s", exc)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._closed = True
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def wait_readable(self) -> bool:
+        """
+        Waits until a datagram is buffered.
+
+        :return: False if the transport was closed and nothing is buffered, True otherwise.
+        """
+        while not len(self._ring_buffer):
+            if self._closed:
+                return False
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return True
+
+
+class DatagramMediaTransport(MediaTransport):
+    """
+    DatagramMediaTransport receives a call's RTP through loop.create_datagram_endpoint.
+
+    The event loop pushes datagrams into a per-call ring buffer from its protocol callback,
+    and the reader only waits on a future when the buffer is empty, so packets that pile up
+    during a busy moment are drained without a wakeup each.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        port: int,
+        sock: socket.socket | None = None,
+        ring_buffer_capacity: int = 64,
+        packet_size: int = 2048,
+    ):
+        """
+        Initializes the transport with the address to bind the endpoint to.
+
+        :param ip: The IP address to bind the endpoint to.
+        :param port: The port number to bind the endpoint to.
+        :param sock: An already bound socket to use, e.g. one leased from a PortPool.
+        :param ring_buffer_capacity: The number of packets buffered for the call, default is 64.
+        :param packet_size: The maximum size of a packet, default is 2048 bytes.
+        """
+        self._ip = ip
+        self._port = port
+        self._sock = sock
+        self._ring_buffer = PacketRingBuffer(ring_buffer_capacity, packet_size)
+        self._transport: asyncio.DatagramTransport | None = None
+        self._protocol: _RtpProtocol | None = None
+
+    @property
+    def dropped_packets(self) -> int:
+        """The number of packets overwritten because the reader fell behind."""
+        return self._ring_buffer.dropped
+
+    async def open(self) -> None:
+        """Creates the datagram endpoint on the given socket or address."""
+        if self._transport:
+            return
+        loop = asyncio.get_running_loop()
+        if self._sock:
+            endpoint = loop.create_datagram_endpoint(
+                lambda: _RtpProtocol(self._ring_buffer), sock=self._sock
+            )
+        else:
+            endpoint = loop.create_datagram_endpoint(
+                lambda: _RtpProtocol(self._ring_buffer),
+                local_addr=(self._ip, self._port),
+            )
+        self._transport, self._protocol = await endpoint
+
+    async def recvfrom_into(
+        self, buffer: bytearray | memoryview
+    ) -> tuple[int, tuple[str, int]]:
+        """
+        Copies the oldest buffered packet into the given buffer, waiting for one if needed.
+
+        :param buffer: The preallocated buffer to copy the packet into.
+        :return: A tuple of the number of bytes copied and the sender's address.
+            Zero bytes are returned once the transport is closed.
+        :raises RuntimeError: If the transport is not initialized.
+        """
+        if not self._protocol:
+            raise RuntimeError("Datagram endpoint is not initialized.")
+        if not await self._protocol.wait_readable():
+            return 0, None
+        return self._ring_buffer.pop_into(buffer)
+
+    async def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Sends a packet through the datagram transport.
+
+        :param data: The packet to send.
+        :param addr: The address (IP, port) to send the packet to.
+        :raises RuntimeError: If the transport is not initialized.
+        """
+        if not self._transport:
+            raise RuntimeError("Datagram endpoint is not initialized.")
+        self._transport.sendto(data, addr)
+
+    def close(self) -> None:
+        """Closes the datagram transport and its socket."""
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+            logger.info("Datagram endpoint closed.")
+        elif self._sock:
+            # Never opened, the given socket is closed directly
+            self._sock.close()
+        self._sock = None
@@ -0,0 +1,128 @@
+import numpy as np
+
+from g711 import ULAW_TO_LINEAR, ULAW_TO_SQUARED
+from voice_activity_detector import VoiceActivityDetector
+
+
+class EnergyVoiceActivityDetector(VoiceActivityDetector):
+    """
+    EnergyVoiceActivityDetector classifies frames by their energy relative to an adaptive
+    noise floor, with the zero-crossing rate to keep quiet unvoiced sounds.
+
+    The noise floor is measured over the first calibration_ms of the call, then follows
+    non-speech frames, falling quickly and rising slowly. It creeps up during speech as well,
+    so a line that gets noisier does not look like endless speech for long. A frame is speech
+    if it is snr_db above the floor, or half that with a zero-crossing rate typical of
+    fricatives; it must always be louder than min_rms. Optionally, frames must also have a low spectral flatness, which rejects
+    broadband noise; the spectra are computed with one FFT per batch of frames.
+    """
+
+    def __init__(
+        self,
+        frame_duration_ms: int = 20,
+        speech_start_ms: int = 200,
+        speech_end_ms: int = 400,
+        max_utterance_ms: int = 15000,
+        min_rms: float = 30.0,
+        snr_db: float = 10.0,
+        zcr_threshold: float = 0.3,
+        floor_fall: float = 0.3,
+        floor_rise: float = 0.05,
+        floor_rise_in_speech: float = 0.002,
+        max_spectral_flatness: float | None = None,
+        calibration_ms: int = 200,
+    ):
+        """
+        Initializes the detector.
+
+        :param frame_duration_ms: The duration of each frame in milliseconds, default is 20 ms.
+        :param speech_start_ms: The speech needed to start an utterance, default is 200 ms.
+        :param speech_end_ms: The silence that ends an utterance, default is 400 ms.
+        :param max_utterance_ms: The length at which an utterance is ended regardless of silence,
+            default is 15 s.
+        :param min_rms: The RMS amplitude below which a frame is never speech, default is 30.
+        :param snr_db: The margin above the noise floor for a speech frame, default is 10 dB.
+        :param zcr_threshold: The zero-crossing rate (crossings per sample) above which a frame
+            needs only half of the margin, default is 0.3.
+        :param floor_fall: The smoothing factor when the noise floor falls, default is 0.3.
+        :param floor_rise: The smoothing factor when the noise floor rises, default is 0.05.
+        :param floor_rise_in_speech: The smoothing factor of the floor during speech, default is 0.002.
+        :param max_spectral_flatness: The spectral flatness (0 for a tone, 1 for white noise)
+            above which a frame is not speech. The spectral check is off if None, the default.
+        :param calibration_ms: The start of the call the noise floor is measured over,
+            it is never speech, default is 200 ms.
+        """
+        super().__init__(
+            frame_duration_ms, speech_start_ms, speech_end_ms, max_utterance_ms
+        )
+        self.min_energy_db = 20 * np.log10(min_rms)
+        self.snr_db = snr_db
+        self.zcr_threshold = zcr_threshold
+        self.floor_fall = floor_fall
+        self.floor_rise = floor_rise
+        self.floor_rise_in_speech = floor_rise_in_speech
+        self.max_spectral_flatness = max_spectral_flatness
+        # Starts where the threshold is min_rms, as on a clean line
+        self.noise_floor_db = self.min_energy_db - snr_db
+        self._calibration_frames = calibration_ms // frame_duration_ms
+        self._calibrated_frames = 0
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        energy_db = 10 * np.log10(np.take(ULAW_TO_SQUARED, frames).mean(axis=1) + 1.0)
+        # The sign of a µ-law sample is its top bit, so crossings need no decoding
+        negative = frames < 0x80
+        zcr = np.count_nonzero(negative[:, 1:] != negative[:, :-1], axis=1) / max(
+            frames.shape[1] - 1, 1
+        )
+        if self.max_spectral_flatness is not None:
+            tonal = spectral_flatness(frames) <= self.max_spectral_flatness
+        else:
+            tonal = np.ones(len(frames), dtype=bool)
+
+        is_speech = np.empty(len(frames), dtype=bool)
+        # The floor depends on the previous decisions, so only this loop is per frame
+        for i in range(len(frames)):
+            energy = energy_db[i]
+            if self._calibrated_frames < self._calibration_frames:
+                # The floor is the mean energy of the calibration frames
+                self._calibrated_frames += 1
+                if self._calibrated_frames == 1:
+                    self.noise_floor_db = energy
+                else:
+                    self.noise_floor_db += (
+                        energy - self.noise_floor_db
+                    ) / self._calibrated_frames
+                is_speech[i] = False
+                continue
+            margin = self.snr_db / 2 if zcr[i] >= self.zcr_threshold else self.snr_db
+            speech = (
+                energy > self.min_energy_db
+                and energy > self.noise_floor_db + margin
+                and tonal[i]
+            )
+            is_speech[i] = speech
+            self._update_noise_floor(energy, speech)
+        return is_speech
+
+    def _update_noise_floor(self, energy_db: float, is_speech: bool) -> None:
+        if energy_db < self.noise_floor_db:
+            factor = self.floor_fall
+        elif is_speech:
+            factor = self.floor_rise_in_speech
+        else:
+            factor = self.floor_rise
+        self.noise_floor_db += factor * (energy_db - self.noise_floor_db)
+
+
+def spectral_flatness(frames: np.ndarray) -> np.ndarray:
+    """
+    Computes the spectral flatness of µ-law frames: the geometric over the arithmetic mean
+    of the power spectrum, 1 for white noise and close to 0 for voiced speech.
+
+    :param frames: A uint8 array of µ-law frames, one frame per row.
+    :return: The spectral flatness of every frame.
+    """
+    samples = np.take(ULAW_TO_LINEAR, frames).astype(np.float32)
+    samples *= np.hanning(frames.shape[1]).astype(np.float32)
+    power = np.abs(np.fft.rfft(samples, axis=1)) ** 2 + 1e-6
+    return np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)
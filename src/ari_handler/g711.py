@@ -0,0 +1,146 @@
+import numpy as np
+
+
+def _decode_ulaw(code: int) -> int:
+    """Decodes one µ-law byte to a 16-bit linear sample (ITU-T G.711), as audioop.ulaw2lin does."""
+    code = ~code & 0xFF
+    magnitude = (((code & 0x0F) << 3) + 0x84) << ((code >> 4) & 0x07)
+    magnitude -= 0x84
+    return -magnitude if code & 0x80 else magnitude
+
+
+def _decode_alaw(code: int) -> int:
+    """Decodes one A-law byte to a 16-bit linear sample (ITU-T G.711), as audioop.alaw2lin does."""
+    code ^= 0x55
+    segment = (code & 0x70) >> 4
+    magnitude = ((code & 0x0F) << 1) + 1
+    if segment:
+        magnitude = (magnitude + 32) << (segment + 2)
+    else:
+        magnitude <<= 3
+    return magnitude if code & 0x80 else -magnitude
+
+
+def _encode_ulaw(samples: np.ndarray) -> np.ndarray:
+    """Encodes 16-bit linear samples to µ-law (ITU-T G.711), as audioop.lin2ulaw does."""
+    values = samples.astype(np.int32) >> 2
+    mask = np.where(values < 0, 0x7F, 0xFF)
+    values = np.minimum(np.abs(values), 8159) + (0x84 >> 2)
+    segment = np.searchsorted(
+        [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], values
+    )
+    codes = (segment << 4) | ((values >> (segment + 1)) & 0x0F)
+    return (np.where(segment >= 8, 0x7F, codes) ^ mask).astype(np.uint8)
+
+
+def _encode_alaw(samples: np.ndarray) -> np.ndarray:
+    """Encodes 16-bit linear samples to A-law (ITU-T G.711), as audioop.lin2alaw does."""
+    values = samples.astype(np.int32) >> 3
+    mask = np.where(values >= 0, 0xD5, 0x55)
+    values = np.where(values >= 0, values, -values - 1)
+    segment = np.searchsorted(
+        [0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF], values
+    )
+    shift = np.maximum(segment, 1)
+    codes = (segment << 4) | ((values >> shift) & 0x0F)
+    return (np.where(segment >= 8, 0x7F, codes) ^ mask).astype(np.uint8)
+
+
+# µ-law byte -> 16-bit linear sample
+ULAW_TO_LINEAR = np.array([_decode_ulaw(code) for code in range(256)], dtype=np.int16)
+# A-law byte -> 16-bit linear sample
+ALAW_TO_LINEAR = np.array([_decode_alaw(code) for code in range(256)], dtype=np.int16)
+# 16-bit linear sample, indexed as uint16 -> µ-law / A-law byte
+_ALL_SAMPLES = np.arange(65536, dtype=np.uint16).view(np.int16)
+LINEAR_TO_ULAW = _encode_ulaw(_ALL_SAMPLES)
+LINEAR_TO_ALAW = _encode_alaw(_ALL_SAMPLES)
+# µ-law byte -> squared amplitude, so a frame's energy needs no decoding or float casts
+ULAW_TO_SQUARED = ULAW_TO_LINEAR.astype(np.float64) ** 2
+
+
+def ulaw_energy(frame: bytes | bytearray | memoryview) -> float:
+    """
+    Computes the mean squared amplitude of a µ-law frame.
+
+    :param frame: The µ-law encoded frame.
+    :return: The mean of the squared 16-bit linear samples, 0.0 for an empty frame.
+    """
+    codes = np.frombuffer(frame, dtype=np.uint8)
+    if not codes.size:
+        return 0.0
+    # A histogram of the codes weighted by the table beats decoding every sample
+    return float(np.bincount(codes, minlength=256) @ ULAW_TO_SQUARED) / codes.size
+
+
+def ulaw_rms(frame: bytes | bytearray | memoryview) -> float:
+    """
+    Computes the RMS amplitude of a µ-law frame on the 16-bit linear scale.
+
+    :param frame: The µ-law encoded frame.
+    :return: The RMS amplitude.
+    """
+    return float(np.sqrt(ulaw_energy(frame)))
+
+
+def ulaw_rms_frames(
+    frames: bytes | bytearray | memoryview | np.ndarray, frame_size: int = 160
+) -> np.ndarray:
+    """
+    Computes the RMS amplitude of many µ-law frames at once, e.g. consecutive frames of
+    one call or the current frame of many calls.
+
+    :param frames: Either the concatenated frames, or a uint8 array with one frame per row.
+    :param frame_size: The size of each frame when the frames are concatenated, default is 160 bytes.
+    :return: The RMS amplitude of every frame.
+    :raises ValueError: If the concatenated frames are not a multiple of frame_size long.
+    """
+    if isinstance(frames, np.ndarray):
+        codes = frames
+    else:
+        codes = np.frombuffer(frames, dtype=np.uint8)
+        if codes.size % frame_size:
+            raise ValueError(
+                f"Audio length {codes.size} is not a multiple of the frame size {frame_size}."
+            )
+        codes = codes.reshape(-1, frame_size)
+    return np.sqrt(np.take(ULAW_TO_SQUARED, codes).mean(axis=-1))
+
+
+def ulaw_to_linear(data: bytes | bytearray | memoryview) -> np.ndarray:
+    """
+    Decodes µ-law audio to 16-bit linear samples.
+
+    :param data: The µ-law encoded audio.
+    :return: The int16 samples.
+    """
+    return np.take(ULAW_TO_LINEAR, np.frombuffer(data, dtype=np.uint8))
+
+
+def alaw_to_linear(data: bytes | bytearray | memoryview) -> np.ndarray:
+    """
+    Decodes A-law audio to 16-bit linear samples.
+
+    :param data: The A-law encoded audio.
+    :return: The int16 samples.
+    """
+    return np.take(ALAW_TO_LINEAR, np.frombuffer(data, dtype=np.uint8))
+
+
+def linear_to_ulaw(samples: np.ndarray) -> np.ndarray:
+    """
+    Encodes 16-bit linear samples to µ-law.
+
+    :param samples: The int16 samples.
+    :return: The µ-law bytes as a uint8 array.
+    """
+    return np.take(LINEAR_TO_ULAW, samples.astype(np.int16, copy=False).view(np.uint16))
+
+
+def linear_to_alaw(samples: np.ndarray) -> np.ndarray:
+    """
+    Encodes 16-bit linear samples to A-law.
+
+    :param samples: The int16 samples.
+    :return: The A-law bytes as a uint8 array.
+    """
+    return np.take(LINEAR_TO_ALAW, samples.astype(np.int16, copy=False).view(np.uint16))
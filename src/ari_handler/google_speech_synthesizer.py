@@ -9,11 +9,23 @@ from speech_synthesizer import SpeechSynthesizer
 class GoogleSpeechSynthesizer(SpeechSynthesizer):
     """Google Speech Synthesizer."""
 
+    def __init__(self, lang: str = "ru"):
+        """
+        Initializes the synthesizer.
+
+        :param lang: The language of the voice, default is 'ru'.
+        """
+        self.lang = lang
+
+    @property
+    def cache_key(self) -> str:
+        return f"google:{self.lang}"
+
     def _synthesize_sync(self, text: str) -> bytes:
         """
         Synthesize text to audio using Google Speech Synthesizer.
         """
-        tts = gTTS(text, lang="ru")
+        tts = gTTS(text, lang=self.lang)
         buffer = io.BytesIO()
         tts.write_to_fp(buffer)
         return buffer.getvalue()
@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+import json
+import logging
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+# Retries a call the server refused before any response, e.g. on a connection that just broke
+RETRY_SERVICE_CONFIG = json.dumps(
+    {
+        "methodConfig": [
+            {
+                "name": [{}],
+                "retryPolicy": {
+                    "maxAttempts": 3,
+                    "initialBackoff": "0.05s",
+                    "maxBackoff": "0.5s",
+                    "backoffMultiplier": 2,
+                    "retryableStatusCodes": ["UNAVAILABLE"],
+                },
+            }
+        ]
+    }
+)
+
+
+class GrpcChannelPool:
+    """
+    GrpcChannelPool keeps a few long-lived gRPC channels to one target.
+
+    Every channel has its own HTTP/2 connection, so the concurrent streams of many calls
+    are spread over `size` connections instead of queueing behind one connection's stream
+    limit. Keepalive pings keep idle connections open through NATs and load balancers
+    and detect dead ones. A channel that reconnects by itself is skipped meanwhile,
+    and one a call reported broken is replaced.
+
+    gRPC aio channels belong to the event loop they are created on, so the channels are
+    created on first use, inside the loop.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        size: int = 2,
+        credentials: grpc.ChannelCredentials | None = None,
+        keepalive_time_ms: int = 30000,
+        keepalive_timeout_ms: int = 10000,
+    ):
+        """
+        Initializes the pool.
+
+        :param target: The host:port of the service.
+        :param size: The number of channels, default is 2.
+        :param credentials: The channel credentials, default is SSL with the system roots.
+        :param keepalive_time_ms: The interval of the keepalive pings, default is 30 s.
+        :param keepalive_timeout_ms: How long a ping may go unanswered before the connection
+            is considered dead, default is 10 s.
+        """
+        self.target = target
+        self.size = size
+        self._credentials = credentials or grpc.ssl_channel_credentials()
+        self._options = [
+            ("grpc.keepalive_time_ms", keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            # Without it, channels with equal arguments share one connection
+            ("grpc.use_local_subchannel_pool", 1),
+            ("grpc.enable_retries", 1),
+            ("grpc.service_config", RETRY_SERVICE_CONFIG),
+        ]
+        self._channels: list[grpc.aio.Channel | None] = [None] * size
+        self._next = itertools.cycle(range(size))
+        # The closing of replaced channels, kept until done
+        self._closing: set[asyncio.Task] = set()
+
+    def get(self) -> grpc.aio.Channel:
+        """
+        Returns the next usable channel, round-robin.
+
+        :return: A channel, connected or connecting.
+        """
+        fallback = None
+        for _ in range(self.size):
+            index = next(self._next)
+            channel = self._channel(index)
+            state = channel.get_state(try_to_connect=True)
+            if state != grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+                return channel
+            fallback = fallback or channel
+        # All channels are reconnecting, the retry policy covers the wait
+        return fallback
+
+    def discard(self, channel: grpc.aio.Channel) -> None:
+        """
+        Replaces a channel a call failed on as unavailable.
+        The calls still running on it are given time to finish.
+
+        :param channel: The broken channel.
+        """
+        for index, pooled in enumerate(self._channels):
+            if pooled is channel:
+                logger.warning("Replacing gRPC channel %s to %s", index, self.target)
+                self._channels[index] = None
+                task = asyncio.create_task(channel.close(grace=5.0))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+                return
+
+    async def warm_up(self, timeout: float = 5.0) -> None:
+        """
+        Connects all channels, so the first calls don't pay the TCP, TLS and HTTP/2 handshakes.
+
+        :param timeout: How long to wait for the connections, default is 5 s.
+        """
+        channels = [self._channel(index) for index in range(self.size)]
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(channel.channel_ready() for channel in channels)),
+                timeout,
+            )
+            logger.info("Connected %s gRPC channels to %s", self.size, self.target)
+        except asyncio.TimeoutError:
+            # Not fatal, the channels keep connecting in the background
+            logger.warning(
+                "gRPC channels to %s not ready after %s s", self.target, timeout
+            )
+
+    async def close(self) -> None:
+        """Closes all channels, including the replaced ones still closing."""
+        channels, self._channels = self._channels, [None] * self.size
+        results = await asyncio.gather(
+            *(channel.close() for channel in channels if channel is not None),
+            *self._closing,
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Failed to close a gRPC channel to %s: %s", self.target, result
+                )
+
+    def _channel(self, index: int) -> grpc.aio.Channel:
+        channel = self._channels[index]
+        if channel is None:
+            channel = grpc.aio.secure_channel(
+                self.target, self._credentials, options=self._options
+            )
+            self._channels[index] = channel
+        return channel
+
+
+class GrpcChannelManager:
+    """
+    GrpcChannelManager holds the channel pools of all gRPC services a process talks to,
+    so e.g. the speech recognizer and synthesizer share their connections' lifecycle.
+    """
+
+    def __init__(self, size: int = 2, **pool_options):
+        """
+        Initializes the manager.
+
+        :param size: The number of channels per target, default is 2.
+        :param pool_options: Further GrpcChannelPool arguments, e.g. keepalive_time_ms.
+        """
+        self._size = size
+        self._pool_options = pool_options
+        self._pools: dict[str, GrpcChannelPool] = {}
+
+    def pool(self, target: str) -> GrpcChannelPool:
+        """
+        Returns the channel pool of a target, creating it on first use.
+
+        :param target: The host:port of the service.
+        """
+        if target not in self._pools:
+            self._pools[target] = GrpcChannelPool(
+                target, self._size, **self._pool_options
+            )
+        return self._pools[target]
+
+    def get(self, target: str) -> grpc.aio.Channel:
+        """
+        Returns a channel to a target.
+
+        :param target: The host:port of the service.
+        """
+        return self.pool(target).get()
+
+    def discard(self, target: str, channel: grpc.aio.Channel) -> None:
+        """
+        Replaces a channel a call failed on as unavailable.
+
+        :param target: The host:port of the service.
+        :param channel: The broken channel.
+        """
+        self.pool(target).discard(channel)
+
+    async def warm_up(self, *targets: str, timeout: float = 5.0) -> None:
+        """
+        Connects the channels of the given targets.
+
+        :param targets: The host:port of the services.
+        :param timeout: How long to wait for the connections, default is 5 s.
+        """
+        await asyncio.gather(
+            *(self.pool(target).warm_up(timeout) for target in targets)
+        )
+
+    async def close(self) -> None:
+        """Closes the channels of all targets."""
+        await asyncio.gather(*(pool.close() for pool in self._pools.values()))
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from speech_recognizer import (
+    RecognitionResult,
+    RecognitionSession,
+    StreamingSpeechRecognizer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HedgeStats:
+    """Data class to represent which engine answered the utterances of a HedgedSpeechRecognizer."""
+
+    primary_results: int = 0
+    # The primary was late, failed, had nothing or was left out; the fallback's transcript was used
+    fallback_results: int = 0
+    primary_timeouts: int = 0
+    primary_errors: int = 0
+    # Utterances the primary was not asked for, while it was considered down
+    primary_skipped: int = 0
+
+
+class HedgedRecognitionSession(RecognitionSession):
+    """
+    HedgedRecognitionSession feeds every utterance of a call to both engines of a
+    HedgedSpeechRecognizer at once, see there for how the transcript is picked.
+    """
+
+    def __init__(
+        self,
+        recognizer: "HedgedSpeechRecognizer",
+        primary: RecognitionSession,
+        fallback: RecognitionSession,
+    ):
+        """
+        Initializes the session.
+
+        :param recognizer: The recognizer holding the policy and the primary's health.
+        :param primary: The primary engine's session of the call.
+        :param fallback: The fallback engine's session of the call.
+        """
+        self._recognizer = recognizer
+        self._primary = primary
+        self._fallback = fallback
+        # Whether the primary takes part in the current utterance, decided when it starts
+        self._use_primary: bool | None = None
+        # The fallback's finish() of an utterance the primary answered, completing unawaited
+        self._fallback_finishing: asyncio.Task | None = None
+
+    async def accept(
+        self, ulaw_data: bytes | memoryview
+    ) -> Optional[RecognitionResult]:
+        """
+        Feeds the next audio of the current utterance to both engines.
+
+        :param ulaw_data: Audio data in u-law format.
+        :return: A new partial hypothesis of the fallback engine, which is always fed,
+            so the partials of an utterance come from one engine.
+        """
+        if self._use_primary is None:
+            await self._settle_fallback()
+            self._use_primary = self._recognizer.primary_available()
+        if self._use_primary:
+            try:
+                await self._primary.accept(ulaw_data)
+            except Exception:
+                logger.exception("Primary recognizer failed, using the fallback")
+                self._recognizer.report_primary_failure(timeout=False)
+                self._use_primary = False
+                await self._reset_primary()
+        return await self._fallback.accept(ulaw_data)
+
+    async def finish(self) -> Optional[str]:
+        """
+        Ends the current utterance on both engines.
+
+        :return: The primary's transcript if it came within the recognizer's timeout,
+            otherwise the fallback's.
+        """
+        use_primary, self._use_primary = self._use_primary, None
+        await self._settle_fallback()
+        fallback_task = asyncio.create_task(self._fallback.finish())
+        if not use_primary:
+            return await self._fallback_result(fallback_task)
+
+        primary_task = asyncio.create_task(self._primary.finish())
+        try:
+            text = await asyncio.wait_for(
+                asyncio.shield(primary_task), self._recognizer.primary_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Primary recognizer took over %s s, using the fallback",
+                self._recognizer.primary_timeout,
+            )
+            self._recognizer.report_primary_failure(timeout=True)
+            primary_task.cancel()
+            await asyncio.gather(primary_task, return_exceptions=True)
+            await self._reset_primary()
+            return await self._fallback_result(fallback_task)
+        except Exception:
+            logger.exception("Primary recognizer failed, using the fallback")
+            self._recognizer.report_primary_failure(timeout=False)
+            await self._reset_primary()
+            return await self._fallback_result(fallback_task)
+
+        self._recognizer.report_primary_success()
+        if not text:
+            return await self._fallback_result(fallback_task)
+        # The fallback's transcript is not needed, but its finish() is left to complete,
+        # so its decoder is not reset while still decoding; the next utterance waits for it
+        self._fallback_finishing = fallback_task
+        self._recognizer.stats.primary_results += 1
+        return text
+
+    async def reset(self) -> None:
+        """Drops the current utterance on both engines."""
+        if self._use_primary:
+            await self._reset_primary()
+        self._use_primary = None
+        await self._settle_fallback()
+        await self._fallback.reset()
+
+    async def close(self) -> None:
+        """Closes the sessions of both engines."""
+        await self._settle_fallback()
+        await asyncio.gather(
+            self._primary.close(), self._fallback.close(), return_exceptions=True
+        )
+        logger.info("Hedged recognition stats: %s", self._recognizer.stats)
+
+    async def _fallback_result(self, fallback_task: asyncio.Task) -> Optional[str]:
+        text = await fallback_task
+        if text:
+            self._recognizer.stats.fallback_results += 1
+        return text
+
+    async def _settle_fallback(self) -> None:
+        if self._fallback_finishing is None:
+            return
+        task, self._fallback_finishing = self._fallback_finishing, None
+        await asyncio.wait([task])
+        if not task.cancelled() and task.exception():
+            logger.error(
+                "Fallback recognizer failed on an utterance the primary answered: %s",
+                task.exception(),
+            )
+
+    async def _reset_primary(self) -> None:
+        try:
+            await self._primary.reset()
+        except Exception:
+            logger.exception("Failed to reset the primary recognition session")
+
+
+class HedgedSpeechRecognizer(StreamingSpeechRecognizer):
+    """
+    HedgedSpeechRecognizer runs two speech recognizers on the same audio and answers with the
+    preferred one's transcript only while it is fast enough, e.g. a cloud engine as the
+    primary and a local engine as the fallback.
+
+    Both engines are fed while the caller speaks. When the utterance ends, the primary has
+    primary_timeout_ms to deliver its transcript; if it is late, fails or has nothing, the
+    fallback's transcript is used, which is usually ready by then. This bounds the turn's
+    recognition latency by the timeout even when the primary's tail latency spikes.
+
+    After max_failures consecutive timeouts or errors the primary is considered down and is
+    not fed at all for cooldown_s, then it is tried again.
+    """
+
+    def __init__(
+        self,
+        primary: StreamingSpeechRecognizer,
+        fallback: StreamingSpeechRecognizer,
+        primary_timeout_ms: int = 400,
+        max_failures: int = 3,
+        cooldown_s: float = 30.0,
+    ):
+        """
+        Initializes the recognizer.
+
+        :param primary: The preferred recognizer, e.g. YandexSpeechRecognizer.
+        :param fallback: The recognizer answering when the primary can't, e.g. KaldiSpeechRecognizer.
+        :param primary_timeout_ms: How long the primary's transcript is waited for once the
+            utterance has ended, default is 400 ms.
+        :param max_failures: The consecutive timeouts or errors after which the primary is
+            considered down, default is 3.
+        :param cooldown_s: How long a primary considered down is left out, default is 30 s.
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.primary_timeout = primary_timeout_ms / 1000
+        self._max_failures = max_failures
+        self._cooldown = cooldown_s
+        self._failures = 0
+        self._down_until = 0.0
+        self.stats = HedgeStats()
+
+    def primary_available(self) -> bool:
+        """Whether the primary should take part in the next utterance."""
+        if asyncio.get_running_loop().time() < self._down_until:
+            self.stats.primary_skipped += 1
+            return False
+        return True
+
+    def report_primary_success(self) -> None:
+        """Records that the primary answered in time."""
+        self._failures = 0
+
+    def report_primary_failure(self, timeout: bool) -> None:
+        """
+        Records that the primary was late or failed, and leaves it out for a while if it keeps on.
+
+        :param timeout: Whether the primary was late rather than failing.
+        """
+        if timeout:
+            self.stats.primary_timeouts += 1
+        else:
+            self.stats.primary_errors += 1
+        self._failures += 1
+        if self._failures >= self._max_failures:
+            logger.warning(
+                "Primary recognizer failed %s times in a row, using the fallback for %s s",
+                self._failures,
+                self._cooldown,
+            )
+            self._failures = 0
+            self._down_until = asyncio.get_running_loop().time() + self._cooldown
+
+    async def warm_up(self) -> None:
+        """Opens the connections of both engines."""
+        await asyncio.gather(self.primary.warm_up(), self.fallback.warm_up())
+
+    async def create_session(self) -> HedgedRecognitionSession:
+        """
+        Creates the recognition session of a call.
+
+        :return: The session, feeding both engines.
+        """
+        primary, fallback = await asyncio.gather(
+            self.primary.create_session(), self.fallback.create_session()
+        )
+        return HedgedRecognitionSession(self, primary, fallback)
+
+    async def recognize(self, ulaw_data: bytes | memoryview) -> Optional[str]:
+        """
+        Recognizes speech from the given u-law audio data.
+
+        :param ulaw_data: Audio data in u-law format.
+        :return: Recognized text or None if recognition fails.
+        """
+        async with await self.create_session() as session:
+            await session.accept(ulaw_data)
+            return await session.finish()
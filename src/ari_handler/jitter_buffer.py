@@ -0,0 +1,190 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+
+from rtp_packet import RtpPacket
+
+logger = logging.getLogger(__name__)
+
+# Sequence numbers further ahead than this are treated as a restarted stream
+MAX_SEQUENCE_JUMP = 3000
+# In-order packets needed before the target depth is lowered again
+STABLE_PACKETS_TO_SHRINK = 500
+
+
+@dataclass
+class JitterBufferStats:
+    """Data class to represent the counters of a jitter buffer."""
+
+    received: int = 0
+    duplicates: int = 0
+    reordered: int = 0
+    late: int = 0
+    lost: int = 0
+    resets: int = 0
+    target_depth: int = 0
+
+
+class JitterBuffer:
+    """
+    JitterBuffer restores the order of inbound RTP packets of a single call.
+
+    Packets are released by sequence number. Duplicates are dropped, and a missing packet
+    is declared lost and filled with silence once more packets than the current target depth
+    are waiting behind it. The target depth grows when packets arrive after their slot was
+    filled and shrinks back after a stable period, so the added latency stays within
+    max_delay_ms. The released audio is re-cut into fixed-size frames.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 8000,
+        frame_duration_ms: int = 20,
+        min_delay_ms: int = 20,
+        max_delay_ms: int = 200,
+        fill_byte: int = 0xFF,
+    ):
+        """
+        Initializes the jitter buffer.
+
+        :param sample_rate: The sample rate of the audio, default is 8000 Hz.
+        :param frame_duration_ms: The duration of each emitted frame, default is 20 ms.
+        :param min_delay_ms: The minimum delay a gap is waited for, default is 20 ms.
+        :param max_delay_ms: The maximum delay a gap is waited for, default is 200 ms.
+        :param fill_byte: The byte used to fill lost audio, default is µ-law silence (0xFF).
+        """
+        self._frame_size = int(sample_rate / 1000 * frame_duration_ms)
+        self._min_depth = max(1, min_delay_ms // frame_duration_ms)
+        self._max_depth = max(self._min_depth, max_delay_ms // frame_duration_ms)
+        self._fill_byte = fill_byte
+
+        self._packets: dict[int, bytes | memoryview] = {}
+        self._concealed: deque[int] = deque(maxlen=64)
+        self._output = bytearray()
+        self._ssrc: int | None = None
+        self._next_seq: int | None = None
+        self._highest_seq: int | None = None
+        self._last_payload_size = self._frame_size
+        self._stable_packets = 0
+
+        self.stats = JitterBufferStats(target_depth=self._min_depth)
+
+    def push(self, packet: RtpPacket) -> list[bytes]:
+        """
+        Adds a received packet to the buffer.
+
+        :param packet: The received RTP packet.
+        :return: The frames that became ready for playout, in order.
+        """
+        self.stats.received += 1
+
+        if self._ssrc != packet.ssrc or self._next_seq is None:
+            self._reset(packet)
+
+        seq = packet.sequence_number
+        ahead = (seq - self._next_seq) & 0xFFFF
+        if ahead >= 0x8000:
+            # The packet is older than the playout point
+            if seq in self._concealed:
+                self.stats.late += 1
+                self._grow()
+            else:
+                self.stats.duplicates += 1
+            return []
+        if ahead > MAX_SEQUENCE_JUMP:
+            logger.info("RTP sequence jumped by %s, resetting jitter buffer", ahead)
+            self._reset(packet)
+        if seq in self._packets:
+            self.stats.duplicates += 1
+            return []
+
+        if (seq - self._highest_seq) & 0xFFFF >= 0x8000:
+            self.stats.reordered += 1
+        else:
+            self._highest_seq = seq
+
+        if ahead == 0:
+            # In-order fast path: the payload goes straight from the packet buffer to the output
+            self._emit(packet.payload)
+            self._next_seq = (self._next_seq + 1) & 0xFFFF
+        else:
+            # The packet buffer is reused by the caller, so out-of-order payloads are copied
+            self._packets[seq] = bytes(packet.payload)
+
+        self._release()
+        return self._take_frames()
+
+    def flush(self) -> list[bytes]:
+        """
+        Releases everything still buffered, filling gaps and padding the last frame with silence.
+
+        :return: The remaining frames, in order.
+        """
+        while self._packets:
+            self._release_next()
+        remainder = len(self._output) % self._frame_size
+        if remainder:
+            self._output += bytes([self._fill_byte]) * (self._frame_size - remainder)
+        return self._take_frames()
+
+    def _reset(self, packet: RtpPacket) -> None:
+        """Starts following a new stream after releasing what is left of the previous one."""
+        if self._ssrc is not None:
+            self.stats.resets += 1
+        while self._packets:
+            self._release_next()
+        self._concealed.clear()
+        self._ssrc = packet.ssrc
+        self._next_seq = packet.sequence_number
+        self._highest_seq = packet.sequence_number
+
+    def _release(self) -> None:
+        """Releases packets in sequence order while the next one is present or given up on."""
+        while self._packets and (
+            self._next_seq in self._packets
+            or len(self._packets) > self.stats.target_depth
+        ):
+            self._release_next()
+
+    def _release_next(self) -> None:
+        payload = self._packets.pop(self._next_seq, None)
+        if payload is None:
+            # The packet is lost, fill its slot with silence of the last seen packet size
+            self.stats.lost += 1
+            self._concealed.append(self._next_seq)
+            self._output += bytes([self._fill_byte]) * self._last_payload_size
+            self._stable_packets = 0
+        else:
+            self._emit(payload)
+        self._next_seq = (self._next_seq + 1) & 0xFFFF
+
+    def _emit(self, payload: bytes | memoryview) -> None:
+        self._output += payload
+        self._last_payload_size = len(payload) or self._last_payload_size
+        self._stable_packets += 1
+        if self._stable_packets >= STABLE_PACKETS_TO_SHRINK:
+            self._shrink()
+
+    def _grow(self) -> None:
+        if self.stats.target_depth < self._max_depth:
+            self.stats.target_depth += 1
+            logger.info("Jitter buffer depth raised to %s", self.stats.target_depth)
+        self._stable_packets = 0
+
+    def _shrink(self) -> None:
+        if self.stats.target_depth > self._min_depth:
+            self.stats.target_depth -= 1
+            logger.info("Jitter buffer depth lowered to %s", self.stats.target_depth)
+        self._stable_packets = 0
+
+    def _take_frames(self) -> list[bytes]:
+        ready = len(self._output) - len(self._output) % self._frame_size
+        if not ready:
+            return []
+        with memoryview(self._output) as output:
+            frames = [
+                bytes(output[i : i + self._frame_size])
+                for i in range(0, ready, self._frame_size)
+            ]
+        del self._output[:ready]
+        return frames
@@ -1,27 +1,449 @@
-import audioop
+import asyncio
+import itertools
 import json
 import logging
+import multiprocessing
 import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Optional
 
-from speech_recognizer import SpeechRecognizer
+from g711 import ulaw_to_linear
+from polyphase_resampler import PolyphaseResampler
+from speech_recognizer import (
+    RecognitionResult,
+    RecognitionSession,
+    StreamingSpeechRecognizer,
+)
 from vosk import KaldiRecognizer, Model
 
 logger = logging.getLogger(__name__)
 
+# The rate of the µ-law audio from the RTP stream
+INPUT_SAMPLE_RATE = 8000
 
-class KaldiSpeechRecognizer(SpeechRecognizer):
+# The model and decoders of a decoding process, the model is loaded by its initializer
+_process_model: Model | None = None
+_process_decoders: dict[int, KaldiRecognizer] = {}
+
+
+def model_sample_rate(model_path: str, default: int = 16000) -> int:
+    """
+    Reads the sample rate a Vosk model was trained on from its feature config.
+
+    :param model_path: Path to the Vosk model directory.
+    :param default: The rate assumed when the config does not name one, default is 16000 Hz.
+    :return: The sample rate in Hz, e.g. 8000 for the telephony models.
+    """
+    for config in ("mfcc.conf", "fbank.conf", "model.conf"):
+        try:
+            with open(os.path.join(model_path, "conf", config)) as f:
+                for line in f:
+                    key, _, value = line.strip().partition("=")
+                    if key == "--sample-frequency":
+                        return int(float(value))
+        except FileNotFoundError:
+            continue
+    return default
+
+
+def _decode_step(
+    recognizer: KaldiRecognizer, pcm_audio: bytes, want_partial: bool
+) -> tuple[str | None, str | None]:
+    """
+    Feeds audio to a decoder.
+
+    :return: A tuple of the text of a segment Vosk found an endpoint after, if any,
+        and the current partial hypothesis if requested.
+    """
+    if recognizer.AcceptWaveform(pcm_audio):
+        return json.loads(recognizer.Result()).get("text", ""), None
+    if want_partial:
+        return None, json.loads(recognizer.PartialResult()).get("partial", "")
+    return None, None
+
+
+def _decode_final(recognizer: KaldiRecognizer) -> str:
+    """Finishes the utterance of a decoder and resets it for the next one."""
+    text = json.loads(recognizer.FinalResult()).get("text", "")
+    recognizer.Reset()
+    return text
+
+
+def _init_process(model_path: str) -> None:
+    global _process_model
+    _process_model = Model(model_path)
+
+
+def _process_create(decoder_id: int, sample_rate: int) -> None:
+    _process_decoders[decoder_id] = KaldiRecognizer(_process_model, sample_rate)
+
+
+def _process_step(
+    decoder_id: int, pcm_audio: bytes, want_partial: bool
+) -> tuple[str | None, str | None]:
+    return _decode_step(_process_decoders[decoder_id], pcm_audio, want_partial)
+
+
+def _process_final(decoder_id: int) -> str:
+    return _decode_final(_process_decoders[decoder_id])
+
+
+def _process_reset(decoder_id: int) -> None:
+    _process_decoders[decoder_id].Reset()
+
+
+class KaldiDecoder:
+    """
+    KaldiDecoder runs one KaldiRecognizer in the pool's executor: on the event loop,
+    in a thread, or in the decoding process the decoder was created in.
+
+    A KaldiRecognizer is not thread-safe, so the jobs of a decoder run one after another.
+    Cancelling a caller does not stop its job, which keeps running in the executor; the next
+    job, e.g. the reset before the decoder is returned to the pool, waits for it to complete.
+    """
+
+    def __init__(
+        self,
+        pool: "KaldiRecognizerPool",
+        executor: Executor | None,
+        recognizer: KaldiRecognizer | None = None,
+        decoder_id: int | None = None,
+    ):
+        """
+        Initializes the decoder, either with a local recognizer or with the ID of a recognizer
+        living in the process behind the executor.
+        """
+        self._pool = pool
+        self.executor = executor
+        self._recognizer = recognizer
+        self._decoder_id = decoder_id
+        self._lock = asyncio.Lock()
+        # The latest job, possibly still running for a cancelled caller
+        self._job: asyncio.Future | None = None
+
+    async def step(
+        self, pcm_audio: bytes, want_partial: bool
+    ) -> tuple[str | None, str | None]:
+        if self._recognizer is None:
+            return await self._run(
+                _process_step, self._decoder_id, pcm_audio, want_partial
+            )
+        return await self._run(_decode_step, self._recognizer, pcm_audio, want_partial)
+
+    async def final(self) -> str:
+        if self._recognizer is None:
+            return await self._run(_process_final, self._decoder_id)
+        return await self._run(_decode_final, self._recognizer)
+
+    async def reset(self) -> None:
+        if self._recognizer is None:
+            await self._run(_process_reset, self._decoder_id)
+        else:
+            await self._run(self._recognizer.Reset)
+
+    async def _run(self, function, *args):
+        async with self._lock:
+            if self._job is not None:
+                await asyncio.wait([self._job])
+            self._job = asyncio.ensure_future(
+                self._pool.run(self.executor, function, *args)
+            )
+            return await asyncio.shield(self._job)
+
+
+class KaldiRecognizerPool:
+    """
+    KaldiRecognizerPool hands out KaldiRecognizer decoders over one shared Vosk model.
+
+    Decoders are created on demand up to max_size and reused afterwards; a returned decoder
+    is reset, so no state leaks from one utterance into the next. When all decoders are
+    in use, acquire() waits for one to be returned.
+
+    Decoding runs in an executor, so a long utterance does not block the event loop:
+    "thread" uses a thread pool (Vosk releases the GIL while decoding), "process" uses
+    spawned decoding processes that each load the model, each decoder staying in the
+    process it was created in, and "inline" decodes on the event loop.
+    At most max_pending decoding jobs are queued, further callers wait.
+    """
+
+    def __init__(
+        self,
+        model: Model | None,
+        max_size: int = 16,
+        sample_rate: int = 16000,
+        executor: str = "thread",
+        workers: int = 4,
+        max_pending: int = 64,
+        model_path: str | None = None,
+    ):
+        """
+        Initializes the pool.
+
+        :param model: The loaded Vosk model shared by all decoders, None with the process executor.
+        :param max_size: The maximum number of decoders, default is 16.
+        :param sample_rate: The sample rate the decoders expect, default is 16000 Hz.
+        :param executor: "thread", "process" or "inline", default is "thread".
+        :param workers: The number of decoding threads or processes, default is 4.
+        :param max_pending: The maximum number of queued decoding jobs, default is 64.
+        :param model_path: The model directory every decoding process loads,
+            required with the process executor.
+        :raises ValueError: If the executor is unknown or the process executor has no model_path.
+        """
+        self.max_size = max_size
+        self.sample_rate = sample_rate
+        self._model = model
+        self._idle: list[KaldiDecoder] = []
+        self._size = 0
+        self._available = asyncio.Semaphore(max_size)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._decoder_ids = itertools.count()
+        self._executors: list[Executor | None]
+
+        if executor == "inline":
+            self._executors = [None]
+        elif executor == "thread":
+            self._executors = [
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kaldi")
+            ]
+        elif executor == "process":
+            if model_path is None:
+                raise ValueError("The process executor needs the model_path.")
+            # Spawned, as the event loop and other threads are already running and must not
+            # be forked; the processes start on warm_up() or the first decoder
+            context = multiprocessing.get_context("spawn")
+            # One process per executor, so a decoder always runs where its state lives
+            self._executors = [
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=context,
+                    initializer=_init_process,
+                    initargs=(model_path,),
+                )
+                for _ in range(workers)
+            ]
+        else:
+            raise ValueError(f"Unknown Kaldi executor '{executor}'.")
+        self._decoders_per_executor = [0] * len(self._executors)
+        self._process = executor == "process"
+
+    @property
+    def in_use(self) -> int:
+        """The number of decoders currently acquired."""
+        return self._size - len(self._idle)
+
+    async def acquire(self) -> KaldiDecoder:
+        """
+        Takes an idle decoder, creating one if the pool is not full.
+
+        :return: A decoder in its initial state.
+        """
+        if self._available.locked():
+            logger.warning(
+                "All %s Kaldi decoders are in use, waiting for one", self.max_size
+            )
+        await self._available.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await self._create_decoder()
+        except BaseException:
+            self._available.release()
+            raise
+
+    async def release(self, decoder: KaldiDecoder, reset: bool = True) -> None:
+        """
+        Returns a decoder to the pool.
+
+        :param decoder: The decoder taken with acquire().
+        :param reset: Whether the decoder still has to be reset, default is True.
+        """
+        try:
+            if reset:
+                await decoder.reset()
+        except BaseException:
+            # The decoder's state is unknown, a new one is created when needed
+            self._size -= 1
+            self._decoders_per_executor[self._executors.index(decoder.executor)] -= 1
+            raise
+        else:
+            self._idle.append(decoder)
+        finally:
+            self._available.release()
+
+    async def run(self, executor: Executor | None, function, *args):
+        """Runs a decoding job in the given executor, waiting while too many jobs are queued."""
+        if executor is None:
+            return function(*args)
+        async with self._pending:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, function, *args
+            )
+
+    async def warm_up(self) -> None:
+        """Starts the decoding processes, so they load the model before the first call."""
+        if self._process:
+            await asyncio.gather(
+                *(self.run(executor, os.getpid) for executor in self._executors)
+            )
+
+    def close(self) -> None:
+        """Shuts the executors down."""
+        for executor in self._executors:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _create_decoder(self) -> KaldiDecoder:
+        self._size += 1
+        logger.info("Creating Kaldi decoder %s of %s", self._size, self.max_size)
+        index = min(
+            range(len(self._executors)), key=self._decoders_per_executor.__getitem__
+        )
+        self._decoders_per_executor[index] += 1
+        executor = self._executors[index]
+        if not self._process:
+            return KaldiDecoder(
+                self,
+                executor,
+                recognizer=KaldiRecognizer(self._model, self.sample_rate),
+            )
+        decoder_id = next(self._decoder_ids)
+        await self.run(executor, _process_create, decoder_id, self.sample_rate)
+        return KaldiDecoder(self, executor, decoder_id=decoder_id)
+
+
+class KaldiRecognitionSession(RecognitionSession):
+    """
+    KaldiRecognitionSession decodes a call's utterances while they are spoken.
+    A decoder is taken from the pool when an utterance starts and returned when it ends,
+    so decoders are only held by calls whose caller is speaking.
+    """
+
+    def __init__(self, pool: KaldiRecognizerPool, partial_interval_ms: int = 200):
+        """
+        Initializes the session.
+
+        :param pool: The pool to take the decoders from.
+        :param partial_interval_ms: The audio between two partial hypotheses, default is 200 ms.
+        """
+        self._pool = pool
+        self._decoder: KaldiDecoder | None = None
+        # 8 kHz models are fed the telephone audio as it is
+        self._resampler = (
+            PolyphaseResampler(INPUT_SAMPLE_RATE, pool.sample_rate)
+            if pool.sample_rate != INPUT_SAMPLE_RATE
+            else None
+        )
+        self._partial_interval_bytes = 8 * partial_interval_ms
+        self._reset_utterance()
+
+    async def accept(
+        self, ulaw_data: bytes | memoryview
+    ) -> Optional[RecognitionResult]:
+        """
+        Feeds the next audio of the current utterance.
+
+        :param ulaw_data: Audio data in u-law format.
+        :return: A new partial hypothesis of the utterance, if there is one.
+        """
+        if self._decoder is None:
+            self._decoder = await self._pool.acquire()
+        samples = ulaw_to_linear(ulaw_data)
+        if self._resampler is not None:
+            # The resampler state is kept, so the utterance is resampled as one signal
+            samples = self._resampler.process(samples)
+        pcm_audio = samples.astype("<i2").tobytes()
+
+        self._pending_bytes += len(ulaw_data)
+        want_partial = self._pending_bytes >= self._partial_interval_bytes
+        if want_partial:
+            self._pending_bytes = 0
+        text, partial = await self._decoder.step(pcm_audio, want_partial)
+
+        if text is not None:
+            # Vosk found an endpoint inside the utterance, its text is final
+            if not text:
+                return None
+            self._segments.append(text)
+            self._partial = ""
+            return RecognitionResult(" ".join(self._segments), is_final=True)
+        if not partial or partial == self._partial:
+            return None
+        self._partial = partial
+        return RecognitionResult(" ".join([*self._segments, partial]))
+
+    async def finish(self) -> Optional[str]:
+        """
+        Ends the current utterance, the session is then ready for the next one.
+
+        :return: The final transcript or None if nothing was recognized.
+        """
+        if self._decoder is None:
+            return None
+        decoder, self._decoder = self._decoder, None
+        try:
+            text = await decoder.final()
+        except BaseException:
+            await self._pool.release(decoder)
+            raise
+        # The final result already reset the decoder
+        await self._pool.release(decoder, reset=False)
+        if text:
+            self._segments.append(text)
+        result = " ".join(self._segments)
+        self._reset_utterance()
+        return result or None
+
+    async def reset(self) -> None:
+        """Drops the current utterance without recognizing it."""
+        await self._release_decoder()
+
+    async def close(self) -> None:
+        """Returns the decoder of an unfinished utterance to the pool."""
+        await self._release_decoder()
+
+    async def _release_decoder(self) -> None:
+        if self._decoder is not None:
+            decoder, self._decoder = self._decoder, None
+            await self._pool.release(decoder)
+        self._reset_utterance()
+
+    def _reset_utterance(self) -> None:
+        if self._resampler is not None:
+            self._resampler.reset()
+        self._segments = []
+        self._partial = ""
+        self._pending_bytes = 0
+
+
+class KaldiSpeechRecognizer(StreamingSpeechRecognizer):
     """
     KaldiSpeechRecognizer is a class for recognizing speech from audio data using the Vosk speech recognition library.
-    It converts u-law encoded audio data to PCM format and recognizes speech in Russian.
+    It converts u-law encoded audio data to PCM format at the model's sample rate and recognizes speech in Russian.
     This class requires the Vosk model to be downloaded and placed in the specified directory.
     """
 
-    def __init__(self, model_path="vosk-model-small-ru-0.22"):
+    def __init__(
+        self,
+        model_path="vosk-model-small-ru-0.22",
+        max_decoders: int = 16,
+        executor: str = "thread",
+        workers: int = 4,
+        max_pending: int = 64,
+        sample_rate: int | None = None,
+    ):
         """
         Initializes the KaldiSpeechRecognizer with the specified Vosk model path.
+        The model is loaded once and shared by a pool of decoders, one per utterance being recognized.
+        8 kHz telephony models are fed the call audio at its native rate, other models get it
+        upsampled by a polyphase resampler.
 
         :param model_path: Path to the Vosk model directory. Default is 'vosk-model-small-ru-0.22'.
+        :param max_decoders: The maximum number of utterances decoded at the same time, default is 16.
+        :param executor: Where decoding runs: "thread", "process" or "inline" (on the event loop),
+            default is "thread".
+        :param workers: The number of decoding threads or processes, default is 4.
+        :param max_pending: The maximum number of queued decoding jobs, default is 64.
+        :param sample_rate: The sample rate the model expects, default is the one in the model config.
         :raises
             FileNotFoundError: If the model directory does not exist.
         """
@@ -31,22 +453,43 @@ class KaldiSpeechRecognizer(SpeechRecognizer):
             )
             raise FileNotFoundError(f"Model directory '{model_path}' does not exist.")
 
-        model = Model(model_path)
-        self._recognizer = KaldiRecognizer(model, 16000)
+        self.sample_rate = sample_rate or model_sample_rate(model_path)
+        logger.info("Decoding at %s Hz with %s", self.sample_rate, model_path)
+        # The decoding processes load the model themselves
+        self._model = Model(model_path) if executor != "process" else None
+        self._pool = KaldiRecognizerPool(
+            self._model,
+            max_decoders,
+            sample_rate=self.sample_rate,
+            executor=executor,
+            workers=workers,
+            max_pending=max_pending,
+            model_path=model_path,
+        )
+
+    async def warm_up(self) -> None:
+        """Starts the decoding processes of the process executor."""
+        await self._pool.warm_up()
 
-    async def recognize(self, ulaw_data: bytes) -> Optional[str]:
+    async def create_session(self) -> KaldiRecognitionSession:
+        """
+        Creates the recognition session of a call.
+
+        :return: The session, taking a decoder from the shared pool for every utterance.
+        """
+        return KaldiRecognitionSession(self._pool)
+
+    async def recognize(self, ulaw_data: bytes | memoryview) -> Optional[str]:
         """
         Recognizes speech from the given u-law audio data.
 
         :param ulaw_data: Audio data in u-law format.
         :return: Recognized text or None if recognition fails.
         """
-        pcm_audio_8k = audioop.ulaw2lin(ulaw_data, 2)
-        pcm_audio_16k, _ = audioop.ratecv(pcm_audio_8k, 2, 1, 8000, 16000, None)
-
-        if self._recognizer.AcceptWaveform(pcm_audio_16k):
-            result = self._recognizer.Result()
-        else:
-            result = self._recognizer.FinalResult()
+        async with await self.create_session() as session:
+            await session.accept(ulaw_data)
+            return await session.finish()
 
-        return json.loads(result).get("text", "") or None
+    def close(self) -> None:
+        """Shuts down the decoding threads or processes."""
+        self._pool.close()
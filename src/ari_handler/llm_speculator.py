@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+
+from llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_transcript(text: str) -> str:
+    """
+    Reduces a transcript to what matters to the LLM: lower-case words without punctuation.
+
+    :param text: The transcript.
+    :return: The normalized transcript.
+    """
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+@dataclass
+class SpeculationStats:
+    """Data class to represent how the speculative generations of a call fared."""
+
+    # The final transcripts answered
+    turns: int = 0
+    # The final transcript matched the speculation, its generation was used
+    hits: int = 0
+    # A speculation was discarded, because the caller went on or the final transcript differed
+    misses: int = 0
+    # The final transcript came before any partial was stable long enough
+    unspeculated: int = 0
+    # The generation time already done when the final transcripts of the hits arrived
+    saved_ms: float = 0.0
+    # The generation time thrown away with the misses
+    wasted_ms: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.turns if self.turns else 0.0
+
+
+@dataclass
+class _Speculation:
+    key: str
+    task: asyncio.Task
+    started_at: float
+    done_at: float | None = None
+
+    def elapsed_ms(self, now: float) -> float:
+        end = self.done_at if self.done_at is not None else now
+        return (end - self.started_at) * 1000
+
+
+class LLMSpeculator:
+    """
+    LLMSpeculator starts the LLM response to the caller's utterance before it is over.
+
+    Once a partial transcript has not changed for stable_ms, the response to it is
+    generated in the background. If the final transcript is the same, once normalized,
+    that response is used and the time it already ran is saved from the turn; otherwise
+    the speculation is discarded and the final transcript is answered as usual.
+
+    A discarded generation stops being awaited, but a generation running in a thread
+    can't be interrupted and still uses the CPU until it completes; wasted_ms shows the cost.
+    An LLMSpeculator serves a single call, one utterance at a time.
+    """
+
+    def __init__(self, llm_service: LLMService, stable_ms: int = 300):
+        """
+        Initializes the speculator.
+
+        :param llm_service: The LLM service generating the responses.
+        :param stable_ms: How long a partial transcript must stay unchanged to be speculated on,
+            default is 300 ms.
+        """
+        self._llm_service = llm_service
+        self._stable_s = stable_ms / 1000
+        self._candidate: str | None = None
+        self._candidate_key: str | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._speculation: _Speculation | None = None
+        self.stats = SpeculationStats()
+
+    def on_partial(self, text: str) -> None:
+        """
+        Takes the latest partial transcript of the current utterance.
+
+        :param text: The partial transcript.
+        """
+        key = normalize_transcript(text)
+        if not key or key == self._candidate_key:
+            return
+        self._candidate, self._candidate_key = text, key
+        if self._speculation and self._speculation.key != key:
+            # The caller went on, the speculated response no longer fits
+            self._discard()
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(
+            self._stable_s, self._speculate
+        )
+
+    async def generate(self, text: str) -> str:
+        """
+        Responds to the final transcript of the utterance, with the speculated response if it fits.
+
+        :param text: The final transcript.
+        :return: The LLM response.
+        """
+        key = normalize_transcript(text)
+        self.stats.turns += 1
+        speculation, self._speculation = self._speculation, None
+        self._reset_candidate()
+        now = asyncio.get_running_loop().time()
+
+        if speculation and speculation.key == key:
+            saved_ms = speculation.elapsed_ms(now)
+            try:
+                response = await speculation.task
+            except Exception:
+                logger.exception("Speculative generation failed, generating again")
+            else:
+                self.stats.hits += 1
+                self.stats.saved_ms += saved_ms
+                logger.info("Speculation hit, %.0f ms saved", saved_ms)
+                return response
+        elif speculation:
+            self._discard(speculation, now)
+        else:
+            self.stats.unspeculated += 1
+        return await self._llm_service.generate_async(text)
+
+    def cancel(self) -> None:
+        """Drops the current utterance, e.g. because it was not speech after all."""
+        if self._speculation:
+            self._discard()
+        self._reset_candidate()
+
+    def close(self) -> None:
+        """Cancels the work in progress when the call ends, without counting it as a miss."""
+        if self._speculation:
+            self._speculation.task.cancel()
+            self._speculation = None
+        self._reset_candidate()
+
+    def _speculate(self) -> None:
+        self._timer = None
+        if self._speculation or self._candidate is None:
+            return
+        loop = asyncio.get_running_loop()
+        speculation = _Speculation(
+            self._candidate_key,
+            asyncio.create_task(self._llm_service.generate_async(self._candidate)),
+            loop.time(),
+        )
+        speculation.task.add_done_callback(
+            lambda _: setattr(speculation, "done_at", loop.time())
+        )
+        self._speculation = speculation
+        logger.debug("Speculating on: %s", self._candidate)
+
+    def _discard(
+        self, speculation: _Speculation | None = None, now: float | None = None
+    ) -> None:
+        if speculation is None:
+            speculation, self._speculation = self._speculation, None
+        if now is None:
+            now = asyncio.get_running_loop().time()
+        speculation.task.cancel()
+        self.stats.misses += 1
+        self.stats.wasted_ms += speculation.elapsed_ms(now)
+
+    def _reset_candidate(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._candidate = None
+        self._candidate_key = None
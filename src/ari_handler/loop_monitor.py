@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoopLagStats:
+    """Data class to represent how long the event loop was blocked, since the last reset."""
+
+    samples: int = 0
+    # Wakeups that came later than stall_threshold_ms
+    stalls: int = 0
+    total_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+
+    @property
+    def mean_lag_ms(self) -> float:
+        return self.total_lag_ms / self.samples if self.samples else 0.0
+
+
+class LoopLagMonitor:
+    """
+    LoopLagMonitor measures how long the event loop is blocked by synchronous work.
+
+    A task sleeps for interval_ms at a time and records how much later than requested it
+    wakes up. Every coroutine on the loop, including RTP receiving and pacing, is delayed
+    by the same amount, so the lag is a direct measure of the blocking.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = 10.0,
+        stall_threshold_ms: float = 20.0,
+        report_interval_s: float | None = 60.0,
+    ):
+        """
+        Initializes the monitor.
+
+        :param interval_ms: The sleep between two samples, default is 10 ms.
+        :param stall_threshold_ms: The lag counted as a stall, default is 20 ms, one RTP frame.
+        :param report_interval_s: The interval the stats are logged and reset at,
+            None to never log them, default is 60 s.
+        """
+        self._interval = interval_ms / 1000
+        self._stall_threshold_ms = stall_threshold_ms
+        self._report_interval = report_interval_s
+        self._task: asyncio.Task | None = None
+        self.stats = LoopLagStats()
+
+    def start(self) -> None:
+        """Starts sampling on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stops sampling."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def reset(self) -> LoopLagStats:
+        """
+        Starts a new measurement period.
+
+        :return: The stats of the period that ended.
+        """
+        stats, self.stats = self.stats, LoopLagStats()
+        return stats
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        report_at = loop.time() + (self._report_interval or 0)
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            now = loop.time()
+            self._record(max(now - expected, 0.0) * 1000)
+            if self._report_interval and now >= report_at:
+                report_at = now + self._report_interval
+                stats = self.reset()
+                logger.info(
+                    "Event loop lag: mean %.2f ms, max %.2f ms, %s stalls over %s ms in %s samples",
+                    stats.mean_lag_ms,
+                    stats.max_lag_ms,
+                    stats.stalls,
+                    self._stall_threshold_ms,
+                    stats.samples,
+                )
+
+    def _record(self, lag_ms: float) -> None:
+        self.stats.samples += 1
+        self.stats.total_lag_ms += lag_ms
+        self.stats.max_lag_ms = max(self.stats.max_lag_ms, lag_ms)
+        if lag_ms >= self._stall_threshold_ms:
+            self.stats.stalls += 1
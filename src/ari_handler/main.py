@@ -1,15 +1,22 @@
 import asyncio
-import audioop
 import logging
 import re
 from dataclasses import dataclass
 
-import numpy as np
 from call_manager import CallManager
+from energy_voice_activity_detector import EnergyVoiceActivityDetector
 from google_speech_synthesizer import GoogleSpeechSynthesizer
 from llm_service import LLMService
-from speech_recognizer import SpeechRecognizer
+from llm_speculator import LLMSpeculator
+from speech_recognizer import (
+    DuplexRecognitionSession,
+    DuplexSpeechRecognizer,
+    SpeechRecognizer,
+    StreamingSpeechRecognizer,
+)
 from speech_synthesizer import SpeechSynthesizer
+from utterance_buffer import UtteranceBuffer
+from voice_activity_detector import VadEvent, VoiceActivityDetector
 from yandex_credentials_provider import YandexCredentialsProvider
 from yandex_settings import YandexSettings
 from yandex_speech_synthesizer import YandexSpeechSynthesizer
@@ -20,16 +27,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-lock = asyncio.Lock()
-
 # Параметры для RTP
 SAMPLE_RATE = 8000  # Частота дискретизации входящего аудио
 CHANNELS = 1  # Количество каналов
 
 # Параметры для обработки аудио
-SILENCE_FRAMES_THRESHOLD = 20  # Количество кадров тишины для завершения фразы
-SPEECH_FRAMES_THRESHOLD = 10  # Количество кадров речи для распозравания активной речи
-SILENCE_RMS_THRESHOLD = 30  # RMS амплитуда для определения тишины
+PRE_ROLL_MS = 300  # Аудио перед началом речи, добавляемое к фразе
+SPECULATION_STABLE_MS = (
+    300  # Стабильность частичной расшифровки для раннего запуска LLM
+)
 
 
 @dataclass
@@ -40,16 +46,6 @@ class ResponseChunk:
     addr: tuple[str, int]
 
 
-def is_silence(samples, threshold_rms=100):
-    """Check if the audio samples are silent based on RMS amplitude."""
-    pcm_audio_8k = audioop.ulaw2lin(samples, 2)
-    amplitudes = np.frombuffer(pcm_audio_8k, dtype=np.int16).astype(np.float32)
-    rms = np.sqrt(np.mean(amplitudes**2))
-    # Uncomment this line to log RMS values
-    # logger.info("RMS amplitude: %.2f", rms)
-    return rms < threshold_rms
-
-
 def split_text(text):
     """Разбивает текст на части, не превышающие max_len, по предложениям."""
     return [
@@ -65,17 +61,12 @@ async def generate_speech_and_play(
     chunk: ResponseChunk,
     call_manager: CallManager,
     speech_synthesizer: SpeechSynthesizer,
-    response_prefilled: bool,
 ):
     # Generate u-law response for the text
     logger.info("Generating u-law response for text: %s", chunk.text)
     ulaw_response = await speech_synthesizer.synthesize(chunk.text)
     logger.info("✅ Generated u-law response for text: %s", chunk.text)
 
-    # For the first time we need to send silence before the response
-    if not response_prefilled:
-        ulaw_response = b"\xff" * 160 * 40 + ulaw_response
-
     # Play the generated response
     await call_manager.play_next(ulaw_response, chunk.addr, frame_duration_ms=20)
 
@@ -94,9 +85,9 @@ async def _response_queue_worker(
     response_queue: asyncio.Queue,
     call_manager: CallManager,
     speech_synthesizer: SpeechSynthesizer,
+    lock: asyncio.Lock,
 ):
     """Worker to process responses from the queue."""
-    response_prefilled = False
     while True:
         if response_queue.empty():
             # logger.info("Response queue is empty, waiting for new responses...")
@@ -107,101 +98,217 @@ async def _response_queue_worker(
             async with lock:
                 chunk = response_queue.get_nowait()
                 logger.info("Planning to play response: %s", chunk.text)
-                await generate_speech_and_play(
-                    chunk,
-                    call_manager,
-                    speech_synthesizer,
-                    response_prefilled=response_prefilled,
-                )
-                response_prefilled = True
+                await generate_speech_and_play(chunk, call_manager, speech_synthesizer)
                 response_queue.task_done()
         except asyncio.QueueEmpty:
             continue
 
 
+async def _interrupt_playback(
+    call_manager: CallManager, response_queue: asyncio.Queue, lock: asyncio.Lock
+):
+    """Drops the pending responses and stops the current playback, the caller is speaking."""
+    logger.info("Speech detected, stopping playback.")
+    async with lock:
+        await _empty_queue(response_queue)
+        if call_manager.is_playing():
+            call_manager.cancel_play()
+
+
+async def _respond(
+    text: str,
+    addr: tuple[str, int],
+    speculator: LLMSpeculator,
+    response_queue: asyncio.Queue,
+):
+    """
+    Generates the response to the caller's utterance and queues it sentence by sentence.
+    The response may already have been started from a partial transcript.
+    """
+    # Send the recognized text to the LLM service
+    logger.info("Отправляем в LLM текст: %s", text)
+    response_text = await speculator.generate(text)
+    logger.info("Ответ от LLM: %s", response_text)
+
+    # Split the response text into manageable chunks
+    chunks = split_text(response_text)
+    logger.info("Разделенный ответ на части: %s", chunks)
+
+    for chunk in chunks:
+        await response_queue.put(ResponseChunk(chunk, addr))
+
+
+async def _run_duplex(
+    call_manager: CallManager,
+    session: DuplexRecognitionSession,
+    vad: VoiceActivityDetector,
+    speculator: LLMSpeculator,
+    response_queue: asyncio.Queue,
+    lock: asyncio.Lock,
+):
+    """
+    Streams every frame of the call to the recognizer, which ends the caller's turns.
+    The VAD only detects the caller speaking up, to stop the playback at once.
+    """
+    addr = None
+
+    async def handle_turns():
+        async for result in session:
+            if not result.end_of_turn:
+                logger.debug("Partial transcript: %s", result.text)
+                speculator.on_partial(result.text)
+                continue
+            logger.info("Recognized text: %s", result.text)
+            try:
+                await _respond(result.text, addr, speculator, response_queue)
+            except Exception:
+                logger.exception("Failed to respond to: %s", result.text)
+
+    # Turns are answered while the audio keeps flowing to the recognizer
+    turns_task = asyncio.create_task(handle_turns())
+    try:
+        async for ulaw_data, addr in call_manager.audio_channel(packet_size=2048):
+            await session.send(ulaw_data)
+            if vad.process(ulaw_data) == VadEvent.SPEECH_START:
+                await _interrupt_playback(call_manager, response_queue, lock)
+    finally:
+        turns_task.cancel()
+
+
 async def start(
-    ip: str,
-    port: int,
+    call_manager: CallManager,
     llm_service: LLMService,
     speech_recognizer: SpeechRecognizer,
     speech_synthesizer: SpeechSynthesizer,
+    voice_activity_detector: VoiceActivityDetector | None = None,
+    speculation_stable_ms: int = SPECULATION_STABLE_MS,
 ):
-    logger.info("Starting RTP recognizer on %s:%s", ip, port)
-
-    buffer = b""
-    silence_frames = 0
-    speech_frames = 0
+    """
+    Runs the VAD/STT/LLM/TTS pipeline for a single call.
+
+    :param call_manager: The call manager receiving and playing the call's audio.
+        It is opened and closed by this function.
+    :param llm_service: The LLM service generating responses.
+    :param speech_recognizer: The speech recognizer for the caller's utterances.
+        A duplex recognizer is fed the whole call and ends the caller's turns itself,
+        a streaming recognizer is fed while the caller speaks, otherwise the utterance
+        is recognized once it is over.
+    :param speech_synthesizer: The speech synthesizer for the responses.
+    :param voice_activity_detector: The VAD endpointing the caller's utterances, only used
+        for barge-in with a duplex recognizer, default is an EnergyVoiceActivityDetector.
+        It must not be shared between calls.
+    :param speculation_stable_ms: How long a partial transcript must stay unchanged for its
+        response to be generated ahead of the final one, default is SPECULATION_STABLE_MS.
+    """
+    logger.info("Starting RTP recognizer")
+
+    vad = voice_activity_detector or EnergyVoiceActivityDetector()
+    # Preallocated for the longest utterance the VAD lets through
+    utterance = UtteranceBuffer(
+        max_duration_ms=vad.max_utterance_ms + PRE_ROLL_MS,
+        pre_roll_ms=PRE_ROLL_MS,
+        sample_rate=SAMPLE_RATE,
+    )
 
     response_queue = asyncio.Queue()
+    # Serializes playback and its interruption within this call only
+    lock = asyncio.Lock()
+    speculator = LLMSpeculator(llm_service, speculation_stable_ms)
+    recognition_session = None
+    duplex_session = None
+    response_queue_worker_task = None
 
     try:
-        async with CallManager(ip, port) as call_manager:
+        if isinstance(speech_recognizer, DuplexSpeechRecognizer):
+            duplex_session = await speech_recognizer.create_duplex_session()
+        elif isinstance(speech_recognizer, StreamingSpeechRecognizer):
+            recognition_session = await speech_recognizer.create_session()
+        async with call_manager:
             response_queue_worker_task = asyncio.create_task(
-                _response_queue_worker(response_queue, call_manager, speech_synthesizer)
+                _response_queue_worker(
+                    response_queue, call_manager, speech_synthesizer, lock
+                )
             )
+            if duplex_session:
+                await _run_duplex(
+                    call_manager,
+                    duplex_session,
+                    vad,
+                    speculator,
+                    response_queue,
+                    lock,
+                )
+                return
             async for ulaw_data, addr in call_manager.audio_channel(packet_size=2048):
-                # Append the received ulaw data to the buffer
-                buffer += ulaw_data
-
-                # Count the number of frames of silence and speech
-                if is_silence(ulaw_data, SILENCE_RMS_THRESHOLD):
-                    silence_frames += 1
-                    speech_frames = 0
+                event = vad.process(ulaw_data)
+
+                # Append the received ulaw data to the utterance while one may be going on,
+                # otherwise keep it as the pre-roll of the next one
+                if vad.is_active or event == VadEvent.SPEECH_END:
+                    started = not utterance.is_recording
+                    utterance.start()
+                    utterance.append(ulaw_data)
+                    if recognition_session:
+                        # Decode while the caller speaks, starting with the pre-roll
+                        partial = await recognition_session.accept(
+                            utterance.view() if started else ulaw_data
+                        )
+                        if partial:
+                            logger.debug("Partial transcript: %s", partial.text)
+                            speculator.on_partial(partial.text)
                 else:
-                    speech_frames += 1
-                    silence_frames = 0
-
-                # If we have enough speech frames, stop the current playback
-                if speech_frames == SPEECH_FRAMES_THRESHOLD:
-                    logger.info("Speech detected, stopping playback.")
-                    # await response_queue.clear()
-                    async with lock:
-                        await _empty_queue(response_queue)
-                        if call_manager.is_playing():
-                            call_manager.cancel_play()
-
-                # If we have enough silence frames, process the buffer
-                if silence_frames >= SILENCE_FRAMES_THRESHOLD:
-                    # Trim the buffer to remove the silence frames
-                    buffer = buffer[: -silence_frames * 160]
-
-                    # If the buffer is empty, reset it and continue
-                    if len(buffer) == 0:
-                        buffer = b""
-                        silence_frames = 0
-                        speech_frames = 0
-                        continue
+                    if utterance.is_recording:
+                        # The VAD discarded a burst that was too short to be speech
+                        utterance.reset()
+                        speculator.cancel()
+                        if recognition_session:
+                            await recognition_session.reset()
+                    utterance.append(ulaw_data)
+
+                # If the caller started speaking, stop the current playback
+                if event == VadEvent.SPEECH_START:
+                    await _interrupt_playback(call_manager, response_queue, lock)
+
+                # If the utterance is over, process the buffer
+                if event == VadEvent.SPEECH_END:
+                    # Trim the buffer to remove the trailing silence
+                    utterance.trim_end(vad.trailing_silence_ms * SAMPLE_RATE // 1000)
 
                     logger.info(
-                        f"Silence detected. Buffer size: {len(buffer)}, {len(buffer) / (SAMPLE_RATE * CHANNELS)} seconds"
+                        f"Silence detected. Buffer size: {len(utterance)}, {len(utterance) / (SAMPLE_RATE * CHANNELS)} seconds"
                     )
 
-                    # Recognize text from the buffer
-                    # TODO: make async
-                    text = await speech_recognizer.recognize(buffer)
+                    if recognition_session:
+                        # Only the last frames are left to decode
+                        text = await recognition_session.finish()
+                    else:
+                        # Recognize text from the buffer, it is not touched until recognition is done
+                        text = await speech_recognizer.recognize(utterance.view())
                     logger.info("Recognized text: %s", text)
 
                     if text:
-                        # Send the recognized text to the LLM service
-                        logger.info("Отправляем в LLM текст: %s", text)
-                        response_text = await llm_service.generate_async(text)
-                        logger.info("Ответ от LLM: %s", response_text)
+                        await _respond(text, addr, speculator, response_queue)
+                    else:
+                        speculator.cancel()
 
-                        # Split the response text into manageable chunks
-                        chunks = split_text(response_text)
-                        logger.info("Разделенный ответ на части: %s", chunks)
-
-                        for chunk in chunks:
-                            await response_queue.put(ResponseChunk(chunk, addr))
-
-                    buffer = b""
-                    silence_frames = 0
-                    speech_frames = 0
+                    utterance.reset()
     except KeyboardInterrupt:
         pass
     finally:
-        response_queue_worker_task.cancel()
+        if response_queue_worker_task:
+            response_queue_worker_task.cancel()
+        if recognition_session:
+            await recognition_session.close()
+        if duplex_session:
+            await duplex_session.close()
+        speculator.close()
+        logger.info("Call media stats: %s", call_manager.media_stats)
+        logger.info(
+            "Call speculation stats: %s, hit ratio %.2f",
+            speculator.stats,
+            speculator.stats.hit_ratio,
+        )
 
 
 if __name__ == "__main__":
-    asyncio.run(start("0.0.0.0", 10000))
+    asyncio.run(start(CallManager("0.0.0.0", 10000)))
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+class ClockedStream(ABC):
+    """
+    Abstract base class for outbound streams paced by a MediaClock.
+
+    This class defines the interface the clock uses to send one frame of a stream per tick.
+    """
+
+    @abstractmethod
+    async def on_tick(self) -> bool:
+        """
+        Sends the next frame of the stream.
+
+        :return: False once the stream has nothing more to send, True otherwise.
+        """
+        pass
+
+
+class MediaClock:
+    """
+    MediaClock paces all outbound RTP streams of the process from a single timer.
+
+    Ticks are scheduled on absolute deadlines derived from loop.time(), so send time and
+    scheduler jitter do not accumulate. When the event loop stalls, the missed ticks are
+    replayed immediately, up to max_catch_up_frames, and the rest of the backlog is skipped.
+    """
+
+    def __init__(self, frame_duration_ms: int = 20, max_catch_up_frames: int = 5):
+        """
+        Initializes the clock.
+
+        :param frame_duration_ms: The tick period in milliseconds, default is 20 ms.
+        :param max_catch_up_frames: The maximum number of missed ticks replayed after a stall, default is 5.
+        """
+        self.frame_duration_ms = frame_duration_ms
+        self._period = frame_duration_ms / 1000
+        self._max_catch_up_frames = max_catch_up_frames
+        self._streams: dict[ClockedStream, asyncio.Future] = {}
+        self._task: asyncio.Task | None = None
+        self.ticks = 0
+        self.late_ticks = 0
+        self.skipped_ticks = 0
+
+    @property
+    def active_streams(self) -> int:
+        """The number of streams currently paced by the clock."""
+        return len(self._streams)
+
+    async def play(self, stream: ClockedStream) -> None:
+        """
+        Paces the given stream until it is finished.
+        If the caller is cancelled, the stream is removed from the clock.
+
+        :param stream: The stream to send one frame of per tick.
+        """
+        finished = asyncio.get_running_loop().create_future()
+        self._streams[stream] = finished
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            await finished
+        finally:
+            self._streams.pop(stream, None)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while self._streams:
+            now = loop.time()
+            missed = int((now - deadline) / self._period)
+            if missed > self._max_catch_up_frames:
+                skipped = missed - self._max_catch_up_frames
+                self.skipped_ticks += skipped
+                deadline += skipped * self._period
+                logger.warning("Media clock stalled, skipped %s ticks", skipped)
+
+            while deadline <= now and self._streams:
+                if now - deadline >= self._period:
+                    self.late_ticks += 1
+                await self._tick()
+                self.ticks += 1
+                deadline += self._period
+
+            await asyncio.sleep(deadline - loop.time())
+
+    async def _tick(self) -> None:
+        for stream, finished in list(self._streams.items()):
+            if finished.done():
+                continue
+            try:
+                has_more = await stream.on_tick()
+            except Exception as e:
+                # Surfaced to the caller of play()
+                finished.set_exception(e)
+                self._streams.pop(stream, None)
+                continue
+            if not has_more:
+                finished.set_result(None)
+                self._streams.pop(stream, None)
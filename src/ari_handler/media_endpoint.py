@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import socket
+from collections import deque
+
+from media_transport import MediaTransport
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = (b"", None)
+
+
+class EndpointMediaTransport(MediaTransport):
+    """
+    EndpointMediaTransport is a per-call view of a shared MediaEndpoint socket.
+    Packets routed to the call by the endpoint are buffered in a bounded queue.
+    """
+
+    def __init__(
+        self,
+        endpoint: "MediaEndpoint",
+        remote_addr: tuple[str, int] | None = None,
+        queue_size: int = 100,
+    ):
+        """
+        Initializes the transport for a call served by the given endpoint.
+
+        :param endpoint: The shared media endpoint receiving packets for this call.
+        :param remote_addr: The address Asterisk sends the call's RTP from, if known.
+            Sessions without an address claim the first packet from an unknown source.
+        :param queue_size: The maximum number of packets buffered for the call, default is 100.
+        """
+        self._endpoint = endpoint
+        self.remote_addr = remote_addr
+        self.ssrc: int | None = None
+        self.dropped_packets = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def open(self) -> None:
+        """Registers the call with the endpoint so that packets start being routed to it."""
+        self._endpoint.register(self)
+
+    async def recvfrom_into(
+        self, buffer: bytearray | memoryview
+    ) -> tuple[int, tuple[str, int]]:
+        """
+        Waits for the next packet routed to this call and copies it into the given buffer.
+
+        :param buffer: The preallocated buffer to copy the packet into.
+        :return: A tuple of the number of bytes copied and the sender's address.
+            Zero bytes are returned once the endpoint is closed.
+        """
+        data, addr = await self._queue.get()
+        nbytes = min(len(data), len(buffer))
+        buffer[:nbytes] = data[:nbytes]
+        return nbytes, addr
+
+    async def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Sends a packet through the shared endpoint socket.
+
+        :param data: The packet to send.
+        :param addr: The address (IP, port) to send the packet to.
+        """
+        await self._endpoint.sendto(data, addr)
+
+    def close(self) -> None:
+        """Unregisters the call from the endpoint."""
+        self._endpoint.unregister(self)
+
+    def _deliver(self, data: bytes, addr: tuple[str, int] | None) -> None:
+        """
+        Queues a packet for the call, dropping the oldest one if the queue is full.
+
+        :param data: The packet to queue.
+        :param addr: The address the packet was received from.
+        """
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped_packets += 1
+        self._queue.put_nowait((data, addr))
+
+
+class MediaEndpoint:
+    """
+    MediaEndpoint receives RTP for many concurrent calls on a single shared UDP socket
+    and demultiplexes packets into per-call sessions by source address and SSRC.
+    """
+
+    def __init__(self, ip: str, port: int, packet_size: int = 2048):
+        """
+        Initializes the endpoint with the given IP address and port.
+
+        :param ip: The IP address to bind the socket to.
+        :param port: The port number to bind the socket to.
+        :param packet_size: The maximum size of a received packet, default is 2048 bytes.
+        """
+        self._ip = ip
+        self._port = port
+        self._packet_size = packet_size
+        self._sock: socket.socket | None = None
+        self._receive_task: asyncio.Task | None = None
+        self._sessions: set[EndpointMediaTransport] = set()
+        self._sessions_by_addr: dict[tuple[str, int], EndpointMediaTransport] = {}
+        self._sessions_by_ssrc: dict[int, EndpointMediaTransport] = {}
+        self._unbound_sessions: deque[EndpointMediaTransport] = deque()
+        self.unrouted_packets = 0
+
+    async def __aenter__(self) -> "MediaEndpoint":
+        """
+        Binds the shared socket and starts the receive loop.
+
+        :return: The instance of the MediaEndpoint class.
+        """
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self._ip, self._port))
+        self._sock.setblocking(False)
+        self._start_receiving()
+        logger.info("Media endpoint listening on %s:%s", self._ip, self._port)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        """Stops the receive loop, ends all sessions and closes the socket."""
+        self._stop_receiving()
+        for session in list(self._sessions):
+            session._deliver(*_END_OF_STREAM)
+            self.unregister(session)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        logger.info("Media endpoint closed.")
+
+    def create_session(
+        self, remote_addr: tuple[str, int] | None = None
+    ) -> EndpointMediaTransport:
+        """
+        Creates a transport for a new call served by this endpoint.
+
+        :param remote_addr: The address Asterisk sends the call's RTP from, if known.
+        :return: The per-call transport. Packets are routed to it from now on.
+        """
+        session = EndpointMediaTransport(self, remote_addr)
+        self.register(session)
+        return session
+
+    def register(self, session: EndpointMediaTransport) -> None:
+        """
+        Starts routing packets to the given session.
+
+        :param session: The session to register.
+        """
+        if session in self._sessions:
+            return
+        self._sessions.add(session)
+        if session.remote_addr:
+            self._sessions_by_addr[session.remote_addr] = session
+        else:
+            self._unbound_sessions.append(session)
+        logger.info(
+            "Registered media session for %s, active sessions: %s",
+            session.remote_addr,
+            len(self._sessions),
+        )
+
+    def unregister(self, session: EndpointMediaTransport) -> None:
+        """
+        Stops routing packets to the given session.
+
+        :param session: The session to unregister.
+        """
+        if session not in self._sessions:
+            return
+        self._sessions.discard(session)
+        if self._sessions_by_addr.get(session.remote_addr) is session:
+            del self._sessions_by_addr[session.remote_addr]
+        if self._sessions_by_ssrc.get(session.ssrc) is session:
+            del self._sessions_by_ssrc[session.ssrc]
+        if session in self._unbound_sessions:
+            self._unbound_sessions.remove(session)
+        logger.info(
+            "Unregistered media session for %s, active sessions: %s",
+            session.remote_addr,
+            len(self._sessions),
+        )
+
+    async def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Sends a packet through the shared socket.
+
+        :param data: The packet to send.
+        :param addr: The address (IP, port) to send the packet to.
+        :raises RuntimeError: If the socket is not initialized.
+        """
+        if not self._sock:
+            raise RuntimeError("Socket is not initialized.")
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendto(self._sock, data, addr)
+
+    def _start_receiving(self) -> None:
+        self._receive_task = asyncio.create_task(self._receive_loop())
+
+    def _stop_receiving(self) -> None:
+        if self._receive_task and not self._receive_task.done():
+            self._receive_task.cancel()
+
+    async def _receive_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            data, addr = await loop.sock_recvfrom(self._sock, self._packet_size)
+            self._dispatch(data, addr)
+
+    def _dispatch(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Delivers a received packet to the session it belongs to.
+
+        :param data: The received RTP packet.
+        :param addr: The address the packet was received from.
+        """
+        session = self._route(data, addr)
+        if session is None:
+            self.unrouted_packets += 1
+            return
+        session._deliver(data, addr)
+
+    def _route(
+        self, data: bytes, addr: tuple[str, int]
+    ) -> EndpointMediaTransport | None:
+        """
+        Finds the session a packet belongs to.
+
+        Packets are matched by source address first and by SSRC second, so that a call
+        survives a change of the source port. Packets from an unknown source with an
+        unknown SSRC are assigned to the oldest session that has no source yet.
+
+        :param data: The received RTP packet.
+        :param addr: The address the packet was received from.
+        :return: The session for the packet or None if no session accepts it.
+        """
+        session = self._sessions_by_addr.get(addr)
+        if session and session.ssrc is not None:
+            return session
+        if len(data) < 12:
+            return session
+
+        ssrc = int.from_bytes(data[8:12], "big")
+        if session:
+            # Remember the SSRC of a pre-addressed session on its first packet
+            session.ssrc = ssrc
+            self._sessions_by_ssrc[ssrc] = session
+            return session
+
+        session = self._sessions_by_ssrc.get(ssrc)
+        if session is None:
+            if not self._unbound_sessions:
+                return None
+            session = self._unbound_sessions.popleft()
+            session.ssrc = ssrc
+            self._sessions_by_ssrc[ssrc] = session
+
+        if self._sessions_by_addr.get(session.remote_addr) is session:
+            del self._sessions_by_addr[session.remote_addr]
+        logger.info("Media session source bound to %s (SSRC %s)", addr, ssrc)
+        session.remote_addr = addr
+        self._sessions_by_addr[addr] = session
+        return session
@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class MediaQualityStats:
+    """
+    Data class to represent a snapshot of the media quality of a call.
+
+    The inbound counters follow RFC 3550 appendix A. The remote fields are the peer's view of
+    the outbound stream taken from its RTCP reports, and are None until one is received.
+    """
+
+    packets_received: int = 0
+    packets_expected: int = 0
+    packets_lost: int = 0
+    loss_ratio: float = 0.0
+    reordered: int = 0
+    duplicates: int = 0
+    late: int = 0
+    invalid: int = 0
+    jitter_ms: float = 0.0
+    jitter_buffer_depth_ms: int = 0
+    packets_sent: int = 0
+    round_trip_time_ms: float | None = None
+    remote_loss_ratio: float | None = None
+    remote_jitter_ms: float | None = None
@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+
+
+class MediaTransport(ABC):
+    """
+    Abstract base class for RTP media transports.
+
+    This class defines the interface a CallManager uses to receive and send RTP packets
+    for a single call, regardless of how the underlying sockets are shared.
+    """
+
+    @abstractmethod
+    async def open(self) -> None:
+        pass
+
+    @abstractmethod
+    async def recvfrom_into(
+        self, buffer: bytearray | memoryview
+    ) -> tuple[int, tuple[str, int]]:
+        pass
+
+    @abstractmethod
+    async def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
@@ -0,0 +1,62 @@
+class PacketRingBuffer:
+    """
+    PacketRingBuffer stores received datagrams in a fixed number of preallocated slots.
+    When the buffer is full, the oldest datagram is overwritten.
+    """
+
+    def __init__(self, capacity: int = 64, packet_size: int = 2048):
+        """
+        Initializes the ring buffer.
+
+        :param capacity: The number of datagrams the buffer can hold, default is 64.
+        :param packet_size: The maximum size of a datagram, default is 2048 bytes.
+        """
+        self._capacity = capacity
+        self._packet_size = packet_size
+        self._storage = memoryview(bytearray(capacity * packet_size))
+        self._sizes = [0] * capacity
+        self._addresses: list[tuple[str, int] | None] = [None] * capacity
+        self._head = 0
+        self._count = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Copies a datagram into the next slot, overwriting the oldest one if the buffer is full.
+
+        :param data: The datagram. Datagrams longer than the slot size are truncated.
+        :param addr: The address the datagram was received from.
+        """
+        if self._count == self._capacity:
+            self._head = (self._head + 1) % self._capacity
+            self._count -= 1
+            self.dropped += 1
+        slot = (self._head + self._count) % self._capacity
+        size = min(len(data), self._packet_size)
+        offset = slot * self._packet_size
+        self._storage[offset : offset + size] = data[:size]
+        self._sizes[slot] = size
+        self._addresses[slot] = addr
+        self._count += 1
+
+    def pop_into(self, buffer: bytearray | memoryview) -> tuple[int, tuple[str, int]]:
+        """
+        Copies the oldest datagram into the given buffer and frees its slot.
+
+        :param buffer: The buffer to copy the datagram into.
+        :return: A tuple of the number of bytes copied and the sender's address.
+        :raises IndexError: If the buffer is empty.
+        """
+        if not self._count:
+            raise IndexError("pop from an empty ring buffer")
+        slot = self._head
+        size = min(self._sizes[slot], len(buffer))
+        offset = slot * self._packet_size
+        buffer[:size] = self._storage[offset : offset + size]
+        addr = self._addresses[slot]
+        self._head = (self._head + 1) % self._capacity
+        self._count -= 1
+        return size, addr
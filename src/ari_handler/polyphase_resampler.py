@@ -0,0 +1,87 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+class PolyphaseResampler:
+    """
+    PolyphaseResampler converts a stream of 16-bit samples between two sample rates.
+
+    The rate ratio is reduced to up/down. A windowed-sinc low-pass filter for the
+    upsampled rate is split into `up` phases of taps_per_phase taps each, so every output
+    sample is a single dot product of the latest input samples with one phase and the
+    zero-stuffed samples are never computed. The last input samples and the output
+    position are carried from one chunk to the next, so a stream resampled in chunks
+    equals the stream resampled at once.
+    """
+
+    def __init__(
+        self,
+        input_rate: int = 8000,
+        output_rate: int = 16000,
+        taps_per_phase: int = 16,
+        beta: float = 8.0,
+    ):
+        """
+        Initializes the resampler.
+
+        :param input_rate: The sample rate of the input, default is 8000 Hz.
+        :param output_rate: The sample rate of the output, default is 16000 Hz.
+        :param taps_per_phase: The filter taps per output sample, default is 16.
+        :param beta: The Kaiser window shape, higher values attenuate the stopband
+            more at the cost of a wider transition band, default is 8.0.
+        """
+        divisor = gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        self._taps = taps_per_phase
+
+        size = taps_per_phase * self.up
+        cutoff = 1.0 / max(self.up, self.down)
+        t = np.arange(size) - (size - 1) / 2
+        # The gain of `up` makes up for the zero-stuffed samples
+        taps = self.up * cutoff * np.sinc(cutoff * t) * np.kaiser(size, beta)
+        # Phase p weights x[i], x[i - 1], ... with taps[p], taps[p + up], ...; reversed
+        # to match the oldest-first sample windows
+        self._phases = np.ascontiguousarray(
+            taps.reshape(taps_per_phase, self.up).T[:, ::-1], dtype=np.float32
+        )
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the carried samples, the next chunk starts a new stream."""
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+        # The position of the next output sample on the upsampled time axis,
+        # relative to the first sample of the next chunk
+        self._position = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Resamples the next chunk of the stream.
+
+        :param samples: The int16 samples at the input rate.
+        :return: The int16 samples at the output rate.
+        """
+        buffer = np.concatenate((self._history, samples.astype(np.float32)))
+        self._history = buffer[len(buffer) - (self._taps - 1) :]
+        if not len(samples):
+            return np.empty(0, dtype=np.int16)
+        # Row i holds the input samples of the filter ending at the i-th new sample;
+        # as_strided is a fraction of sliding_window_view's overhead on 20 ms chunks
+        windows = as_strided(
+            buffer, (len(samples), self._taps), (buffer.strides[0], buffer.strides[0])
+        )
+
+        if self.down == 1:
+            # Every input sample yields `up` outputs, one per phase
+            output = (windows @ self._phases.T).ravel()
+        else:
+            end = len(samples) * self.up
+            positions = np.arange(self._position, end, self.down)
+            indices, phases = np.divmod(positions, self.up)
+            output = np.einsum("ij,ij->i", windows[indices], self._phases[phases])
+            self._position += len(positions) * self.down - end
+        np.rint(output, out=output)
+        np.clip(output, -32768, 32767, out=output)
+        return output.astype(np.int16)
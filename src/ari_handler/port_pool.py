@@ -0,0 +1,118 @@
+import logging
+import socket
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PortPool:
+    """
+    PortPool leases free UDP ports from a configured range, one per call,
+    or an RTP/RTCP pair of ports per call.
+    A leased port is returned with an already bound socket, so the port is owned
+    by the call before Asterisk is told where to send its RTP.
+    """
+
+    def __init__(self, ip: str, start_port: int, end_port: int):
+        """
+        Initializes the pool with the given bind address and inclusive port range.
+
+        :param ip: The IP address to bind the leased sockets to.
+        :param start_port: The first port of the range.
+        :param end_port: The last port of the range.
+        :raises ValueError: If the port range is empty.
+        """
+        if start_port > end_port:
+            raise ValueError(f"Invalid port range {start_port}-{end_port}.")
+        self._ip = ip
+        self._free_ports = deque(range(start_port, end_port + 1))
+        self._leased_ports: set[int] = set()
+        self._paired_ports: set[int] = set()
+
+    @property
+    def available(self) -> int:
+        """The number of ports that can currently be leased."""
+        return len(self._free_ports)
+
+    def lease(self) -> tuple[int, socket.socket]:
+        """
+        Leases a free port and binds a non-blocking socket to it.
+
+        Ports that turn out to be bound by someone else are skipped and stay in the pool.
+
+        :return: A tuple of the leased port and the socket bound to it.
+        :raises RuntimeError: If no port in the range can be bound.
+        """
+        for _ in range(len(self._free_ports)):
+            port = self._free_ports.popleft()
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.bind((self._ip, port))
+            except OSError as e:
+                sock.close()
+                self._free_ports.append(port)
+                logger.warning("RTP port %s is busy, skipping: %s", port, e)
+                continue
+            sock.setblocking(False)
+            self._leased_ports.add(port)
+            logger.info(
+                "Leased RTP port %s, %s ports left", port, len(self._free_ports)
+            )
+            return port, sock
+
+        raise RuntimeError("No free RTP ports left in the pool.")
+
+    def lease_pair(self) -> tuple[int, socket.socket, socket.socket]:
+        """
+        Leases an even RTP port together with the odd RTCP port above it (RFC 3550 11)
+        and binds a non-blocking socket to each.
+
+        :return: A tuple of the leased RTP port, its socket and the socket of the RTCP port.
+        :raises RuntimeError: If no pair of ports in the range can be bound.
+        """
+        free_ports = set(self._free_ports)
+        for port in list(self._free_ports):
+            if port % 2 or port + 1 not in free_ports:
+                continue
+            socks = []
+            try:
+                for pair_port in (port, port + 1):
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    socks.append(sock)
+                    sock.bind((self._ip, pair_port))
+                    sock.setblocking(False)
+            except OSError as e:
+                for sock in socks:
+                    sock.close()
+                logger.warning(
+                    "RTP ports %s-%s are busy, skipping: %s", port, port + 1, e
+                )
+                continue
+            for pair_port in (port, port + 1):
+                self._free_ports.remove(pair_port)
+                self._leased_ports.add(pair_port)
+            self._paired_ports.add(port)
+            logger.info(
+                "Leased RTP/RTCP ports %s-%s, %s ports left",
+                port,
+                port + 1,
+                len(self._free_ports),
+            )
+            return port, socks[0], socks[1]
+
+        raise RuntimeError("No free RTP/RTCP port pairs left in the pool.")
+
+    def release(self, port: int) -> None:
+        """
+        Returns a leased port to the pool, together with its RTCP port if it was leased as a pair.
+
+        :param port: The port to return.
+        """
+        if port not in self._leased_ports:
+            return
+        ports = (port, port + 1) if port in self._paired_ports else (port,)
+        self._paired_ports.discard(port)
+        for released_port in ports:
+            self._leased_ports.discard(released_port)
+            self._free_ports.append(released_port)
+        logger.info("Released RTP port %s, %s ports left", port, len(self._free_ports))
@@ -0,0 +1,295 @@
+import struct
+import time
+from dataclasses import dataclass
+
+RTCP_SR = 200
+RTCP_RR = 201
+
+RTP_SEQ_MOD = 1 << 16
+MAX_DROPOUT = 3000
+MAX_MISORDER = 100
+
+# Seconds between the NTP epoch (1900) and the Unix epoch (1970)
+NTP_EPOCH_OFFSET = 2208988800
+
+_HEADER = struct.Struct("!BBHI")
+_SENDER_INFO = struct.Struct("!IIIII")
+_REPORT_BLOCK = struct.Struct("!IIIIII")
+
+
+def ntp_timestamp(now: float | None = None) -> int:
+    """
+    Converts a Unix time to a 64-bit NTP timestamp.
+
+    :param now: The Unix time in seconds, default is the current time.
+    :return: The NTP timestamp.
+    """
+    if now is None:
+        now = time.time()
+    return int((now + NTP_EPOCH_OFFSET) * (1 << 32)) & 0xFFFFFFFFFFFFFFFF
+
+
+def ntp_middle(ntp: int) -> int:
+    """Returns the middle 32 bits of an NTP timestamp, as used by LSR and RTT computations."""
+    return (ntp >> 16) & 0xFFFFFFFF
+
+
+@dataclass
+class ReportBlock:
+    """Data class to represent an RTCP reception report block (RFC 3550 6.4.1)."""
+
+    ssrc: int
+    fraction_lost: int
+    cumulative_lost: int
+    extended_highest_sequence: int
+    jitter: int
+    last_sr: int
+    delay_since_last_sr: int
+
+
+@dataclass
+class SenderInfo:
+    """Data class to represent the sender info of an RTCP sender report."""
+
+    ntp_timestamp: int
+    rtp_timestamp: int
+    packet_count: int
+    octet_count: int
+
+
+@dataclass
+class RtcpReport:
+    """Data class to represent a parsed RTCP SR or RR packet."""
+
+    packet_type: int
+    ssrc: int
+    sender_info: SenderInfo | None
+    blocks: list[ReportBlock]
+
+
+class ReceptionStatistics:
+    """
+    ReceptionStatistics tracks an inbound RTP source as described in RFC 3550 appendix A:
+    extended sequence numbers (A.1), expected and lost packets (A.3) and
+    interarrival jitter (A.8).
+    """
+
+    def __init__(self, clock_rate: int = 8000):
+        """
+        Initializes the statistics.
+
+        :param clock_rate: The RTP clock rate of the source, default is 8000 Hz.
+        """
+        self.clock_rate = clock_rate
+        self.ssrc: int | None = None
+        self.received = 0
+        self.reordered = 0
+        self.jitter = 0.0
+        self._base_seq = 0
+        self._max_seq = 0
+        self._bad_seq = RTP_SEQ_MOD + 1
+        self._cycles = 0
+        self._expected_prior = 0
+        self._received_prior = 0
+        self._last_transit: float | None = None
+
+    @property
+    def extended_highest_sequence(self) -> int:
+        return self._cycles + self._max_seq
+
+    @property
+    def expected(self) -> int:
+        if self.ssrc is None:
+            return 0
+        return self.extended_highest_sequence - self._base_seq + 1
+
+    @property
+    def lost(self) -> int:
+        return self.expected - self.received
+
+    @property
+    def jitter_ms(self) -> float:
+        return 1000 * self.jitter / self.clock_rate
+
+    def update(
+        self, ssrc: int, sequence_number: int, timestamp: int, arrival: float
+    ) -> None:
+        """
+        Accounts for a received packet.
+
+        :param ssrc: The SSRC of the packet.
+        :param sequence_number: The sequence number of the packet.
+        :param timestamp: The RTP timestamp of the packet.
+        :param arrival: The arrival time of the packet in seconds, from any monotonic clock.
+        """
+        if ssrc != self.ssrc:
+            self.ssrc = ssrc
+            self._init_sequence(sequence_number)
+            self._last_transit = None
+        elif not self._update_sequence(sequence_number):
+            return
+        self.received += 1
+
+        # A.8: transit time difference in RTP timestamp units
+        transit = arrival * self.clock_rate - timestamp
+        if self._last_transit is not None:
+            d = abs(transit - self._last_transit)
+            self.jitter += (d - self.jitter) / 16
+        self._last_transit = transit
+
+    def report_block(
+        self, last_sr: int = 0, delay_since_last_sr: int = 0
+    ) -> ReportBlock:
+        """
+        Builds a reception report block and starts a new reporting interval.
+
+        :param last_sr: The middle 32 bits of the NTP timestamp of the last SR received from the source.
+        :param delay_since_last_sr: The delay since that SR in units of 1/65536 seconds.
+        :return: The report block.
+        """
+        expected = self.expected
+        expected_interval = expected - self._expected_prior
+        received_interval = self.received - self._received_prior
+        lost_interval = expected_interval - received_interval
+        self._expected_prior = expected
+        self._received_prior = self.received
+
+        if expected_interval and lost_interval > 0:
+            fraction_lost = (lost_interval << 8) // expected_interval
+        else:
+            fraction_lost = 0
+        # Cumulative loss is a signed 24-bit value
+        cumulative_lost = max(-0x800000, min(0x7FFFFF, self.lost)) & 0xFFFFFF
+
+        return ReportBlock(
+            ssrc=self.ssrc or 0,
+            fraction_lost=min(fraction_lost, 255),
+            cumulative_lost=cumulative_lost,
+            extended_highest_sequence=self.extended_highest_sequence & 0xFFFFFFFF,
+            jitter=int(self.jitter),
+            last_sr=last_sr,
+            delay_since_last_sr=delay_since_last_sr,
+        )
+
+    def _init_sequence(self, sequence_number: int) -> None:
+        self._base_seq = sequence_number
+        self._max_seq = sequence_number
+        self._bad_seq = RTP_SEQ_MOD + 1
+        self._cycles = 0
+        self.received = 0
+        self._expected_prior = 0
+        self._received_prior = 0
+
+    def _update_sequence(self, sequence_number: int) -> bool:
+        """A.1: returns False for packets that restart or jump the sequence and are not counted."""
+        udelta = (sequence_number - self._max_seq) & 0xFFFF
+        if udelta < MAX_DROPOUT:
+            if sequence_number < self._max_seq:
+                self._cycles += RTP_SEQ_MOD
+            self._max_seq = sequence_number
+        elif udelta <= RTP_SEQ_MOD - MAX_MISORDER:
+            if sequence_number == self._bad_seq:
+                # Two sequential packets after a large jump, the source has restarted
+                self._init_sequence(sequence_number)
+            else:
+                self._bad_seq = (sequence_number + 1) & (RTP_SEQ_MOD - 1)
+                return False
+        else:
+            self.reordered += 1
+        return True
+
+
+def _pack_block(block: ReportBlock) -> bytes:
+    return _REPORT_BLOCK.pack(
+        block.ssrc,
+        (block.fraction_lost << 24) | block.cumulative_lost,
+        block.extended_highest_sequence,
+        block.jitter,
+        block.last_sr,
+        block.delay_since_last_sr,
+    )
+
+
+def build_receiver_report(ssrc: int, blocks: list[ReportBlock]) -> bytes:
+    """
+    Builds an RTCP receiver report.
+
+    :param ssrc: The SSRC of the reporter.
+    :param blocks: The reception report blocks, at most 31.
+    :return: The RTCP packet.
+    """
+    body = b"".join(_pack_block(block) for block in blocks)
+    length = (_HEADER.size + len(body)) // 4 - 1
+    return _HEADER.pack(0x80 | len(blocks), RTCP_RR, length, ssrc) + body
+
+
+def build_sender_report(
+    ssrc: int, sender_info: SenderInfo, blocks: list[ReportBlock]
+) -> bytes:
+    """
+    Builds an RTCP sender report.
+
+    :param ssrc: The SSRC of the sender.
+    :param sender_info: The sender info.
+    :param blocks: The reception report blocks, at most 31.
+    :return: The RTCP packet.
+    """
+    info = _SENDER_INFO.pack(
+        sender_info.ntp_timestamp >> 32,
+        sender_info.ntp_timestamp & 0xFFFFFFFF,
+        sender_info.rtp_timestamp & 0xFFFFFFFF,
+        sender_info.packet_count & 0xFFFFFFFF,
+        sender_info.octet_count & 0xFFFFFFFF,
+    )
+    body = info + b"".join(_pack_block(block) for block in blocks)
+    length = (_HEADER.size + len(body)) // 4 - 1
+    return _HEADER.pack(0x80 | len(blocks), RTCP_SR, length, ssrc) + body
+
+
+def parse_rtcp(data: bytes) -> list[RtcpReport]:
+    """
+    Parses the SR and RR packets of a compound RTCP packet. Other packet types are skipped.
+
+    :param data: The compound RTCP packet.
+    :return: The parsed reports.
+    :raises ValueError: If the packet is malformed.
+    """
+    reports = []
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        first_byte, packet_type, length, ssrc = _HEADER.unpack_from(data, offset)
+        if first_byte >> 6 != 2:
+            raise ValueError(f"Unsupported RTCP version {first_byte >> 6}.")
+        end = offset + 4 * (length + 1)
+        if end > len(data):
+            raise ValueError("RTCP packet is truncated.")
+
+        position = offset + _HEADER.size
+        sender_info = None
+        if packet_type == RTCP_SR:
+            if position + _SENDER_INFO.size > end:
+                raise ValueError("RTCP sender info is truncated.")
+            ntp_high, ntp_low, rtp_ts, packets, octets = _SENDER_INFO.unpack_from(
+                data, position
+            )
+            sender_info = SenderInfo(
+                (ntp_high << 32) | ntp_low, rtp_ts, packets, octets
+            )
+            position += _SENDER_INFO.size
+        if packet_type in (RTCP_SR, RTCP_RR):
+            blocks = []
+            for _ in range(first_byte & 0x1F):
+                if position + _REPORT_BLOCK.size > end:
+                    raise ValueError("RTCP report block is truncated.")
+                source, lost, highest, jitter, lsr, dlsr = _REPORT_BLOCK.unpack_from(
+                    data, position
+                )
+                blocks.append(
+                    ReportBlock(
+                        source, lost >> 24, lost & 0xFFFFFF, highest, jitter, lsr, dlsr
+                    )
+                )
+                position += _REPORT_BLOCK.size
+            reports.append(RtcpReport(packet_type, ssrc, sender_info, blocks))
+        offset = end
+    return reports
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import random
+import time
+
+from media_transport import MediaTransport
+from rtcp import (
+    RTCP_SR,
+    ReceptionStatistics,
+    ReportBlock,
+    RtcpReport,
+    SenderInfo,
+    build_receiver_report,
+    build_sender_report,
+    ntp_middle,
+    ntp_timestamp,
+    parse_rtcp,
+)
+from rtp_session import OutboundRtpSession
+
+logger = logging.getLogger(__name__)
+
+
+class RtcpSession:
+    """
+    RtcpSession runs the RTCP side of a call on the port paired with its RTP port.
+
+    It periodically sends a sender report while the outbound stream is active, or a receiver
+    report otherwise, with a reception report block for the inbound stream. Reports received
+    from the peer give the round-trip time and the peer's view of the outbound stream.
+    """
+
+    def __init__(
+        self,
+        transport: MediaTransport,
+        reception_statistics: ReceptionStatistics,
+        interval: float = 5.0,
+        packet_size: int = 1500,
+    ):
+        """
+        Initializes the session.
+
+        :param transport: The media transport bound to the RTCP port.
+        :param reception_statistics: The statistics of the inbound RTP stream to report on.
+        :param interval: The average interval between reports in seconds, default is 5 s.
+        :param packet_size: The maximum size of a received RTCP packet, default is 1500 bytes.
+        """
+        self.remote_addr: tuple[str, int] | None = None
+        self.outbound_session: OutboundRtpSession | None = None
+        self._transport = transport
+        self._reception_statistics = reception_statistics
+        self._interval = interval
+        self._packet_size = packet_size
+        self._ssrc = random.randint(0, 0xFFFFFFFF)
+        self._packets_reported = 0
+        self._last_sr: int = 0
+        self._last_sr_arrival: float | None = None
+        self._tasks: list[asyncio.Task] = []
+
+        self.reports_sent = 0
+        self.reports_received = 0
+        self.round_trip_time: float | None = None
+        self.remote_report: ReportBlock | None = None
+
+    @property
+    def ssrc(self) -> int:
+        """The SSRC the reports are sent from, the one of the outbound stream once it exists."""
+        if self.outbound_session:
+            return self.outbound_session.ssrc
+        return self._ssrc
+
+    async def open(self) -> None:
+        """Opens the transport and starts sending and receiving reports."""
+        await self._transport.open()
+        self._tasks = [
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._receive_loop()),
+        ]
+
+    def close(self) -> None:
+        """Stops the session and closes its transport."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._transport.close()
+
+    async def send_report(self) -> None:
+        """Sends a report to the peer right away, if its address is known."""
+        if self.remote_addr is None:
+            return
+        blocks = []
+        if self._reception_statistics.ssrc is not None:
+            blocks.append(
+                self._reception_statistics.report_block(*self._last_sr_fields())
+            )
+
+        session = self.outbound_session
+        if session and session.packets_sent > self._packets_reported:
+            # Only a source that sent RTP since the last report is a sender (RFC 3550 6.4)
+            self._packets_reported = session.packets_sent
+            sender_info = SenderInfo(
+                ntp_timestamp(),
+                session.timestamp,
+                session.packets_sent,
+                session.octets_sent,
+            )
+            packet = build_sender_report(self.ssrc, sender_info, blocks)
+        else:
+            packet = build_receiver_report(self.ssrc, blocks)
+
+        await self._transport.sendto(packet, self.remote_addr)
+        self.reports_sent += 1
+
+    def _last_sr_fields(self) -> tuple[int, int]:
+        """Returns the LSR and DLSR fields of the next report block."""
+        if self._last_sr_arrival is None:
+            return 0, 0
+        delay = time.monotonic() - self._last_sr_arrival
+        return self._last_sr, int(delay * 65536) & 0xFFFFFFFF
+
+    async def _send_loop(self) -> None:
+        while True:
+            # Randomized as RFC 3550 6.3.1 suggests, so reports of many calls don't synchronize
+            await asyncio.sleep(self._interval * random.uniform(0.5, 1.5))
+            try:
+                await self.send_report()
+            except OSError as e:
+                logger.warning(
+                    "Failed to send RTCP report to %s: %s", self.remote_addr, e
+                )
+
+    async def _receive_loop(self) -> None:
+        buffer = memoryview(bytearray(self._packet_size))
+        while True:
+            nbytes, addr = await self._transport.recvfrom_into(buffer)
+            if not nbytes:
+                break
+            try:
+                reports = parse_rtcp(buffer[:nbytes])
+            except ValueError as e:
+                logger.debug("Dropping invalid RTCP packet from %s: %s", addr, e)
+                continue
+            for report in reports:
+                self._handle_report(report)
+
+    def _handle_report(self, report: RtcpReport) -> None:
+        self.reports_received += 1
+        if report.packet_type == RTCP_SR:
+            self._last_sr = ntp_middle(report.sender_info.ntp_timestamp)
+            self._last_sr_arrival = time.monotonic()
+
+        for block in report.blocks:
+            if block.ssrc != self.ssrc:
+                continue
+            self.remote_report = block
+            if block.last_sr:
+                # RTT = A - LSR - DLSR, all in 1/65536 seconds (RFC 3550 6.4.1)
+                arrival = ntp_middle(ntp_timestamp())
+                rtt = (arrival - block.last_sr - block.delay_since_last_sr) & 0xFFFFFFFF
+                if rtt < 0x80000000:
+                    self.round_trip_time = rtt / 65536
@@ -0,0 +1,140 @@
+import struct
+
+RTP_HEADER_SIZE = 12
+RTP_VERSION = 2
+
+_HEADER = struct.Struct("!BBHII")
+
+
+class RtpPacket:
+    """
+    Zero-copy view of an RTP packet (RFC 3550).
+
+    Header fields are decoded on access straight from the underlying buffer, and the payload
+    is a memoryview slice of it, so the view is only valid until the buffer is reused.
+    """
+
+    __slots__ = ("_view", "payload_offset", "payload_end")
+
+    def __init__(self, view: memoryview, payload_offset: int, payload_end: int):
+        """
+        Initializes the view. Use RtpPacket.parse to validate the packet and locate its payload.
+
+        :param view: The memoryview of the raw packet.
+        :param payload_offset: The offset of the payload after the CSRC list and header extension.
+        :param payload_end: The end of the payload before the padding.
+        """
+        self._view = view
+        self.payload_offset = payload_offset
+        self.payload_end = payload_end
+
+    @classmethod
+    def parse(cls, data: bytes | bytearray | memoryview) -> "RtpPacket":
+        """
+        Parses an RTP packet, skipping CSRC identifiers, the header extension and padding.
+
+        :param data: The raw RTP packet. It is not copied.
+        :return: The packet view.
+        :raises ValueError: If the data is not a valid RTP packet.
+        """
+        view = data if isinstance(data, memoryview) else memoryview(data)
+        size = len(view)
+        if size < RTP_HEADER_SIZE:
+            raise ValueError("RTP packet is shorter than the fixed header.")
+        first_byte = view[0]
+        if first_byte >> 6 != RTP_VERSION:
+            raise ValueError(f"Unsupported RTP version {first_byte >> 6}.")
+
+        offset = RTP_HEADER_SIZE + 4 * (first_byte & 0x0F)
+        if first_byte & 0x10:
+            # Header extension: 16-bit profile id, 16-bit length in 32-bit words
+            if size < offset + 4:
+                raise ValueError("RTP header extension is truncated.")
+            offset += 4 + 4 * ((view[offset + 2] << 8) | view[offset + 3])
+
+        end = size - view[size - 1] if first_byte & 0x20 else size
+        if offset > end:
+            raise ValueError("RTP payload offset is beyond the end of the packet.")
+
+        return cls(view, offset, end)
+
+    @property
+    def version(self) -> int:
+        return self._view[0] >> 6
+
+    @property
+    def payload_type(self) -> int:
+        return self._view[1] & 0x7F
+
+    @property
+    def marker(self) -> bool:
+        return bool(self._view[1] & 0x80)
+
+    @property
+    def sequence_number(self) -> int:
+        return (self._view[2] << 8) | self._view[3]
+
+    @property
+    def timestamp(self) -> int:
+        return _HEADER.unpack_from(self._view)[3]
+
+    @property
+    def ssrc(self) -> int:
+        return _HEADER.unpack_from(self._view)[4]
+
+    @property
+    def payload(self) -> memoryview:
+        """The payload as a memoryview of the packet buffer."""
+        return self._view[self.payload_offset : self.payload_end]
+
+
+class RtpPacketBuilder:
+    """
+    RtpPacketBuilder writes outbound RTP packets into a single preallocated buffer.
+    Each built packet is a memoryview of that buffer and is valid until the next build.
+    """
+
+    def __init__(self, ssrc: int, payload_type: int = 0, max_payload_size: int = 1500):
+        """
+        Initializes the builder for a stream.
+
+        :param ssrc: The synchronization source identifier of the stream.
+        :param payload_type: The RTP payload type, default is 0 (PCMU).
+        :param max_payload_size: The largest payload the buffer can hold, default is 1500 bytes.
+        """
+        self.ssrc = ssrc
+        self.payload_type = payload_type
+        self._buffer = bytearray(RTP_HEADER_SIZE + max_payload_size)
+        self._view = memoryview(self._buffer)
+
+    def build(
+        self,
+        sequence_number: int,
+        timestamp: int,
+        payload: bytes | memoryview,
+        marker: bool = False,
+    ) -> memoryview:
+        """
+        Writes a packet into the buffer.
+
+        :param sequence_number: The 16-bit sequence number.
+        :param timestamp: The 32-bit RTP timestamp.
+        :param payload: The payload to copy into the packet.
+        :param marker: Whether to set the marker bit, default is False.
+        :return: A memoryview of the packet.
+        :raises ValueError: If the payload does not fit into the buffer.
+        """
+        end = RTP_HEADER_SIZE + len(payload)
+        if end > len(self._buffer):
+            raise ValueError("RTP payload does not fit into the packet buffer.")
+        _HEADER.pack_into(
+            self._buffer,
+            0,
+            RTP_VERSION << 6,
+            (0x80 if marker else 0) | self.payload_type,
+            sequence_number & 0xFFFF,
+            timestamp & 0xFFFFFFFF,
+            self.ssrc,
+        )
+        self._view[RTP_HEADER_SIZE:end] = payload
+        return self._view[:end]
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import random
+from typing import AsyncIterator
+
+from media_clock import ClockedStream, MediaClock
+from media_transport import MediaTransport
+from rtp_packet import RtpPacketBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundRtpSession(ClockedStream):
+    """
+    OutboundRtpSession is the single outbound RTP stream of a call.
+
+    The stream keeps one SSRC and monotonic sequence numbers and timestamps for the whole call.
+    It sends a frame on every media clock tick: audio while something is playing and silence
+    otherwise, so Asterisk never sees the source go quiet or restart. The marker bit is set on
+    the first frame of every talkspurt.
+    """
+
+    def __init__(
+        self,
+        transport: MediaTransport,
+        addr: tuple[str, int],
+        payload_type: int = 0,
+        sample_rate: int = 8000,
+        frame_duration_ms: int = 20,
+        silence_byte: int = 0xFF,
+    ):
+        """
+        Initializes the session.
+
+        :param transport: The media transport to send the packets through.
+        :param addr: The address (IP, port) to send the packets to.
+        :param payload_type: The RTP payload type, default is 0 (PCMU).
+        :param sample_rate: The sample rate of the audio, default is 8000 Hz.
+        :param frame_duration_ms: The duration of each frame in milliseconds, default is 20 ms.
+        :param silence_byte: The byte used for silence frames, default is µ-law silence (0xFF).
+        """
+        self.addr = addr
+        self.frame_duration_ms = frame_duration_ms
+        self._transport = transport
+        self._frame_size = int(sample_rate / 1000 * frame_duration_ms)
+        self._packet_builder = RtpPacketBuilder(
+            random.randint(0, 0xFFFFFFFF), payload_type, self._frame_size
+        )
+        self._silence_byte = silence_byte
+        self._silence_frame = bytes([silence_byte]) * self._frame_size
+        self._frame = bytearray(self._frame_size)
+        # RFC 3550 recommends random initial values
+        self._sequence_number = random.randint(0, 0xFFFF)
+        self._timestamp = random.randint(0, 0xFFFFFFFF)
+
+        self._audio: memoryview | None = None
+        self._position = 0
+        self._played: asyncio.Future | None = None
+        self._stream_buffer: bytearray | None = None
+        self._stream_reader: asyncio.Task | None = None
+        self._stream_finished = False
+        self._stream_started = False
+        self._in_talkspurt = False
+        self._task: asyncio.Task | None = None
+        self._send_failing = False
+
+        self.packets_sent = 0
+        # Frames the transport failed to send, e.g. on ENOBUFS, lost like on the network
+        self.dropped_packets = 0
+        self.octets_sent = 0
+        self.silence_packets_sent = 0
+        self.underruns = 0
+
+    @property
+    def ssrc(self) -> int:
+        return self._packet_builder.ssrc
+
+    @property
+    def timestamp(self) -> int:
+        """The RTP timestamp of the next frame, used by RTCP sender reports."""
+        return self._timestamp
+
+    def start(self, media_clock: MediaClock) -> None:
+        """
+        Starts sending frames on every tick of the given clock.
+
+        :param media_clock: The clock pacing the session.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(media_clock.play(self))
+            self._task.add_done_callback(self._on_stream_done)
+
+    def close(self) -> None:
+        """Stops the stream and cancels the current playback."""
+        self.stop_playback()
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def is_playing(self) -> bool:
+        return self._audio is not None or self._stream_buffer is not None
+
+    async def play(self, audio_data: bytes | AsyncIterator[bytes]) -> None:
+        """
+        Plays the given audio in the stream and waits until its last frame is sent.
+        If the caller is cancelled, the rest of the audio is dropped.
+
+        :param audio_data: The audio data to play, either complete or as an async iterator of chunks.
+            An iterator is played from its first complete frame on, and is cancelled together
+            with the playback.
+        :raises RuntimeError: If another playback is in progress or the stream has stopped.
+        """
+        if self.is_playing():
+            raise RuntimeError("Another playback is in progress.")
+        if self._task is not None and self._task.done():
+            raise RuntimeError("The outbound RTP stream has stopped.")
+        if not isinstance(audio_data, (bytes, bytearray, memoryview)):
+            await self._play_stream(audio_data)
+            return
+        if not audio_data:
+            return
+        self._played = asyncio.get_running_loop().create_future()
+        self._position = 0
+        self._audio = memoryview(audio_data)
+        try:
+            await self._played
+        finally:
+            self.stop_playback()
+
+    def stop_playback(self) -> None:
+        """Drops the rest of the current audio; silence is sent from the next tick on."""
+        self._audio = None
+        self._stream_buffer = None
+        if self._stream_reader and not self._stream_reader.done():
+            self._stream_reader.cancel()
+        self._stream_reader = None
+        if self._played and not self._played.done():
+            self._played.cancel()
+        self._played = None
+
+    async def on_tick(self) -> bool:
+        if self._audio is not None:
+            payload = self._next_audio_frame()
+        elif self._stream_buffer is not None:
+            payload = self._next_stream_frame()
+        else:
+            payload = None
+
+        if payload is None:
+            payload = self._silence_frame
+            marker = False
+            # An underrun keeps the talkspurt going, so resuming it is not marked
+            self._in_talkspurt = self._in_talkspurt and self._stream_buffer is not None
+            self.silence_packets_sent += 1
+        else:
+            marker = not self._in_talkspurt
+            self._in_talkspurt = True
+
+        packet = self._packet_builder.build(
+            self._sequence_number, self._timestamp, payload, marker=marker
+        )
+        try:
+            await self._transport.sendto(packet, self.addr)
+        except OSError as e:
+            # A datagram a non-blocking send can't take is dropped, the stream goes on
+            self.dropped_packets += 1
+            if not self._send_failing:
+                logger.warning(
+                    "Failed to send RTP to %s, dropping frames: %s", self.addr, e
+                )
+            self._send_failing = True
+        else:
+            if self._send_failing:
+                logger.info(
+                    "RTP to %s sent again, %s frames dropped so far",
+                    self.addr,
+                    self.dropped_packets,
+                )
+            self._send_failing = False
+            self.packets_sent += 1
+            self.octets_sent += len(payload)
+
+        # The sequence goes on over dropped frames, so the peer sees them as lost
+        self._sequence_number = (self._sequence_number + 1) & 0xFFFF
+        self._timestamp = (self._timestamp + self._frame_size) & 0xFFFFFFFF
+        return True
+
+    def _on_stream_done(self, task: asyncio.Task) -> None:
+        """Fails the current playback of a stream that stopped, so it is not awaited forever."""
+        if task.cancelled():
+            error = RuntimeError("The outbound RTP stream was stopped.")
+        else:
+            error = task.exception() or RuntimeError(
+                "The outbound RTP stream has ended."
+            )
+            logger.error("Outbound RTP stream to %s stopped: %r", self.addr, error)
+        if self._played and not self._played.done():
+            self._played.set_exception(error)
+
+    async def _play_stream(self, chunks: AsyncIterator[bytes]) -> None:
+        self._played = asyncio.get_running_loop().create_future()
+        self._stream_buffer = bytearray()
+        self._stream_finished = False
+        self._stream_started = False
+        self._stream_reader = asyncio.create_task(self._read_stream(chunks))
+        try:
+            await self._played
+        finally:
+            self.stop_playback()
+
+    async def _read_stream(self, chunks: AsyncIterator[bytes]) -> None:
+        """Moves chunks from the producer into the stream buffer and closes the producer when done."""
+        try:
+            async for chunk in chunks:
+                if self._stream_buffer is None:
+                    break
+                self._stream_buffer += chunk
+        except Exception as e:
+            if self._played and not self._played.done():
+                self._played.set_exception(e)
+        finally:
+            # A reader cancelled by stop_playback must not touch the next stream's state
+            if self._stream_reader is asyncio.current_task():
+                self._stream_finished = True
+            aclose = getattr(chunks, "aclose", None)
+            if aclose:
+                await aclose()
+
+    def _next_stream_frame(self) -> bytearray | None:
+        buffered = len(self._stream_buffer)
+        if buffered >= self._frame_size or (self._stream_finished and buffered):
+            # The last frame is padded with silence to keep the timestamps regular
+            size = min(buffered, self._frame_size)
+            self._frame[:size] = self._stream_buffer[:size]
+            self._frame[size:] = self._silence_frame[size:]
+            del self._stream_buffer[:size]
+            self._stream_started = True
+            return self._frame
+        if self._stream_finished:
+            self._stream_buffer = None
+            if self._played and not self._played.done():
+                self._played.set_result(None)
+            return None
+        if self._stream_started:
+            # The producer fell behind, bridge the gap with silence
+            self.underruns += 1
+        return None
+
+    def _next_audio_frame(self) -> memoryview | bytearray:
+        start = self._position
+        end = start + self._frame_size
+        self._position = end
+        if end >= len(self._audio):
+            # The last frame is padded with silence to keep the timestamps regular
+            remainder = len(self._audio) - start
+            self._frame[:remainder] = self._audio[start:]
+            self._frame[remainder:] = self._silence_frame[remainder:]
+            self._audio = None
+            if self._played and not self._played.done():
+                self._played.set_result(None)
+            return self._frame
+        return self._audio[start:end]
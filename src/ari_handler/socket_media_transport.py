@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import socket
+
+from media_transport import MediaTransport
+
+logger = logging.getLogger(__name__)
+
+
+class SocketMediaTransport(MediaTransport):
+    """
+    SocketMediaTransport owns a dedicated non-blocking UDP socket for a single call.
+    """
+
+    def __init__(self, ip: str, port: int, sock: socket.socket | None = None):
+        """
+        Initializes the transport with the address to bind the socket to.
+
+        :param ip: The IP address to bind the socket to.
+        :param port: The port number to bind the socket to.
+        :param sock: An already bound non-blocking socket to use, e.g. one leased from a PortPool.
+        """
+        self._ip = ip
+        self._port = port
+        self._sock = sock
+
+    async def open(self) -> None:
+        """Creates a UDP socket and binds it to the configured IP and port, unless it is already bound."""
+        if self._sock:
+            return
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self._ip, self._port))
+        self._sock.setblocking(False)
+
+    async def recvfrom_into(
+        self, buffer: bytearray | memoryview
+    ) -> tuple[int, tuple[str, int]]:
+        """
+        Receives a single datagram from the socket directly into the given buffer.
+
+        :param buffer: The preallocated buffer to receive the datagram into.
+        :return: A tuple of the number of bytes received and the sender's address.
+        :raises RuntimeError: If the socket is not initialized.
+        """
+        if not self._sock:
+            raise RuntimeError("Socket is not initialized.")
+        loop = asyncio.get_running_loop()
+        return await loop.sock_recvfrom_into(self._sock, buffer)
+
+    async def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """
+        Sends a single datagram to the given address.
+
+        :param data: The datagram to send.
+        :param addr: The address (IP, port) to send the datagram to.
+        :raises RuntimeError: If the socket is not initialized.
+        """
+        if not self._sock:
+            raise RuntimeError("Socket is not initialized.")
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendto(self._sock, data, addr)
+
+    def close(self) -> None:
+        """Closes the socket."""
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+            logger.info("Socket closed.")
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
 
 
 class SpeechRecognizer(ABC):
@@ -10,5 +11,131 @@ class SpeechRecognizer(ABC):
     """
 
     @abstractmethod
-    async def recognize(self, ulaw_data: bytes) -> Optional[str]:
+    async def recognize(self, ulaw_data: bytes | memoryview) -> Optional[str]:
+        pass
+
+    async def warm_up(self) -> None:
+        """Opens the service's connections before the first call, nothing to do by default."""
+        pass
+
+
+@dataclass
+class RecognitionResult:
+    """Data class to represent a hypothesis of a streaming recognition."""
+
+    text: str
+    is_final: bool = False
+    # The caller finished their turn, text is the whole utterance
+    end_of_turn: bool = False
+
+
+class RecognitionSession(ABC):
+    """
+    Abstract base class for the streaming recognition of one call's utterances.
+
+    Audio is fed while the caller speaks, so when the utterance ends only its last
+    frames remain to be decoded. A session is used by a single call and recognizes
+    one utterance at a time.
+    """
+
+    @abstractmethod
+    async def accept(
+        self, ulaw_data: bytes | memoryview
+    ) -> Optional[RecognitionResult]:
+        """
+        Feeds the next audio of the current utterance.
+
+        :param ulaw_data: Audio data in u-law format.
+        :return: A new partial hypothesis of the utterance, if there is one.
+        """
+        pass
+
+    @abstractmethod
+    async def finish(self) -> Optional[str]:
+        """
+        Ends the current utterance, the session is then ready for the next one.
+
+        :return: The final transcript or None if nothing was recognized.
+        """
+        pass
+
+    @abstractmethod
+    async def reset(self) -> None:
+        """Drops the current utterance without recognizing it."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Releases the resources of the session."""
+        pass
+
+    async def __aenter__(self) -> "RecognitionSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+
+class StreamingSpeechRecognizer(SpeechRecognizer):
+    """
+    Abstract base class for speech recognizers that also recognize audio while it arrives.
+    """
+
+    @abstractmethod
+    async def create_session(self) -> RecognitionSession:
+        """
+        Creates the recognition session of a call.
+
+        :return: The session, to be closed when the call ends.
+        """
+        pass
+
+
+class DuplexRecognitionSession(ABC):
+    """
+    Abstract base class for recognizing a whole call as one continuous audio stream.
+
+    Every frame of the call is sent, speech or not, and the recognizer itself decides
+    where the caller's turns end. The results are read by iterating the session, and
+    the last result of every turn has end_of_turn set.
+    """
+
+    @abstractmethod
+    async def send(self, ulaw_data: bytes | memoryview) -> None:
+        """
+        Sends the next audio of the call.
+
+        :param ulaw_data: Audio data in u-law format.
+        """
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Ends the stream and the iteration of the results."""
+        pass
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[RecognitionResult]:
+        pass
+
+    async def __aenter__(self) -> "DuplexRecognitionSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+
+class DuplexSpeechRecognizer(StreamingSpeechRecognizer):
+    """
+    Abstract base class for speech recognizers that also detect the end of the caller's turns,
+    so the call's audio needs no local endpointing.
+    """
+
+    @abstractmethod
+    async def create_duplex_session(self) -> DuplexRecognitionSession:
+        """
+        Creates the recognition session of a call.
+
+        :return: The session, to be closed when the call ends.
+        """
         pass
@@ -11,3 +11,15 @@ class SpeechSynthesizer(ABC):
     @abstractmethod
     async def synthesize(self, text: str) -> bytes:
         pass
+
+    @property
+    def cache_key(self) -> str:
+        """
+        Identifies the provider and voice of the audio, so it can be cached across instances,
+        the class name by default.
+        """
+        return type(self).__name__
+
+    async def warm_up(self) -> None:
+        """Opens the service's connections before the first call, nothing to do by default."""
+        pass
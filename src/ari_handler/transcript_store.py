@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class Transcript:
+    """Data class to represent the transcript of a recording by one engine."""
+
+    path: str
+    engine: str
+    text: str
+    channel_id: str | None = None
+    audio_seconds: float = 0.0
+    processing_seconds: float = 0.0
+    # The file's modification time and size when it was transcribed, to notice a re-recording
+    mtime: float = 0.0
+    size: int = 0
+    error: str | None = None
+
+
+class TranscriptStore:
+    """
+    TranscriptStore keeps the transcripts of the call recordings in an SQLite database.
+
+    A recording is identified by its path and the engine that transcribed it, and is
+    transcribed again only if the file changed since. The transcripts are indexed by
+    channel and time, and by their words through FTS5 where SQLite has it.
+    """
+
+    def __init__(self, path: str = "transcripts.db"):
+        """
+        Opens the store, creating the database if needed.
+
+        :param path: The SQLite database file, default is 'transcripts.db'.
+        """
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS transcripts (
+                path TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                channel_id TEXT,
+                text TEXT NOT NULL,
+                audio_seconds REAL NOT NULL,
+                processing_seconds REAL NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                error TEXT,
+                transcribed_at REAL NOT NULL,
+                PRIMARY KEY (path, engine)
+            );
+            CREATE INDEX IF NOT EXISTS transcripts_channel_id ON transcripts (channel_id);
+            CREATE INDEX IF NOT EXISTS transcripts_transcribed_at ON transcripts (transcribed_at);
+            """)
+        try:
+            self._connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5("
+                "text, path UNINDEXED, engine UNINDEXED)"
+            )
+            self._full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5, search() falls back to LIKE
+            self._full_text = False
+
+    def pending(self, paths: list[str], engine: str) -> list[str]:
+        """
+        Filters the recordings the engine has not transcribed yet, or that changed since.
+        Failed transcriptions are retried.
+
+        :param paths: The recordings.
+        :param engine: The engine name.
+        :return: The recordings to transcribe.
+        """
+        done = {
+            path: (mtime, size)
+            for path, mtime, size in self._connection.execute(
+                "SELECT path, mtime, size FROM transcripts WHERE engine = ? AND error IS NULL",
+                (engine,),
+            )
+        }
+        pending = []
+        for path in paths:
+            stat = os.stat(path)
+            if done.get(path) != (stat.st_mtime, stat.st_size):
+                pending.append(path)
+        return pending
+
+    def save(self, transcript: Transcript) -> None:
+        """
+        Stores a transcript, replacing the engine's previous one of the recording.
+
+        :param transcript: The transcript.
+        """
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    transcript.path,
+                    transcript.engine,
+                    transcript.channel_id,
+                    transcript.text,
+                    transcript.audio_seconds,
+                    transcript.processing_seconds,
+                    transcript.mtime,
+                    transcript.size,
+                    transcript.error,
+                    time.time(),
+                ),
+            )
+            if self._full_text:
+                self._connection.execute(
+                    "DELETE FROM transcripts_fts WHERE path = ? AND engine = ?",
+                    (transcript.path, transcript.engine),
+                )
+                self._connection.execute(
+                    "INSERT INTO transcripts_fts (text, path, engine) VALUES (?, ?, ?)",
+                    (transcript.text, transcript.path, transcript.engine),
+                )
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[str, str, str]]:
+        """
+        Finds the transcripts containing the given words.
+
+        :param query: The words, an FTS5 query where available.
+        :param limit: The maximum number of results, default is 20.
+        :return: A list of (path, engine, text) tuples.
+        """
+        if self._full_text:
+            return self._connection.execute(
+                "SELECT path, engine, text FROM transcripts_fts WHERE transcripts_fts MATCH ? "
+                "ORDER BY rank LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return self._connection.execute(
+            "SELECT path, engine, text FROM transcripts WHERE text LIKE ? LIMIT ?",
+            (f"%{query}%", limit),
+        ).fetchall()
+
+    def close(self) -> None:
+        """Closes the database."""
+        self._connection.close()
+
+    def __enter__(self) -> "TranscriptStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
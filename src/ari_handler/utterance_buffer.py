@@ -0,0 +1,107 @@
+class UtteranceBuffer:
+    """
+    UtteranceBuffer collects the audio of a call's current utterance in preallocated memory.
+
+    While idle, frames only go to a small ring holding the last pre_roll_ms of audio, so the
+    soft onset the VAD needed to confirm speech is not lost. start() copies that pre-roll in
+    front of the utterance. Appending, trimming and resetting never reallocate, and audio past
+    max_duration_ms is dropped. The utterance is read as a memoryview of the internal buffer,
+    which stays valid until the buffer is appended to or reset.
+    """
+
+    def __init__(
+        self,
+        max_duration_ms: int = 15000,
+        pre_roll_ms: int = 300,
+        sample_rate: int = 8000,
+    ):
+        """
+        Initializes the buffer.
+
+        :param max_duration_ms: The maximum length of an utterance, pre-roll included, default is 15 s.
+        :param pre_roll_ms: The audio kept from before start() is called, default is 300 ms.
+        :param sample_rate: The sample rate of the µ-law audio, default is 8000 Hz.
+        """
+        bytes_per_ms = sample_rate // 1000
+        self._buffer = bytearray(max_duration_ms * bytes_per_ms)
+        self._view = memoryview(self._buffer)
+        self._length = 0
+        self._pre_roll = bytearray(pre_roll_ms * bytes_per_ms)
+        self._pre_roll_position = 0
+        self._pre_roll_length = 0
+        self._recording = False
+        self.dropped_bytes = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def is_recording(self) -> bool:
+        """Whether frames are added to the utterance rather than to the pre-roll."""
+        return self._recording
+
+    @property
+    def is_full(self) -> bool:
+        return self._length == len(self._buffer)
+
+    def start(self) -> None:
+        """Starts an utterance with the pre-roll audio collected so far."""
+        if self._recording:
+            return
+        self._recording = True
+        self._length = 0
+        # The ring's oldest byte is at the write position once it has wrapped around
+        start = (self._pre_roll_position - self._pre_roll_length) % max(
+            len(self._pre_roll), 1
+        )
+        head = min(self._pre_roll_length, len(self._pre_roll) - start)
+        self._write(memoryview(self._pre_roll)[start : start + head])
+        self._write(memoryview(self._pre_roll)[: self._pre_roll_length - head])
+        self._pre_roll_length = 0
+
+    def append(self, frame: bytes | bytearray | memoryview) -> None:
+        """
+        Adds a frame to the utterance, or to the pre-roll while idle.
+
+        :param frame: The µ-law frame.
+        """
+        if self._recording:
+            self._write(frame)
+            return
+
+        size = len(self._pre_roll)
+        if not size:
+            return
+        frame = memoryview(frame)[-size:]
+        head = min(len(frame), size - self._pre_roll_position)
+        self._pre_roll[self._pre_roll_position : self._pre_roll_position + head] = (
+            frame[:head]
+        )
+        self._pre_roll[: len(frame) - head] = frame[head:]
+        self._pre_roll_position = (self._pre_roll_position + len(frame)) % size
+        self._pre_roll_length = min(self._pre_roll_length + len(frame), size)
+
+    def trim_end(self, nbytes: int) -> None:
+        """
+        Drops the end of the utterance, e.g. its trailing silence.
+
+        :param nbytes: The number of bytes to drop.
+        """
+        self._length = max(self._length - nbytes, 0)
+
+    def view(self) -> memoryview:
+        """Returns the utterance without copying it."""
+        return self._view[: self._length]
+
+    def reset(self) -> None:
+        """Drops the utterance and the pre-roll and goes back to idle."""
+        self._recording = False
+        self._length = 0
+        self._pre_roll_position = 0
+        self._pre_roll_length = 0
+
+    def _write(self, data: bytes | bytearray | memoryview) -> None:
+        size = min(len(data), len(self._buffer) - self._length)
+        self._buffer[self._length : self._length + size] = memoryview(data)[:size]
+        self._length += size
+        self.dropped_bytes += len(data) - size
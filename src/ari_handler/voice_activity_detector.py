@@ -0,0 +1,135 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+
+import numpy as np
+
+
+class VadEvent(Enum):
+    """Endpointing events of a VoiceActivityDetector."""
+
+    SPEECH_START = "speech_start"
+    SPEECH_END = "speech_end"
+
+
+class VoiceActivityDetector(ABC):
+    """
+    Abstract base class for voice activity detection on a call's µ-law frames.
+
+    Subclasses classify frames as speech or not. This class turns the classification into
+    endpointing events with thresholds in milliseconds: SPEECH_START once enough speech has
+    been heard, and SPEECH_END after enough silence following it, or when the utterance
+    reaches its maximum length. A burst of speech that ends before SPEECH_START is discarded.
+    Every call needs its own instance.
+    """
+
+    def __init__(
+        self,
+        frame_duration_ms: int = 20,
+        speech_start_ms: int = 200,
+        speech_end_ms: int = 400,
+        max_utterance_ms: int = 15000,
+    ):
+        """
+        Initializes the detector.
+
+        :param frame_duration_ms: The duration of each frame in milliseconds, default is 20 ms.
+        :param speech_start_ms: The speech needed to start an utterance, default is 200 ms.
+        :param speech_end_ms: The silence that ends an utterance, default is 400 ms.
+        :param max_utterance_ms: The length at which an utterance is ended regardless of silence,
+            default is 15 s.
+        """
+        self.frame_duration_ms = frame_duration_ms
+        self.speech_start_ms = speech_start_ms
+        self.speech_end_ms = speech_end_ms
+        self.max_utterance_ms = max_utterance_ms
+        self.trailing_silence_ms = 0
+        self._reset_utterance()
+
+    @property
+    def in_speech(self) -> bool:
+        """Whether an utterance has started and not ended yet."""
+        return self._in_speech
+
+    @property
+    def is_active(self) -> bool:
+        """Whether speech has been heard since the last utterance ended, confirmed or not."""
+        return self._active
+
+    @property
+    def utterance_ms(self) -> int:
+        """The length of the current utterance, from its first speech frame."""
+        return self._utterance_ms
+
+    @abstractmethod
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Classifies consecutive frames of the call.
+
+        :param frames: A uint8 array of µ-law frames, one frame per row.
+        :return: A bool array, True for the frames containing speech.
+        """
+        pass
+
+    def process(self, frame: bytes | bytearray | memoryview) -> VadEvent | None:
+        """
+        Processes the next frame of the call.
+
+        :param frame: The µ-law frame.
+        :return: The endpointing event caused by the frame, if any.
+        """
+        codes = np.frombuffer(frame, dtype=np.uint8)
+        return self._advance(bool(self.classify(codes.reshape(1, -1))[0]))
+
+    def process_frames(
+        self, frames: bytes | bytearray | memoryview, frame_size: int = 160
+    ) -> list[VadEvent | None]:
+        """
+        Processes many consecutive frames of the call with one classification call.
+
+        :param frames: The concatenated µ-law frames.
+        :param frame_size: The size of each frame, default is 160 bytes.
+        :return: The endpointing event caused by every frame.
+        """
+        codes = np.frombuffer(frames, dtype=np.uint8).reshape(-1, frame_size)
+        return [self._advance(bool(is_speech)) for is_speech in self.classify(codes)]
+
+    def reset(self) -> None:
+        """Drops the current utterance, e.g. after the audio was discarded."""
+        self.trailing_silence_ms = 0
+        self._reset_utterance()
+
+    def _reset_utterance(self) -> None:
+        self._in_speech = False
+        self._active = False
+        self._speech_ms = 0
+        self._silence_ms = 0
+        self._utterance_ms = 0
+
+    def _advance(self, is_speech: bool) -> VadEvent | None:
+        if is_speech:
+            self._active = True
+            self._speech_ms += self.frame_duration_ms
+            self._silence_ms = 0
+        elif self._active:
+            self._silence_ms += self.frame_duration_ms
+        if not self._active:
+            return None
+        self._utterance_ms += self.frame_duration_ms
+
+        if not self._in_speech:
+            if self._speech_ms >= self.speech_start_ms:
+                self._in_speech = True
+                return VadEvent.SPEECH_START
+            if self._silence_ms >= self.speech_end_ms:
+                # Too short to be speech, e.g. a click or a cough
+                self._reset_utterance()
+            return None
+
+        if (
+            self._silence_ms >= self.speech_end_ms
+            or self._utterance_ms >= self.max_utterance_ms
+        ):
+            self.trailing_silence_ms = self._silence_ms
+            self._reset_utterance()
+            return VadEvent.SPEECH_END
+        return None
@@ -4,7 +4,15 @@ from typing import Optional
 
 import grpc
 from audio_converter import AudioConverter
-from speech_recognizer import SpeechRecognizer
+from g711 import ulaw_to_linear
+from grpc_channel_pool import GrpcChannelManager
+from speech_recognizer import (
+    DuplexRecognitionSession,
+    DuplexSpeechRecognizer,
+    RecognitionResult,
+    RecognitionSession,
+    StreamingSpeechRecognizer,
+)
 from yandex_credentials_provider import YandexCredentialsProvider
 
 from generated import stt_service_pb2_grpc as stt_grpc
@@ -12,45 +20,212 @@ from generated.yandex.cloud.ai.stt.v3 import stt_pb2 as stt_messages
 
 logger = logging.getLogger(__name__)
 
+STT_ENDPOINT = "stt.api.cloud.yandex.net:443"
 
-class YandexSpeechRecognizer(SpeechRecognizer):
+# Errors a reopened stream may get past; UNAUTHENTICATED is retried with a new IAM token
+RETRYABLE_STATUS_CODES = frozenset(
+    {
+        grpc.StatusCode.UNAVAILABLE,
+        grpc.StatusCode.DEADLINE_EXCEEDED,
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+        grpc.StatusCode.ABORTED,
+        grpc.StatusCode.INTERNAL,
+        grpc.StatusCode.UNKNOWN,
+        grpc.StatusCode.UNAUTHENTICATED,
+    }
+)
+
+
+def _session_options_request(
+    eou_classifier: stt_messages.EouClassifierOptions | None = None,
+) -> stt_messages.StreamingRequest:
+    """
+    Builds the one-time initial message of a recognition stream of 8 kHz LINEAR16 audio.
+
+    :param eou_classifier: The end of utterance detection options, default is the service's.
+    """
+    return stt_messages.StreamingRequest(
+        session_options=stt_messages.StreamingOptions(
+            recognition_model=stt_messages.RecognitionModelOptions(
+                model="general",
+                audio_format=stt_messages.AudioFormatOptions(
+                    raw_audio=stt_messages.RawAudio(
+                        audio_encoding=stt_messages.RawAudio.LINEAR16_PCM,
+                        sample_rate_hertz=8000,
+                        audio_channel_count=1,
+                    )
+                ),
+            ),
+            eou_classifier=eou_classifier,
+        )
+    )
+
+
+async def _request_iterator(
+    requests: asyncio.Queue, session_options: stt_messages.StreamingRequest
+):
+    """Yields the session options, then the queued requests until None is queued."""
+    yield session_options
+    while (request := await requests.get()) is not None:
+        yield request
+
+
+class YandexRecognitionSession(RecognitionSession):
+    """
+    YandexRecognitionSession streams a call's utterances to Yandex STT while they are spoken.
+
+    Every utterance is one RecognizeStreaming call: audio chunks are sent as they are
+    accepted, and finish() only closes the request stream and waits for the last finals.
+    """
+
+    def __init__(self, recognizer: "YandexSpeechRecognizer"):
+        """
+        Initializes the session.
+
+        :param recognizer: The recognizer providing the credentials and channels.
+        """
+        self._recognizer = recognizer
+        self._channel: grpc.aio.Channel | None = None
+        self._requests: asyncio.Queue | None = None
+        self._call = None
+        self._responses_task: asyncio.Task | None = None
+        self._finals: list[str] = []
+        self._partial: RecognitionResult | None = None
+
+    async def accept(
+        self, ulaw_data: bytes | memoryview
+    ) -> Optional[RecognitionResult]:
+        """
+        Sends the next audio of the current utterance.
+
+        :param ulaw_data: Audio data in u-law format.
+        :return: The latest hypothesis received since the previous call, if there is one.
+        """
+        if self._requests is None:
+            await self._start_stream()
+        pcm_data = ulaw_to_linear(ulaw_data).astype("<i2").tobytes()
+        self._requests.put_nowait(
+            stt_messages.StreamingRequest(chunk=stt_messages.AudioChunk(data=pcm_data))
+        )
+        partial, self._partial = self._partial, None
+        return partial
+
+    async def finish(self) -> Optional[str]:
+        """
+        Ends the current utterance, the session is then ready for the next one.
+
+        :return: The final transcript or None if nothing was recognized.
+        """
+        if self._requests is None:
+            return None
+        self._requests.put_nowait(None)
+        try:
+            await self._responses_task
+        except grpc.aio.AioRpcError as e:
+            logger.error("❌ STT error: %s", e)
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                self._recognizer.channel_manager.discard(STT_ENDPOINT, self._channel)
+        text = " ".join(self._finals).strip()
+        self._end_stream()
+        logger.info("✅ Recognized: %s", text)
+        return text or None
+
+    async def reset(self) -> None:
+        """Drops the current utterance without recognizing it."""
+        if self._call:
+            self._call.cancel()
+        if self._responses_task:
+            self._responses_task.cancel()
+        self._end_stream()
+
+    async def close(self) -> None:
+        """Cancels the current stream, the channel stays open for the other calls."""
+        await self.reset()
+
+    async def _start_stream(self) -> None:
+        # Every utterance takes the next pooled channel
+        self._channel = self._recognizer.channel_manager.get(STT_ENDPOINT)
+        stub = stt_grpc.RecognizerStub(self._channel)
+        metadata = await self._recognizer.get_metadata()
+        self._requests = asyncio.Queue()
+        self._call = stub.RecognizeStreaming(
+            _request_iterator(self._requests, _session_options_request()),
+            metadata=metadata,
+        )
+        self._responses_task = asyncio.create_task(self._read_responses(self._call))
+
+    def _end_stream(self) -> None:
+        self._channel = None
+        self._requests = None
+        self._call = None
+        self._responses_task = None
+        self._finals = []
+        self._partial = None
+
+    async def _read_responses(self, response_stream) -> None:
+        async for response in response_stream:
+            if response.HasField("final"):
+                texts = [alt.text for alt in response.final.alternatives[:1]]
+                self._finals.extend(text for text in texts if text)
+                self._partial = RecognitionResult(" ".join(self._finals), is_final=True)
+            elif response.HasField("partial") and response.partial.alternatives:
+                text = response.partial.alternatives[0].text
+                if text:
+                    self._partial = RecognitionResult(" ".join([*self._finals, text]))
+
+
+class YandexSpeechRecognizer(StreamingSpeechRecognizer):
     """
     Fully async Yandex STT Recognizer using gRPC aio.
     """
 
-    def __init__(self, credentials_provider: YandexCredentialsProvider):
+    def __init__(
+        self,
+        credentials_provider: YandexCredentialsProvider,
+        channel_manager: GrpcChannelManager | None = None,
+    ):
+        """
+        Initialize the YandexSpeechRecognizer with the given credentials provider.
+
+        :param credentials_provider: Instance of YandexCredentialsProvider to manage IAM tokens.
+        :param channel_manager: The long-lived gRPC channels, shared with the other Yandex clients,
+            default is a manager of the recognizer's own.
+        """
         self.credentials_provider = credentials_provider
         self.iam_token = None
+        self.channel_manager = channel_manager or GrpcChannelManager()
 
-    async def recognize(self, ulaw_data: bytes) -> Optional[str]:
-        logger.info("🎙️ Starting STT recognition")
+    async def warm_up(self) -> None:
+        """Connects the STT channels before the first utterance."""
+        await self.channel_manager.warm_up(STT_ENDPOINT)
 
+    async def get_metadata(self) -> list[tuple[str, str]]:
+        """Returns the authorization metadata of a recognition call."""
         if not self.iam_token:
             self.iam_token = await self.credentials_provider.get_iam_token()
-
-        pcm_data = await AudioConverter.ulaw_to_pcm(ulaw_data)
-
-        metadata = [
+        return [
             ("authorization", f"Bearer {self.iam_token}"),
             ("x-folder-id", self.credentials_provider.folder_id),
         ]
 
+    async def create_session(self) -> YandexRecognitionSession:
+        """
+        Creates the recognition session of a call.
+
+        :return: The session, streaming each utterance while it is spoken.
+        """
+        return YandexRecognitionSession(self)
+
+    async def recognize(self, ulaw_data: bytes | memoryview) -> Optional[str]:
+        logger.info("🎙️ Starting STT recognition")
+
+        pcm_data = await AudioConverter.ulaw_to_pcm(ulaw_data)
+
+        metadata = await self.get_metadata()
+
         async def request_iterator():
             # Session config: one-time initial message
-            yield stt_messages.StreamingRequest(
-                session_options=stt_messages.StreamingOptions(
-                    recognition_model=stt_messages.RecognitionModelOptions(
-                        model="general",
-                        audio_format=stt_messages.AudioFormatOptions(
-                            raw_audio=stt_messages.RawAudio(
-                                audio_encoding=stt_messages.RawAudio.LINEAR16_PCM,
-                                sample_rate_hertz=8000,
-                                audio_channel_count=1,
-                            )
-                        ),
-                    )
-                )
-            )
+            yield _session_options_request()
 
             # Send audio in chunks
             chunk_size = 4000
@@ -59,29 +234,281 @@ class YandexSpeechRecognizer(SpeechRecognizer):
                     chunk=stt_messages.AudioChunk(data=pcm_data[i : i + chunk_size])
                 )
 
-        async with grpc.aio.secure_channel(
-            "stt.api.cloud.yandex.net:443", grpc.ssl_channel_credentials()
-        ) as channel:
-            stub = stt_grpc.RecognizerStub(channel)
+        channel = self.channel_manager.get(STT_ENDPOINT)
+        stub = stt_grpc.RecognizerStub(channel)
+
+        try:
+            response_stream = stub.RecognizeStreaming(
+                request_iterator(), metadata=metadata
+            )
+
+            results = []
+            async for response in response_stream:
+                if response.HasField("final"):
+                    for alt in response.final.alternatives:
+                        results.append(alt.text)
+
+            text = " ".join(results).strip()
+            logger.info("✅ Recognized: %s", text)
+            return text or None
+
+        except grpc.aio.AioRpcError as e:
+            logger.error("❌ STT error: %s", e)
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                self.channel_manager.discard(STT_ENDPOINT, channel)
+            return None
+
+
+class YandexDuplexSession(DuplexRecognitionSession):
+    """
+    YandexDuplexSession streams all of a call's audio to Yandex STT and ends the caller's turns
+    where the server's EOU classifier finds them, so no local silence has to pass first.
+
+    A RecognizeStreaming call may only last so long, so the stream is replaced by a new one at
+    the first end of turn after rotate_after_s, or at max_stream_s even in the middle of a turn.
+    The old stream is half-closed, its last finals still arrive and end a turn.
+
+    A stream that fails with a retryable error is reopened after an exponential backoff,
+    the audio sent meanwhile is dropped. After max_retries failures in a row, or on an
+    error retrying won't fix, e.g. PERMISSION_DENIED, the call is no longer recognized.
+    """
+
+    def __init__(
+        self,
+        recognizer: "YandexDuplexSpeechRecognizer",
+        rotate_after_s: float = 180.0,
+        max_stream_s: float = 280.0,
+        retry_backoff_ms: int = 250,
+        max_retry_backoff_s: float = 10.0,
+        max_retries: int = 8,
+    ):
+        """
+        Initializes the session.
+
+        :param recognizer: The recognizer providing the credentials, channels and EOU options.
+        :param rotate_after_s: The stream age after which it is replaced at the next end of turn,
+            default is 180 s.
+        :param max_stream_s: The stream age at which it is replaced anyway, default is 280 s,
+            below the service's streaming session limit.
+        :param retry_backoff_ms: The wait before reopening a failed stream, doubled with every
+            failure in a row, default is 250 ms.
+        :param max_retry_backoff_s: The longest wait before reopening a stream, default is 10 s.
+        :param max_retries: The failures in a row after which the call is no longer
+            recognized, default is 8.
+        """
+        self._recognizer = recognizer
+        self._rotate_after = rotate_after_s
+        self._max_stream = max_stream_s
+        self._results: asyncio.Queue[RecognitionResult | None] = asyncio.Queue()
+        self._requests: asyncio.Queue | None = None
+        self._started_at = 0.0
+        self._readers: set[asyncio.Task] = set()
+        self._closed = False
+        self._retry_backoff = retry_backoff_ms / 1000
+        self._max_retry_backoff = max_retry_backoff_s
+        self._max_retries = max_retries
+        self._failures = 0
+        self._retry_at = 0.0
+        self._failed = False
 
+    async def send(self, ulaw_data: bytes | memoryview) -> None:
+        """
+        Sends the next audio of the call.
+
+        :param ulaw_data: Audio data in u-law format.
+        """
+        if self._closed or self._failed:
+            return
+        if self._requests is not None and self._stream_age() >= self._max_stream:
+            logger.info("Rotating STT stream in the middle of a turn")
+            self._end_stream()
+        if self._requests is None:
+            if asyncio.get_running_loop().time() < self._retry_at:
+                # Backing off after a failed stream
+                return
             try:
-                response_stream = stub.RecognizeStreaming(
-                    request_iterator(), metadata=metadata
-                )
+                await self._start_stream()
+            except Exception as e:
+                logger.error("❌ Failed to open an STT stream: %s", e)
+                self._stream_failed(retryable=True)
+                return
+        pcm_data = ulaw_to_linear(ulaw_data).astype("<i2").tobytes()
+        self._requests.put_nowait(
+            stt_messages.StreamingRequest(chunk=stt_messages.AudioChunk(data=pcm_data))
+        )
+
+    async def close(self) -> None:
+        """Cancels the streams and ends the iteration of the results."""
+        if self._closed:
+            return
+        self._closed = True
+        self._end_stream()
+        for task in self._readers:
+            task.cancel()
+        await asyncio.gather(*self._readers, return_exceptions=True)
+        self._results.put_nowait(None)
+
+    async def __aiter__(self):
+        while (result := await self._results.get()) is not None:
+            yield result
+
+    def _stream_age(self) -> float:
+        return asyncio.get_running_loop().time() - self._started_at
+
+    async def _start_stream(self) -> None:
+        channel = self._recognizer.channel_manager.get(STT_ENDPOINT)
+        stub = stt_grpc.RecognizerStub(channel)
+        metadata = await self._recognizer.get_metadata()
+        requests = asyncio.Queue()
+        call = stub.RecognizeStreaming(
+            _request_iterator(
+                requests, _session_options_request(self._recognizer.eou_classifier)
+            ),
+            metadata=metadata,
+        )
+        self._requests = requests
+        self._started_at = asyncio.get_running_loop().time()
+        task = asyncio.create_task(self._read_responses(call, channel, requests))
+        self._readers.add(task)
+        task.add_done_callback(self._readers.discard)
+
+    def _end_stream(self) -> None:
+        """Half-closes the current stream, the next frame opens a new one."""
+        if self._requests is not None:
+            self._requests.put_nowait(None)
+            self._requests = None
+
+    def _stream_failed(self, retryable: bool) -> None:
+        """Schedules the reopening of the failed current stream, or gives up."""
+        self._failures += 1
+        if not retryable or self._failures > self._max_retries:
+            logger.error(
+                "❌ Giving up speech recognition of the call after %s failed streams",
+                self._failures,
+            )
+            self._failed = True
+            return
+        delay = min(
+            self._retry_backoff * 2 ** (self._failures - 1), self._max_retry_backoff
+        )
+        self._retry_at = asyncio.get_running_loop().time() + delay
+        logger.warning("Reopening the STT stream in %.2f s", delay)
 
-                results = []
-                async for response in response_stream:
-                    if response.HasField("final"):
-                        for alt in response.final.alternatives:
-                            results.append(alt.text)
+    def _end_turn(self, finals: list[str]) -> None:
+        text = " ".join(finals).strip()
+        if text:
+            self._results.put_nowait(
+                RecognitionResult(text, is_final=True, end_of_turn=True)
+            )
+
+    async def _read_responses(
+        self, response_stream, channel: grpc.aio.Channel, requests: asyncio.Queue
+    ) -> None:
+        # The finals of the current turn
+        finals: list[str] = []
+        error: grpc.aio.AioRpcError | None = None
+        received = False
+        try:
+            async for response in response_stream:
+                if not received:
+                    # The service answers, the backoff starts over
+                    received = True
+                    self._failures = 0
+                if response.HasField("final"):
+                    texts = [alt.text for alt in response.final.alternatives[:1]]
+                    finals.extend(text for text in texts if text)
+                    if finals:
+                        self._results.put_nowait(
+                            RecognitionResult(" ".join(finals), is_final=True)
+                        )
+                elif response.HasField("eou_update"):
+                    self._end_turn(finals)
+                    finals = []
+                    if (
+                        requests is self._requests
+                        and self._stream_age() >= self._rotate_after
+                    ):
+                        # Between two turns nothing is lost by switching streams
+                        logger.info("Rotating STT stream after a turn")
+                        self._end_stream()
+                elif response.HasField("partial") and response.partial.alternatives:
+                    text = response.partial.alternatives[0].text
+                    if text:
+                        self._results.put_nowait(
+                            RecognitionResult(" ".join([*finals, text]))
+                        )
+        except grpc.aio.AioRpcError as e:
+            logger.error("❌ STT stream error: %s", e)
+            error = e
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                self._recognizer.channel_manager.discard(STT_ENDPOINT, channel)
+            elif e.code() == grpc.StatusCode.UNAUTHENTICATED:
+                # The IAM token expired, the next stream gets a new one
+                self._recognizer.iam_token = None
+        # A rotated or broken stream's last words still make a turn
+        self._end_turn(finals)
+        if requests is not self._requests:
+            return
+        # The server ended the current stream, a later frame opens a new one
+        self._requests = None
+        if error is not None:
+            self._stream_failed(error.code() in RETRYABLE_STATUS_CODES)
+        elif not received:
+            # Ended without a word, reopening it right away could spin
+            self._stream_failed(retryable=True)
+
+
+class YandexDuplexSpeechRecognizer(YandexSpeechRecognizer, DuplexSpeechRecognizer):
+    """
+    Yandex STT recognizer streaming every call as a whole and relying on the service's
+    end of utterance classifier to end the caller's turns.
+    """
+
+    def __init__(
+        self,
+        credentials_provider: YandexCredentialsProvider,
+        channel_manager: GrpcChannelManager | None = None,
+        eou_sensitivity: str = "default",
+        max_pause_between_words_ms: int | None = None,
+        rotate_after_s: float = 180.0,
+        max_stream_s: float = 280.0,
+    ):
+        """
+        Initialize the YandexDuplexSpeechRecognizer with the given credentials provider.
+
+        :param credentials_provider: Instance of YandexCredentialsProvider to manage IAM tokens.
+        :param channel_manager: The long-lived gRPC channels, see YandexSpeechRecognizer.
+        :param eou_sensitivity: "default" (more conservative) or "high" (faster, more false
+            turn ends), default is "default".
+        :param max_pause_between_words_ms: A hint for the longest pause within an utterance,
+            default is none.
+        :param rotate_after_s: See YandexDuplexSession, default is 180 s.
+        :param max_stream_s: See YandexDuplexSession, default is 280 s.
+        :raises ValueError: If the EOU sensitivity is unknown.
+        """
+        super().__init__(credentials_provider, channel_manager)
+        sensitivities = {
+            "default": stt_messages.DefaultEouClassifier.DEFAULT,
+            "high": stt_messages.DefaultEouClassifier.HIGH,
+        }
+        if eou_sensitivity not in sensitivities:
+            raise ValueError(f"Unknown EOU sensitivity '{eou_sensitivity}'.")
+        self.eou_classifier = stt_messages.EouClassifierOptions(
+            default_classifier=stt_messages.DefaultEouClassifier(
+                type=sensitivities[eou_sensitivity],
+                max_pause_between_words_hint_ms=max_pause_between_words_ms or 0,
+            )
+        )
+        self._rotate_after = rotate_after_s
+        self._max_stream = max_stream_s
 
-                text = " ".join(results).strip()
-                logger.info("✅ Recognized: %s", text)
-                return text or None
+    async def create_duplex_session(self) -> YandexDuplexSession:
+        """
+        Creates the recognition session of a call.
 
-            except grpc.aio.AioRpcError as e:
-                logger.error("❌ STT error: %s", e)
-                return None
+        :return: The session, streaming all of the call's audio.
+        """
+        return YandexDuplexSession(self, self._rotate_after, self._max_stream)
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ import logging
 
 import grpc
 from audio_converter import AudioConverter
+from grpc_channel_pool import GrpcChannelManager
 from speech_synthesizer import SpeechSynthesizer
 from yandex_credentials_provider import YandexCredentialsProvider
 from yandex_settings import YandexSettings
@@ -12,20 +13,40 @@ from generated.yandex.cloud.ai.tts.v3 import tts_pb2
 
 logger = logging.getLogger(__name__)
 
+TTS_ENDPOINT = "tts.api.cloud.yandex.net:443"
+
 
 class YandexSpeechSynthesizer(SpeechSynthesizer):
     """
     Fully async Yandex Speech Synthesizer using gRPC aio.
     """
 
-    def __init__(self, credentials_provider: YandexCredentialsProvider):
+    def __init__(
+        self,
+        credentials_provider: YandexCredentialsProvider,
+        channel_manager: GrpcChannelManager | None = None,
+        voice: str = "alena",
+    ):
         """
         Initialize the YandexSpeechSynthesizer with the given credentials provider.
 
         :param credentials_provider: Instance of YandexCredentialsProvider to manage IAM tokens.
+        :param channel_manager: The long-lived gRPC channels, shared with the other Yandex clients,
+            default is a manager of the synthesizer's own.
+        :param voice: The Yandex voice, default is 'alena'.
         """
         self.credentials_provider = credentials_provider
         self.iam_token = None
+        self.channel_manager = channel_manager or GrpcChannelManager()
+        self.voice = voice
+
+    @property
+    def cache_key(self) -> str:
+        return f"yandex:{self.voice}"
+
+    async def warm_up(self) -> None:
+        """Connects the TTS channels before the first sentence."""
+        await self.channel_manager.warm_up(TTS_ENDPOINT)
 
     async def synthesize(self, text: str) -> bytes:
         """
@@ -45,7 +66,7 @@ class YandexSpeechSynthesizer(SpeechSynthesizer):
                     container_audio_type=tts_pb2.ContainerAudio.OGG_OPUS
                 )
             ),
-            hints=[tts_pb2.Hints(voice="alena")],
+            hints=[tts_pb2.Hints(voice=self.voice)],
         )
 
         metadata = [
@@ -53,27 +74,27 @@ class YandexSpeechSynthesizer(SpeechSynthesizer):
             ("x-folder-id", self.credentials_provider.folder_id),
         ]
 
-        # ✅ Канал создаётся внутри текущего event loop
-        async with grpc.aio.secure_channel(
-            "tts.api.cloud.yandex.net:443", grpc.ssl_channel_credentials()
-        ) as channel:
-            stub = tts_service_pb2_grpc.SynthesizerStub(channel)
-            try:
-                response_stream = stub.UtteranceSynthesis(request, metadata=metadata)
-                audio_chunks = []
-                async for response in response_stream:
-                    if response.HasField("audio_chunk"):
-                        audio_chunks.append(response.audio_chunk.data)
-
-                audio_response = b"".join(audio_chunks)
-                logger.info("✅ Synthesis completed successfully")
-                ulaw_response = await AudioConverter.ogg_opus_to_ulaw(audio_response)
-                logger.info("✅ Audio converted to u-law format")
-                return ulaw_response
-
-            except grpc.aio.AioRpcError as e:
-                logger.error("❌ gRPC error during synthesis: %s", e)
-                raise
+        # ✅ Канал из пула, соединение уже установлено
+        channel = self.channel_manager.get(TTS_ENDPOINT)
+        stub = tts_service_pb2_grpc.SynthesizerStub(channel)
+        try:
+            response_stream = stub.UtteranceSynthesis(request, metadata=metadata)
+            audio_chunks = []
+            async for response in response_stream:
+                if response.HasField("audio_chunk"):
+                    audio_chunks.append(response.audio_chunk.data)
+
+            audio_response = b"".join(audio_chunks)
+            logger.info("✅ Synthesis completed successfully")
+            ulaw_response = await AudioConverter.ogg_opus_to_ulaw(audio_response)
+            logger.info("✅ Audio converted to u-law format")
+            return ulaw_response
+
+        except grpc.aio.AioRpcError as e:
+            logger.error("❌ gRPC error during synthesis: %s", e)
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                self.channel_manager.discard(TTS_ENDPOINT, channel)
+            raise
 
 
 if __name__ == "__main__":